@@ -0,0 +1,192 @@
+import os
+import math
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+import metrics
+import deadline as deadlines
+
+in_flight = metrics.REGISTRY.gauge('learncard_admission_in_flight', 'Requests holding a slot of each admission stage.', ('stage',))
+queue_depth = metrics.REGISTRY.gauge('learncard_admission_queue_depth', 'Requests waiting for a slot of each admission stage.', ('stage',))
+admission_rejected = metrics.REGISTRY.counter('learncard_admission_rejected_total', 'Requests shed by admission control.', ('stage', 'reason'))
+admission_wait = metrics.REGISTRY.histogram('learncard_admission_wait_seconds', 'Time spent waiting for an admission slot.', ('stage',),
+                                            buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+QUEUE_FULL, TIMEOUT = 'queue_full', 'timeout'
+# Retry-After bounds (seconds)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+# (limit, queue) per stage: the whole request, OCR (CPU-bound, one slot per core) and
+# the LLM call (I/O-bound, so more slots than cores); overridable via ADMISSION_<STAGE>_LIMIT/_QUEUE
+DEFAULTS = {
+    'request': (32, 16),
+    'ocr': (os.cpu_count() or 2, 16),
+    'llm': (8, 16),
+}
+
+
+class Overloaded(Exception):
+    """A stage is saturated; carries the HTTP status and Retry-After seconds to answer with.
+
+    429 when the wait queue is full (shed at once), 503 when a queued request could not get
+    a slot within its wait budget.
+    """
+
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f'{stage}: {reason}')
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = 429 if reason == QUEUE_FULL else 503
+
+
+class Limiter:
+    """At most `limit` concurrent holders, at most `queue` more waiting, each for at most max_wait_s.
+
+    Waiting is also capped by the ambient request deadline. Thread-safe; one instance per
+    stage is shared by all request threads. Retry-After is estimated from the recent mean
+    hold time and the number of requests ahead.
+    """
+
+    def __init__(self, stage: str, limit: int, queue: int, max_wait_s: float = 10.0, clock=time.monotonic):
+        self.stage = stage
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self.max_wait_s = max_wait_s
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._mean_hold_s = None
+
+    def retry_after(self) -> int:
+        hold = self._mean_hold_s if self._mean_hold_s is not None else 1.0
+        ahead = self.in_flight + self.waiting + 1 - self.limit
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(hold * max(1, ahead) / self.limit))))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        return Overloaded(self.stage, reason, self.retry_after())
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises Overloaded when shed."""
+        t0 = self._clock()
+        with self._cond:
+            if self.in_flight >= self.limit:
+                if self.waiting >= self.queue:
+                    err = self._reject(QUEUE_FULL)
+                else:
+                    err = self._wait(min(self.max_wait_s, deadlines.current().remaining()))
+                if err is not None:
+                    admission_rejected.inc(stage=self.stage, reason=err.reason)
+                    raise err
+            self.in_flight += 1
+            self.admitted += 1
+            in_flight.set(self.in_flight, stage=self.stage)
+        admission_wait.observe(self._clock() - t0, stage=self.stage)
+
+    def _wait(self, budget_s: float):
+        # called with the condition held; returns an Overloaded to raise, or None once a slot is free
+        end = self._clock() + budget_s
+        self.waiting += 1
+        queue_depth.set(self.waiting, stage=self.stage)
+        try:
+            while self.in_flight >= self.limit:
+                left = end - self._clock()
+                if left <= 0:
+                    return self._reject(TIMEOUT)
+                self._cond.wait(left)
+            return None
+        finally:
+            self.waiting -= 1
+            queue_depth.set(self.waiting, stage=self.stage)
+
+    def release(self, held_s: float = None):
+        with self._cond:
+            self.in_flight -= 1
+            in_flight.set(self.in_flight, stage=self.stage)
+            if held_s is not None:
+                # exponentially weighted mean, so the estimate follows the current load
+                self._mean_hold_s = held_s if self._mean_hold_s is None else 0.8 * self._mean_hold_s + 0.2 * held_s
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        t0 = self._clock()
+        try:
+            yield
+        finally:
+            self.release(self._clock() - t0)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'limit': self.limit, 'queue': self.queue, 'in_flight': self.in_flight, 'waiting': self.waiting,
+                    'admitted': self.admitted, 'rejected': self.rejected,
+                    'mean_hold_s': round(self._mean_hold_s, 3) if self._mean_hold_s is not None else None}
+
+
+def enabled() -> bool:
+    return os.getenv('ADMISSION_ENABLED', '1') == '1'
+
+
+class AdmissionController:
+    """Process-wide limiters keyed by stage, created from ADMISSION_* settings on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def get(self, stage: str) -> Limiter:
+        lim = self._limiters.get(stage)
+        if lim is None:
+            with self._lock:
+                lim = self._limiters.get(stage)
+                if lim is None:
+                    limit, queue = DEFAULTS.get(stage, DEFAULTS['request'])
+                    key = stage.upper()
+                    lim = self._limiters[stage] = Limiter(
+                        stage,
+                        limit=deadlines.env(f'ADMISSION_{key}_LIMIT', str(limit), int),
+                        queue=deadlines.env(f'ADMISSION_{key}_QUEUE', str(queue), int),
+                        max_wait_s=deadlines.env('ADMISSION_MAX_WAIT_S', '10'),
+                    )
+        return lim
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._limiters.items())
+        return {stage: lim.stats() for stage, lim in items}
+
+    def reset(self):
+        with self._lock:
+            self._limiters.clear()
+
+
+controller = AdmissionController()
+
+
+@contextmanager
+def slot(stage: str):
+    """Hold a slot of `stage` for the block (no-op with ADMISSION_ENABLED=0)."""
+    if not enabled():
+        yield
+        return
+    with controller.get(stage).slot():
+        yield
+
+
+def limited(stage: str):
+    """Decorator form of slot() for a whole view function."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with slot(stage):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
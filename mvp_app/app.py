@@ -1,9 +1,23 @@
 import os
 import uuid
-from flask import Flask, render_template, request, redirect, url_for
-from PIL import Image
-import pytesseract
-from summarizer import summarize, generate_pdf
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, redirect, url_for, jsonify, Response, make_response
+from werkzeug.utils import secure_filename
+from summarizer import summarize, generate_pdf, answer_source, fallback_result, CACHEABLE_BACKENDS
+from artifacts import send_artifact
+from image_variants import generate_variants, template_context
+from janitor import sharded_path, janitor_from_env
+from deck_export import DeckWriter
+import metrics
+import tracing
+import circuit_breaker
+import image_hash
+import text_cleanup
+import admission
+import profiling
+import deadline as deadlines
+from tracing import stage
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,12 +32,55 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
+# 设置 USE_X_SENDFILE=1 时由前端代理（nginx/Apache）直接发送文件
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '0') == '1'
+
+# 后台清理 uploads/ 与 outputs/：按配额与最近访问时间淘汰（JANITOR_ENABLED=0 可关闭）
+# 线程不在导入时启动：pre-fork 服务器在 fork 之后（warmup() 或第一个请求）才启动它
+janitor = janitor_from_env(UPLOAD_FOLDER, OUTPUT_FOLDER)
+
+
+def start_background():
+    if os.getenv('JANITOR_ENABLED', '1') == '1':
+        janitor.start()
+
+
+@app.before_request
+def _start_background_once():
+    if not app.config.get('BACKGROUND_STARTED'):
+        app.config['BACKGROUND_STARTED'] = True
+        start_background()
+
+
+@metrics.REGISTRY.register_collector
+def _janitor_metrics():
+    st = janitor.stats()
+    lines = [
+        '# HELP learncard_janitor_bytes_reclaimed_total Bytes freed by the janitor.',
+        '# TYPE learncard_janitor_bytes_reclaimed_total counter',
+        f"learncard_janitor_bytes_reclaimed_total {st['bytes_reclaimed']}",
+        '# HELP learncard_janitor_files_removed_total Files removed by the janitor.',
+        '# TYPE learncard_janitor_files_removed_total counter',
+        f"learncard_janitor_files_removed_total {st['files_removed']}",
+        '# HELP learncard_dir_bytes Bytes stored per directory at the last janitor run.',
+        '# TYPE learncard_dir_bytes gauge',
+    ]
+    for name, d in sorted(st['dirs'].items()):
+        lines.append(f'learncard_dir_bytes{{dir="{name}"}} {d["bytes"]}')
+    return lines
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.errorhandler(admission.Overloaded)
+def _overloaded(e):
+    # 过载时快速拒绝：队列已满 429，排队超时 503，并告诉客户端多久后重试
+    return '服务器繁忙，请稍后重试', e.status, {'Retry-After': str(e.retry_after)}
+
+
 @app.route('/upload', methods=['POST'])
+@admission.limited('request')
 def upload():
     if 'image' not in request.files:
         return '没有上传文件', 400
@@ -31,42 +88,222 @@ def upload():
     if f.filename == '':
         return '没有选中文件', 400
 
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}_{f.filename}"
-    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    f.save(path)
+    # UPLOAD_DEADLINE_S 限制整个请求（含 LLM 探测与重试）的耗时；0 表示不限制
+    # PROFILE_ENABLED=1 时按比例对请求做性能剖析，只保存超过 PROFILE_MIN_MS 的慢请求
+    with tracing.start_trace('upload') as trace, profiling.profile(trace), \
+            deadlines.scope(deadlines.from_env('UPLOAD_DEADLINE_S', '60')):
+        file_id = str(uuid.uuid4())
+        filename, path = _save_upload(f, file_id)
+        variants, hashes, reused, ocr_text = _read_page(path)
+        result = _summarize_page(ocr_text, hashes, reused)
+
+        # Generate PDF
+        pdf_name = f"{file_id}.pdf"
+        pdf_path = sharded_path(app.config['OUTPUT_FOLDER'], pdf_name)
+        with stage('generate_pdf'):
+            generate_pdf(result, path, pdf_path)
+
+    image_url = f"/uploads/{filename}"
+    pdf_url = f"/outputs/{pdf_name}"
+
+    resp = make_response(render_template('result.html', image_url=image_url, variants=variants, ocr_text=ocr_text, result=result, pdf_url=pdf_url))
+    resp.headers['X-Trace-Id'] = trace.trace_id
+    return resp
+
+
+@app.route('/upload_multi', methods=['POST'])
+@admission.limited('request')
+def upload_multi():
+    """一次上传同一份作业的多张照片：各图并行 OCR（LLM 调用受准入控制限流），合并为一页结果和一个多页 PDF。
+
+    merge=1 时把各页 OCR 文本按上传顺序拼接后只调用一次 summarize，否则每页单独总结。
+    """
+    files = [f for f in request.files.getlist('images') + request.files.getlist('image') if f.filename]
+    if not files:
+        return '没有选中文件', 400
+    max_files = deadlines.env('MULTI_UPLOAD_MAX_FILES', 10, int)
+    if len(files) > max_files:
+        return f'一次最多上传 {max_files} 张图片', 400
+    merge = request.form.get('merge', '0') == '1'
+
+    with tracing.start_trace('upload_multi', images=len(files), merge=merge) as trace, profiling.profile(trace), \
+            deadlines.scope(deadlines.from_env('UPLOAD_DEADLINE_S', '60')):
+        file_id = str(uuid.uuid4())
+        saved = [_save_upload(f, f'{file_id}_{i}') for i, f in enumerate(files)]
+        # 每张图一个线程：OCR 并发数由 admission 的 ocr 阶段限制，整组耗时接近最慢的那一张
+        with ThreadPoolExecutor(max_workers=len(saved), thread_name_prefix='upload-multi') as pool:
+            futures = [pool.submit(contextvars.copy_context().run, _process_page, path, not merge) for _, path in saved]
+            pages = [fut.result() for fut in futures]
+
+        if merge:
+            merged_text = '\n\n'.join(p['ocr_text'] for p in pages if p['ocr_text'].strip())
+            with stage('summarize'):
+                result = _summarize_admitted(merged_text)
+        else:
+            result = None
+
+        pdf_name = f"{file_id}.pdf"
+        pdf_path = sharded_path(app.config['OUTPUT_FOLDER'], pdf_name)
+        with stage('generate_pdf'), DeckWriter(pdf_path) as deck:
+            if merge:
+                # 合并后的卡片只有一张，配第一张照片；所有照片再各占一页，PDF 里不丢图
+                deck.add_card(result, saved[0][1])
+                for i, (_, path) in enumerate(saved, 1):
+                    deck.add_image_page(path, f'原图 {i}/{len(saved)}')
+            else:
+                for p, (_, path) in zip(pages, saved):
+                    deck.add_card(p['result'], path)
+
+    for p, (filename, _) in zip(pages, saved):
+        p['image_url'] = f"/uploads/{filename}"
+    resp = make_response(render_template('result_multi.html', pages=pages, result=result, pdf_url=f"/outputs/{pdf_name}"))
+    resp.headers['X-Trace-Id'] = trace.trace_id
+    return resp
 
-    # OCR：先预处理，再根据配置选择 OCR 引擎（本地 Tesseract 或 Google Vision）
+
+def _save_upload(f, file_id):
+    filename = f"{file_id}_{secure_filename(f.filename) or 'image'}"
+    path = sharded_path(app.config['UPLOAD_FOLDER'], filename)
+    with stage('save'):
+        f.save(path)
+    return filename, path
+
+
+def _read_page(path):
+    """缩略图 + 图片指纹查询 + OCR，返回 (variants, hashes, reused, ocr_text)。"""
+    # 生成网页尺寸的缩略图（WebP/JPEG），结果页通过 srcset 按屏幕宽度选择
     try:
-        from ocr_utils import preprocess_image, tesseract_ocr, google_vision_ocr
-        processed_img = preprocess_image(path)
-        # 若环境变量指定使用 Google Vision 且可用，则优先使用
-        use_google = os.getenv('USE_GOOGLE_VISION','0') == '1'
-        ocr_text = ''
-        if use_google:
-            ocr_text = google_vision_ocr(path)
-        if not ocr_text:
-            ocr_text = tesseract_ocr(processed_img)
+        with stage('thumbnails'):
+            variants = template_context(generate_variants(path), '/uploads')
     except Exception as e:
-        print('OCR 处理出错：', e)
-        ocr_text = ''
+        print('生成缩略图失败：', e)
+        variants = {}
 
+    # IMAGE_HASH_ENABLED=1 时先算图片感知哈希：同一页的重拍/重传直接复用之前的 OCR 文本（及 LLM 结果）
+    hashes, reused = _image_hash_lookup(path)
+    if reused is not None:
+        ocr_text = reused['ocr_text']
+    else:
+        # OCR 占 CPU，按核数限流；LLM 调用以等待 I/O 为主，单独限流
+        with admission.slot('ocr'):
+            ocr_text = _ocr(path)
+    return variants, hashes, reused, ocr_text
+
+
+def _summarize_page(ocr_text, hashes, reused, summarize_text=True):
+    """总结一页（或复用图片指纹命中的结果）并写入图片指纹；summarize_text=False 时只保存 OCR 文本。"""
+    result = None
     # Summarize (call LLM or fallback)
-    result = summarize(ocr_text)
+    if summarize_text:
+        with stage('summarize'):
+            if reused is not None and reused['result'] is not None:
+                result = dict(reused['result'])
+                result['image_hash'] = {'distance': reused['distance']}
+            else:
+                result = _summarize_admitted(ocr_text)
 
-    # Generate PDF
-    pdf_name = f"{file_id}.pdf"
-    pdf_path = os.path.join(app.config['OUTPUT_FOLDER'], pdf_name)
-    generate_pdf(result, path, pdf_path)
+    if hashes is not None and reused is None and ocr_text.strip():
+        _image_hash_store(hashes, ocr_text, result)
+    return result
 
-    image_url = f"/outputs/{filename}"
-    pdf_url = f"/outputs/{pdf_name}"
 
-    return render_template('result.html', image_url=image_url, ocr_text=ocr_text, result=result, pdf_url=pdf_url)
+def _summarize_admitted(ocr_text):
+    # LLM 阶段已满（或排队超时）时降级为本地回退摘要：OCR 已经做完，不必让整个请求失败
+    try:
+        with admission.slot('llm'):
+            return summarize(ocr_text)
+    except admission.Overloaded:
+        return fallback_result(ocr_text, 'overloaded')
+
+
+def _process_page(path, summarize_text=True):
+    # 多图上传中的一页，在线程池里运行（复制了请求的 trace 与截止时间）
+    with stage('page'), profiling.attach():
+        variants, hashes, reused, ocr_text = _read_page(path)
+        result = _summarize_page(ocr_text, hashes, reused, summarize_text)
+    return {'variants': variants, 'ocr_text': ocr_text, 'result': result}
+
+
+def _image_hash_lookup(path):
+    """返回 (hashes, 命中的条目)；未开启或出错时为 (None, None)。"""
+    if not image_hash.enabled():
+        return None, None
+    try:
+        with stage('image_hash') as sp:
+            hashes = image_hash.image_hashes(path)
+            hit = image_hash.get_index().lookup(hashes)
+            if sp is not None:
+                sp.set(hit=hit is not None, distance=hit['distance'] if hit else None)
+    except Exception as e:
+        print('图片指纹查询失败：', e)
+        return None, None
+    if hit is not None:
+        metrics.cache_hits.inc(cache='image_hash')
+    return hashes, hit
+
+
+def _image_hash_store(hashes, ocr_text, result):
+    # OCR 文本总是可复用的；LLM 结果只有来自远端模型（或近似重复缓存）时才保存
+    keep = result is not None and answer_source() in CACHEABLE_BACKENDS + ('near_dup',)
+    try:
+        image_hash.get_index().add(hashes, ocr_text, result if keep else None)
+    except Exception as e:
+        print('写入图片指纹失败：', e)
+
+
+def _ocr(path):
+    # OCR：先预处理，再根据配置选择 OCR 引擎（本地 Tesseract 或 Google Vision）；清洗时需要逐词置信度
+    cleanup = text_cleanup.enabled()
+    try:
+        from ocr_utils import ocr_image
+        ocr_text, words = ocr_image(path, with_words=cleanup, stage=stage)
+    except Exception as e:
+        print('OCR 处理出错：', e)
+        ocr_text, words = '', None
+    if cleanup and ocr_text.strip():
+        ocr_text = _clean_ocr_text(ocr_text, words)
+    return ocr_text
+
+
+def _clean_ocr_text(ocr_text, words=None):
+    """OCR_CLEANUP=1 时去掉低置信度词、页码和紧邻的重复行，拼回断行并按估算 token 截断。"""
+    try:
+        with stage('text_cleanup') as sp:
+            report = text_cleanup.clean_text(ocr_text, words)
+            if sp is not None:
+                sp.set(tokens_before=report['tokens_before'], tokens_after=report['tokens_after'],
+                       low_conf_dropped=report['low_conf_dropped'], truncated=report['truncated'])
+    except Exception as e:
+        print('OCR 文本清洗失败：', e)
+        return ocr_text
+    text_cleanup.record(report)
+    return report['text'] or ocr_text
+
 
 @app.route('/outputs/<path:filename>')
 def outputs(filename):
-    return app.send_static_file(os.path.join('..', 'outputs', filename))
+    return send_artifact(app.config['OUTPUT_FOLDER'], filename)
+
+@app.route('/uploads/<path:filename>')
+def uploads(filename):
+    return send_artifact(app.config['UPLOAD_FOLDER'], filename)
+
+@app.route('/janitor/stats')
+def janitor_stats():
+    return jsonify(janitor.stats())
+
+
+@app.route('/circuits')
+def circuit_stats():
+    return jsonify(circuit_breaker.breakers.snapshot())
+
+@app.route('/admission')
+def admission_stats():
+    return jsonify(admission.controller.snapshot())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import abort, send_file
+from werkzeug.security import safe_join
+
+from janitor import shard_subdir, touch
+import metrics
+
+# Files whose name starts with an upload uuid or a hex digest are written once and
+# never modified afterwards, so clients may cache them forever.
+_CONTENT_ADDRESSED = re.compile(r'^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{32,64})(?:[_.]|$)')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_ETAG_CACHE_SIZE = 4096
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def is_content_addressed(filename: str) -> bool:
+    return bool(_CONTENT_ADDRESSED.match(os.path.basename(filename)))
+
+
+def content_etag(path: str) -> str:
+    """Return a sha256-based ETag for path.
+
+    Hashes are cached per (path, size, mtime) so each file is read at most once
+    until it changes.
+    """
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+            return etag
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    etag = h.hexdigest()[:32]
+    with _etag_lock:
+        _etag_cache[key] = etag
+        while len(_etag_cache) > _ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def send_artifact(directory: str, filename: str):
+    """Serve a generated (possibly sharded) file from directory with a content-hash ETag, 304 and Range support.
+
+    Only generated artifacts are served: names starting with an upload uuid or a hex
+    digest, directly in directory or its shards. Everything else kept there (success
+    examples, debug logs, traces, caches, reports) answers 404.
+    `send_file` answers If-None-Match / If-Range / Range itself and hands the open
+    file to the server's `wsgi.file_wrapper` (sendfile on gunicorn and most servers);
+    with USE_X_SENDFILE enabled the body is offloaded to the front proxy instead.
+    """
+    if '/' in filename or '\\' in filename or not is_content_addressed(filename):
+        abort(404)
+    path = safe_join(directory, shard_subdir(filename), filename)
+    if path is None or not os.path.isfile(path):
+        # files written before sharding live directly in directory
+        path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    touch(path)
+
+    # generated artifacts are written once and never modified, so clients may cache them forever
+    resp = send_file(path, conditional=True, etag=content_etag(path), max_age=IMMUTABLE_MAX_AGE)
+    resp.cache_control.immutable = True
+    if resp.status_code == 304:
+        metrics.cache_hits.inc(cache='http_304')
+    return resp
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff')
+RESULTS_NAME = 'results.jsonl'
+# refresh the live progress line at most this often
+PROGRESS_INTERVAL_S = 0.5
+
+
+def discover(source: str):
+    """Items to process from a directory (walked recursively) or a manifest file.
+
+    A manifest is a JSON list (of paths or {'path', 'id'?, 'text'?} objects, e.g. the
+    bench corpus manifest), JSONL with the same objects, or plain text with one path
+    per line. Relative paths resolve against the manifest's directory. Each item is
+    {'id', 'path', 'text'?}; the id (relative path by default) keys the checkpoint.
+    Ids are unique: a repeated path is listed once, and a repeated id naming another
+    image gets a '#2', '#3', ... suffix.
+    """
+    items = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTS):
+                    path = os.path.join(root, name)
+                    items.append({'id': os.path.relpath(path, source).replace(os.sep, '/'), 'path': path})
+        return items
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        if source.endswith('.json'):
+            entries = json.load(f)
+        elif source.endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    paths = {}
+    for e in entries:
+        e = {'path': e} if isinstance(e, str) else dict(e)
+        if not os.path.isabs(e['path']):
+            e['path'] = os.path.join(base, e['path'])
+        e.setdefault('id', os.path.relpath(e['path'], base).replace(os.sep, '/'))
+        if paths.get(e['id']) == e['path']:
+            continue
+        item_id, n = e['id'], 1
+        while e['id'] in paths:
+            n += 1
+            e['id'] = f'{item_id}#{n}'
+        paths[e['id']] = e['path']
+        items.append(e)
+    return items
+
+
+def load_checkpoint(results_path: str) -> set:
+    """Ids already finished (status ok) in an existing results file.
+
+    A run killed mid-write leaves at most one truncated last line, which is ignored.
+    """
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get('status') == 'ok':
+                done.add(rec['id'])
+    return done
+
+
+def ocr_job(path: str) -> dict:
+    """Preprocess + OCR one image (runs in a worker process); returns {'text', 'ms'} or {'error'}."""
+    from ocr_utils import ocr_image
+    import text_cleanup
+    t0 = time.perf_counter()
+    cleanup = text_cleanup.enabled()
+    try:
+        text, words = ocr_image(path, with_words=cleanup)
+    except Exception as e:
+        return {'error': f'ocr: {e}'}
+    if cleanup and text.strip():
+        text = text_cleanup.clean_text(text, words)['text'] or text
+    return {'text': text, 'ms': round((time.perf_counter() - t0) * 1000.0, 1)}
+
+
+def summarize_job(item: dict, ocr_text: str, pdf_dir=None, deadline_s: float = 0) -> dict:
+    """Summarize one page (runs on the LLM thread pool) and optionally render its PDF."""
+    import summarizer
+    from deadline import Deadline
+    t0 = time.perf_counter()
+    result = summarizer.summarize(ocr_text, deadline=Deadline(deadline_s) if deadline_s > 0 else None)
+    out = {'result': result, 'source': summarizer.answer_source(),
+           'summarize_ms': round((time.perf_counter() - t0) * 1000.0, 1)}
+    if pdf_dir:
+        pdf_path = os.path.join(pdf_dir, _safe_name(item['id']) + '.pdf')
+        summarizer.generate_pdf(result, item['path'], pdf_path)
+        out['pdf_path'] = pdf_path
+    return out
+
+
+def _safe_name(item_id: str) -> str:
+    return os.path.splitext(item_id)[0].replace('/', '__')
+
+
+class Progress:
+    """Counts and timings of a run; `line()` is the live status, `summary()` the final report."""
+
+    def __init__(self, total: int, skipped: int, stream=sys.stderr):
+        self.total = total
+        self.skipped = skipped
+        self.ok = 0
+        self.failed = 0
+        self.ocr_ms = []
+        self.summarize_ms = []
+        self.started = time.perf_counter()
+        self.stream = stream
+        self._last = 0.0
+
+    def record(self, rec: dict):
+        if rec['status'] == 'ok':
+            self.ok += 1
+            self.ocr_ms.append(rec['ms']['ocr'])
+            self.summarize_ms.append(rec['ms']['summarize'])
+        else:
+            self.failed += 1
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return (self.ok + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        done = self.ok + self.failed
+        left = self.total - self.skipped - done
+        rate = self.rate()
+        eta = f'{left / rate:.0f}s' if rate > 0 else '-'
+        return (f'{self.skipped + done}/{self.total}  {rate:.2f} img/s  '
+                f'ocr p50 {metrics.percentile(self.ocr_ms, 50) or 0:.0f} ms  '
+                f'llm p50 {metrics.percentile(self.summarize_ms, 50) or 0:.0f} ms  '
+                f'failed {self.failed}  eta {eta}')
+
+    def tick(self, force: bool = False):
+        if self.stream is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._last >= PROGRESS_INTERVAL_S:
+            self._last = now
+            print('\r' + self.line(), end='', file=self.stream, flush=True)
+
+    def summary(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            'total': self.total, 'skipped': self.skipped, 'ok': self.ok, 'failed': self.failed,
+            'wall_s': round(wall, 2), 'throughput_per_s': round(self.rate(), 3),
+            'ocr_ms': {q: metrics.percentile(self.ocr_ms, int(q[1:])) for q in ('p50', 'p95')},
+            'summarize_ms': {q: metrics.percentile(self.summarize_ms, int(q[1:])) for q in ('p50', 'p95')},
+        }
+
+
+def run_batch(items, out_dir: str, ocr_workers: int = None, llm_workers: int = 4, pdf: bool = False,
+              fallback_text: bool = False, deadline_s: float = 0, progress_stream=sys.stderr) -> dict:
+    """Process items: OCR on a process pool, summarize (+PDF) on a thread pool, one JSONL record each.
+
+    Records are appended to <out_dir>/results.jsonl as items finish, which doubles as
+    the checkpoint: a rerun skips ids already recorded as ok and retries failures.
+    At most twice the pool size is in flight per stage, so memory stays flat on large
+    directories. ocr_workers=0 runs OCR on the thread pool instead (no subprocesses).
+    With fallback_text, an empty OCR result is replaced by the item's `text` (e.g. the
+    ground truth of the bench corpus when Tesseract is not installed).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, RESULTS_NAME)
+    pdf_dir = os.path.join(out_dir, 'pdfs') if pdf else None
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    done = load_checkpoint(results_path)
+    todo = [it for it in items if it['id'] not in done]
+    progress = Progress(len(items), len(items) - len(todo), progress_stream)
+    if not todo:
+        return progress.summary()
+
+    ocr_workers = (os.cpu_count() or 2) if ocr_workers is None else ocr_workers
+    ocr_pool = ProcessPoolExecutor(ocr_workers) if ocr_workers > 0 else None
+    llm_pool = ThreadPoolExecutor(max(1, llm_workers), thread_name_prefix='batch-llm')
+    ocr_limit = max(1, ocr_workers) * 2
+    llm_limit = max(1, llm_workers) * 2
+    pending = iter(todo)
+    ocr_running, llm_running = {}, {}
+    ocr_results = {}
+
+    def submit_ocr():
+        while len(ocr_running) < ocr_limit and len(llm_running) < llm_limit:
+            item = next(pending, None)
+            if item is None:
+                return
+            fut = (ocr_pool or llm_pool).submit(ocr_job, item['path'])
+            ocr_running[fut] = item
+
+    out = open(results_path, 'a', encoding='utf-8')
+    if out.tell() and not _ends_with_newline(results_path):
+        # terminate the partial line left by an interrupted write, so the next record starts clean
+        out.write('\n')
+    try:
+        submit_ocr()
+        while ocr_running or llm_running:
+            finished, _ = wait(list(ocr_running) + list(llm_running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                if fut in ocr_running:
+                    item = ocr_running.pop(fut)
+                    try:
+                        ocr = fut.result()
+                    except Exception as e:
+                        ocr = {'error': f'ocr: {e}'}
+                    if 'error' in ocr:
+                        _write(out, progress, {'id': item['id'], 'image_path': item['path'], 'status': 'error',
+                                               'error': ocr['error']})
+                        continue
+                    text = ocr['text']
+                    if not text.strip() and fallback_text and item.get('text'):
+                        text = item['text']
+                        ocr['ground_truth'] = True
+                    ocr_results[item['id']] = (text, ocr)
+                    llm_running[llm_pool.submit(summarize_job, item, text, pdf_dir, deadline_s)] = item
+                else:
+                    item = llm_running.pop(fut)
+                    text, ocr = ocr_results.pop(item['id'])
+                    try:
+                        res = fut.result()
+                    except Exception as e:
+                        _write(out, progress, {'id': item['id'], 'image_path': item['path'], 'status': 'error',
+                                               'error': f'summarize: {e}'})
+                        continue
+                    rec = {'id': item['id'], 'image_path': item['path'], 'status': 'ok', 'ocr_text': text,
+                           'result': res['result'], 'source': res['source'],
+                           'ms': {'ocr': ocr['ms'], 'summarize': res['summarize_ms']}}
+                    if ocr.get('ground_truth'):
+                        rec['ocr_ground_truth'] = True
+                    if 'pdf_path' in res:
+                        rec['pdf_path'] = res['pdf_path']
+                    _write(out, progress, rec)
+            submit_ocr()
+    except KeyboardInterrupt:
+        if progress_stream is not None:
+            print('\n已中断：已完成的图片记录在', results_path, '，重新运行同一命令即可继续。', file=progress_stream)
+        raise
+    finally:
+        out.close()
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+        if ocr_pool is not None:
+            ocr_pool.shutdown(wait=False, cancel_futures=True)
+    progress.tick(force=True)
+    if progress_stream is not None:
+        print(file=progress_stream)
+    return progress.summary()
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _write(out, progress, rec):
+    # one line per record, flushed right away: the results file is also the checkpoint
+    out.write(json.dumps(rec, ensure_ascii=False) + '\n')
+    out.flush()
+    progress.record(rec)
+    progress.tick()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch OCR + summarize a directory or manifest of images (resumable).')
+    parser.add_argument('source', help='image directory, or manifest (.json / .jsonl / .txt list of paths)')
+    # not under outputs/: that directory is served over HTTP and swept by the janitor
+    parser.add_argument('-o', '--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_runs'),
+                        help='output directory (results.jsonl, pdfs/, deck.pdf)')
+    parser.add_argument('--ocr-workers', type=int, default=None, help='OCR processes (default: CPU count; 0 = in-process)')
+    parser.add_argument('--llm-workers', type=int, default=4, help='concurrent summarize calls')
+    parser.add_argument('--pdf', action='store_true', help='also write one PDF per image')
+    parser.add_argument('--deck', action='store_true', help='export all ok records into <output>/deck.pdf at the end')
+    parser.add_argument('--fallback-text', action='store_true', help="use the manifest's `text` when OCR returns nothing")
+    parser.add_argument('--deadline', type=float, default=120.0, help='seconds per summarize call (0 = none)')
+    parser.add_argument('--limit', type=int, default=0, help='only the first N items')
+    args = parser.parse_args(argv)
+
+    items = discover(args.source)
+    if args.limit:
+        items = items[:args.limit]
+    summary = run_batch(items, args.output, ocr_workers=args.ocr_workers, llm_workers=args.llm_workers,
+                        pdf=args.pdf, fallback_text=args.fallback_text, deadline_s=args.deadline)
+    if args.deck:
+        from deck_export import export_deck, iter_results_dir
+        deck_path = os.path.join(args.output, 'deck.pdf')
+        stats = export_deck(iter_results_dir(args.output), deck_path)
+        summary['deck'] = {'path': deck_path, **stats}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""Offline benchmarks: synthetic corpus, fake LLM and pipeline throughput runner.
+
+Run from the mvp_app directory, e.g. `python -m bench.run --help`.
+"""
@@ -0,0 +1,99 @@
+"""Confusion-pair matching benchmark: linear `in` scan vs the Aho-Corasick index.
+
+    python -m bench.confusion_bench --pairs 10000 --text-chars 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from confusion_index import ConfusionIndex
+
+# common CJK range; random 2-4 character terms rarely collide with each other
+_CJK_LO, _CJK_HI = 0x4E00, 0x9FA5
+
+
+def synthetic_pairs(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+
+    def term():
+        return ''.join(chr(rng.randint(_CJK_LO, _CJK_HI)) for _ in range(rng.randint(2, 4)))
+
+    return [{'left': term(), 'right': term(), 'explain': '', 'example': ''} for _ in range(n)]
+
+
+def synthetic_text(pairs, chars: int, mentions: int = 20, seed: int = 1) -> str:
+    """Random CJK text of about `chars` characters with `mentions` glossary terms spliced in."""
+    rng = random.Random(seed)
+    parts = [chr(rng.randint(_CJK_LO, _CJK_HI)) for _ in range(chars)]
+    for _ in range(mentions):
+        p = rng.choice(pairs)
+        parts.insert(rng.randrange(len(parts) + 1), p[rng.choice(('left', 'right'))])
+    return ''.join(parts)
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best
+
+
+def run(n_pairs: int = 10000, text_chars: int = 2000, repeat: int = 5, seed: int = 0) -> dict:
+    pairs = synthetic_pairs(n_pairs, seed)
+    text = synthetic_text(pairs, text_chars, seed=seed + 1)
+
+    t0 = time.perf_counter()
+    idx = ConfusionIndex.build(pairs)
+    build_ms = (time.perf_counter() - t0) * 1000.0
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'bench.idx')
+        t0 = time.perf_counter()
+        idx.save(path)
+        save_ms = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        mapped = ConfusionIndex.load(path)
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        size = os.path.getsize(path)
+
+        def linear():
+            return [p for p in pairs if p['left'] in text or p['right'] in text]
+
+        expected = {(p['left'], p['right']) for p in linear()}
+        found = {(p['left'], p['right']) for p in idx.rank(text, limit=n_pairs)}
+        assert found == expected, 'index and linear scan disagree'
+
+        result = {
+            'pairs': n_pairs, 'text_chars': len(text), 'nodes': idx.node_count, 'index_bytes': size,
+            'build_ms': round(build_ms, 1), 'save_ms': round(save_ms, 1), 'load_mmap_ms': round(load_ms, 2),
+            'linear_ms': round(_best_ms(linear, repeat), 3),
+            'index_ms': round(_best_ms(lambda: idx.rank(text), repeat), 3),
+            'mmap_index_ms': round(_best_ms(lambda: mapped.rank(text), repeat), 3),
+            'matched_pairs': len(found),
+        }
+        del mapped
+    result['speedup'] = round(result['linear_ms'] / result['index_ms'], 1) if result['index_ms'] else None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark confusion-pair matching at glossary scale.')
+    parser.add_argument('--pairs', type=int, default=10000)
+    parser.add_argument('--text-chars', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    result = run(args.pairs, args.text_chars, args.repeat, args.seed)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
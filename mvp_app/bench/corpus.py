@@ -0,0 +1,56 @@
+import os
+import json
+import random
+
+from demo_run import create_image_with_text, printed_text, handwritten_text
+
+SIZES = {'small': (800, 400), 'medium': (1600, 1000), 'large': (2480, 1754)}
+
+TEXTS = {
+    'zh': [printed_text, handwritten_text,
+           "行列式与矩阵：矩阵是线性代数的基本对象，行列式是矩阵的一个标量特征。\n"
+           "概率与频率：概率是理论值，频率是实验中观察到的比率。"],
+    'en': ["Derivative: the instantaneous rate of change of a function at a point.\n"
+           "Example: if s(t) is position then velocity v(t) = s'(t).\n"
+           "Note: a differential approximates a small increment, it is not the derivative.",
+           "Partial vs total derivative: a partial derivative varies one variable only,\n"
+           "while the total derivative accounts for all variables changing together."],
+    'mixed': ["导数 derivative：函数在某点的瞬时变化率 (rate of change)。\n"
+              "Matrix 矩阵 vs determinant 行列式：scale factor of the linear map。\n"
+              "Probability 概率 is theoretical; frequency 频率 is observed."],
+}
+
+
+def _page_text(lang: str, size, rng) -> str:
+    """Fill roughly the height of the page with paragraphs of the given language."""
+    lines_fit = max(2, (size[1] - 40) // 28)
+    lines = []
+    while len(lines) < lines_fit:
+        lines.extend(rng.choice(TEXTS[lang]).split('\n'))
+    return '\n'.join(lines[:lines_fit])
+
+
+def generate_corpus(out_dir: str, sizes=('small', 'medium'), languages=('zh', 'en', 'mixed'),
+                    styles=('printed', 'handwritten'), per_combo: int = 1, seed: int = 0):
+    """Render a deterministic synthetic corpus and return its manifest.
+
+    Each entry is {'id', 'path', 'text', 'lang', 'size', 'style'}; `text` is the ground truth
+    used when Tesseract is unavailable. Existing images are reused, so re-runs are cheap.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for size_name in sizes:
+        size = SIZES[size_name]
+        for lang in languages:
+            for style in styles:
+                for i in range(per_combo):
+                    item_id = f'{size_name}-{lang}-{style}-{i}'
+                    text = _page_text(lang, size, rng)
+                    path = os.path.join(out_dir, item_id + '.png')
+                    if not os.path.exists(path):
+                        create_image_with_text(text, path, size=size, handwritten=(style == 'handwritten'))
+                    manifest.append({'id': item_id, 'path': path, 'text': text, 'lang': lang, 'size': size_name, 'style': style})
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
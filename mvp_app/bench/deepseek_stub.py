@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque, Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench.fake_llm import FakeLLM
+
+ALL_FORMATS = ('text', 'prompt', 'prompt_with_model', 'input', 'input_wrapped',
+               'openai_chat_simple_nomodel', 'openai_chat_system_nomodel', 'openai_chat_simple', 'openai_chat_system')
+
+
+def detect_format(body) -> str:
+    """Name the payload shape using the same names call_deepseek gives its formats."""
+    if not isinstance(body, dict):
+        return 'unknown'
+    has_model = 'model' in body
+    if isinstance(body.get('messages'), list):
+        system = any(isinstance(m, dict) and m.get('role') == 'system' for m in body['messages'])
+        kind = 'openai_chat_system' if system else 'openai_chat_simple'
+        return kind if has_model else kind + '_nomodel'
+    if 'prompt' in body:
+        return 'prompt_with_model' if has_model else 'prompt'
+    if 'input' in body:
+        return 'input_wrapped' if isinstance(body['input'], dict) else 'input'
+    if 'text' in body:
+        return 'text'
+    return 'unknown'
+
+
+def extract_prompt(body, fmt: str) -> str:
+    if fmt.startswith('openai_chat'):
+        return str(body['messages'][-1].get('content', ''))
+    if fmt.startswith('prompt'):
+        return str(body['prompt'])
+    if fmt == 'input_wrapped':
+        return str(body['input'].get('text', ''))
+    if fmt == 'input':
+        return str(body['input'])
+    return str(body.get('text', ''))
+
+
+class StubConfig:
+    """Behaviour of the stub. Rates are probabilities per request; rpm=0 disables 403 limiting."""
+
+    def __init__(self, accept=ALL_FORMATS, latency_ms: float = 100.0, jitter_ms: float = 0.0, rpm: int = 0,
+                 error_400_rate: float = 0.0, malformed_rate: float = 0.0, api_key=None, seed: int = 0):
+        self.accept = set(accept)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rpm = rpm
+        self.error_400_rate = error_400_rate
+        self.malformed_rate = malformed_rate
+        self.api_key = api_key
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = deque()
+        self.stats = Counter()
+        self.answer = FakeLLM(latency_ms=0)
+
+    def rate_limited(self) -> bool:
+        if not self.rpm:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.window and now - self.window[0] > 60:
+                self.window.popleft()
+            if len(self.window) >= self.rpm:
+                return True
+            self.window.append(now)
+            return False
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+
+def make_handler(cfg: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, payload, raw: bytes = None):
+            data = raw if raw is not None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/stats':
+                with cfg.lock:
+                    self._send(200, dict(cfg.stats))
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            if cfg.api_key and self.headers.get('Authorization') != f'Bearer {cfg.api_key}':
+                return self._reply(401, 'unauthorized', {'error': 'invalid api key'})
+            try:
+                body = json.loads(raw.decode('utf-8'))
+            except ValueError:
+                return self._reply(400, 'bad_json', {'error': 'request body is not JSON'})
+            fmt = detect_format(body)
+            if cfg.rate_limited():
+                return self._reply(403, 'rpm_limited', {'error': 'RPM limit exceeded'})
+            if fmt not in cfg.accept:
+                msg = 'Model does not exist' if 'model' in body else f'unsupported payload: {fmt}'
+                return self._reply(400, f'rejected:{fmt}', {'error': msg})
+            if cfg.roll(cfg.error_400_rate):
+                return self._reply(400, 'injected_400', {'error': 'invalid parameter'})
+
+            delay = cfg.latency_ms + (cfg.rng.uniform(-cfg.jitter_ms, cfg.jitter_ms) if cfg.jitter_ms else 0.0)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            if cfg.roll(cfg.malformed_rate):
+                return self._reply(200, 'malformed', None, raw=b'{"choices": [{"message": {"content": "{\\"learn')
+            content = cfg.answer(extract_prompt(body, fmt))
+            if fmt.startswith('openai_chat'):
+                payload = {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+            elif fmt.startswith('prompt'):
+                payload = {'choices': [{'text': content}]}
+            else:
+                payload = {'text': content}
+            return self._reply(200, f'ok:{fmt}', payload)
+
+        def _reply(self, status, stat, payload, raw=None):
+            with cfg.lock:
+                cfg.stats[stat] += 1
+                cfg.stats['requests'] += 1
+            self._send(status, payload, raw)
+
+    return Handler
+
+
+def serve(cfg: StubConfig, host: str = '127.0.0.1', port: int = 0):
+    """Start the stub in a daemon thread; returns (server, base_url). Call server.shutdown() to stop."""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='deepseek-stub', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local DeepSeek stand-in speaking every payload shape call_deepseek probes.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--accept', default=','.join(ALL_FORMATS), help='comma list of accepted payload formats')
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--rpm', type=int, default=0, help='answer 403 beyond this many requests per minute')
+    parser.add_argument('--error-400-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--api-key', default=None)
+    args = parser.parse_args(argv)
+
+    cfg = StubConfig(accept=[f for f in args.accept.split(',') if f], latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     rpm=args.rpm, error_400_rate=args.error_400_rate, malformed_rate=args.malformed_rate, api_key=args.api_key)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    server.daemon_threads = True
+    print(f'DeepSeek stub listening on http://{args.host}:{args.port} (set DEEPSEEK_URL to this)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Throughput of the extractive backend on synthetic pages (text only, no OCR).
+
+    python -m bench.extractive_bench --pages 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+from bench.corpus import TEXTS, SIZES, _page_text
+from extractive import extractive_summarize
+
+
+def synthetic_pages(n: int, size: str = 'medium', seed: int = 0) -> list:
+    rng = random.Random(seed)
+    langs = sorted(TEXTS)
+    return [_page_text(langs[i % len(langs)], SIZES[size], rng) for i in range(n)]
+
+
+def run(pages: int = 200, size: str = 'medium', seed: int = 0) -> dict:
+    texts = synthetic_pages(pages, size, seed)
+    extractive_summarize(texts[0])  # numpy and glossary index load outside the timed loop
+    per_page = []
+    t0 = time.perf_counter()
+    for t in texts:
+        t1 = time.perf_counter()
+        extractive_summarize(t)
+        per_page.append((time.perf_counter() - t1) * 1000.0)
+    wall = time.perf_counter() - t0
+    return {
+        'pages': pages, 'size': size, 'avg_chars': round(sum(map(len, texts)) / len(texts)),
+        'pages_per_s': round(pages / wall, 1) if wall else None,
+        'ms_per_page': {'p50': round(metrics.percentile(per_page, 50), 3),
+                        'p95': round(metrics.percentile(per_page, 95), 3),
+                        'max': round(max(per_page), 3)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the extractive summarizer backend.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--size', choices=sorted(SIZES), default='medium')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    result = run(args.pages, args.size, args.seed)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
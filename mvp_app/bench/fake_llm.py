@@ -0,0 +1,58 @@
+import os
+import json
+import time
+import random
+import hashlib
+from contextlib import contextmanager
+
+from summarizer import OCR_MARKER
+
+
+class FakeLLM:
+    """Deterministic stand-in for call_deepseek with configurable latency.
+
+    The answer is derived from the OCR text embedded at the end of the prompt, so the
+    same input always gives the same JSON. Latency is latency_ms +/- jitter_ms drawn
+    from a seeded RNG; set fail_rate to make a fraction of calls raise.
+    """
+
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def __call__(self, prompt: str, max_tokens: int = 800, temperature: float = 0.0, **kwargs) -> str:
+        self.calls += 1
+        delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if self.fail_rate and self._rng.random() < self.fail_rate:
+            raise RuntimeError('FakeLLM injected failure')
+        text = prompt.split(OCR_MARKER)[-1]
+        lines = [l.strip() for l in text.split('\n') if l.strip()]
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+        return json.dumps({
+            'learn_points': [l[:15] for l in lines[:6]] or [f'要点 {digest}'],
+            'confusions': [{'left': '导数', 'right': '微分', 'explain': f'fake {digest}', 'example': '速度 vs 小增量'}],
+        }, ensure_ascii=False)
+
+
+@contextmanager
+def installed(fake: FakeLLM):
+    """Route summarize() through the DeepSeek branch backed by fake for the duration."""
+    import deepseek_client
+    saved_env = {k: os.environ.get(k) for k in ('LLM_BACKEND', 'DEEPSEEK_URL', 'DEEPSEEK_API_KEY')}
+    original = deepseek_client.call_deepseek
+    os.environ.update({'LLM_BACKEND': 'deepseek', 'DEEPSEEK_URL': 'http://fake-llm.invalid', 'DEEPSEEK_API_KEY': 'fake'})
+    deepseek_client.call_deepseek = fake
+    try:
+        yield fake
+    finally:
+        deepseek_client.call_deepseek = original
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
@@ -0,0 +1,126 @@
+"""Perceptual-hash cost versus preprocess + OCR cost, plus match quality and lookup latency.
+
+    python -m bench.image_hash_bench --entries 100000
+
+Renders the synthetic corpus, then for each page times `image_hashes()` against
+`preprocess_image()` + Tesseract (reported as unavailable when the binary is missing).
+Re-shot copies (small crop, brightness change, JPEG q70; optionally a slight rotation)
+are looked up in an index holding the originals plus `entries` random hashes, which
+gives the hit rate, the number of wrong-page matches and the lookup latency.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import image_hash
+from image_hash import ImageHashIndex, image_hashes
+from bench.corpus import generate_corpus
+
+
+def reshoot(path: str, rng, rotate: float = 0.0, crop: float = 0.01):
+    """A re-photographed copy of the page as JPEG bytes."""
+    from PIL import Image, ImageEnhance
+    img = Image.open(path).convert('RGB')
+    if rotate:
+        img = img.rotate(rng.uniform(-rotate, rotate), fillcolor='white')
+    w, h = img.size
+    dx, dy = int(w * crop), int(h * crop)
+    img = img.crop((rng.randint(0, dx), rng.randint(0, dy), w - rng.randint(0, dx), h - rng.randint(0, dy)))
+    img = ImageEnhance.Brightness(img).enhance(rng.uniform(0.85, 1.15))
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=70)
+    buf.seek(0)
+    return buf
+
+
+def _ms(values):
+    return {'p50': round(metrics.percentile(values, 50), 3), 'p99': round(metrics.percentile(values, 99), 3),
+            'max': round(max(values), 3)}
+
+
+def _random_hashes(rng):
+    return rng.getrandbits(image_hash.DHASH_SIZE ** 2), rng.getrandbits(image_hash.PHASH_SIZE ** 2)
+
+
+def run(entries: int = 10000, shots: int = 3, rotate: float = 0.0, seed: int = 0, corpus_dir=None) -> dict:
+    from ocr_utils import preprocess_image, tesseract_ocr
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as d:
+        manifest = generate_corpus(corpus_dir or os.path.join(d, 'corpus'), sizes=('small', 'medium', 'large'))
+
+        hash_ms, pre_ms, ocr_ms = [], [], []
+        ocr_available = False
+        originals = []
+        for item in manifest:
+            t0 = time.perf_counter()
+            hashes = image_hashes(item['path'])
+            t1 = time.perf_counter()
+            img = preprocess_image(item['path'])
+            t2 = time.perf_counter()
+            text = tesseract_ocr(img)
+            t3 = time.perf_counter()
+            ocr_available = ocr_available or bool(text and text.strip())
+            hash_ms.append((t1 - t0) * 1000.0)
+            pre_ms.append((t2 - t1) * 1000.0)
+            ocr_ms.append((t3 - t2) * 1000.0)
+            originals.append((hashes, item['text'], {'learn_points': [item['id']], 'confusions': []}))
+
+        idx = ImageHashIndex(os.path.join(d, 'bench.sqlite'))
+        noise = [(_random_hashes(rng), 'synthetic', None) for _ in range(entries)]
+        t0 = time.perf_counter()
+        idx.add_many(noise)
+        idx.add_many(originals)
+        idx.nearest((0, 0))  # loads the in-memory index
+        load_s = time.perf_counter() - t0
+
+        lookup_ms = []
+        hits = wrong = total = 0
+        for item in manifest:
+            for _ in range(shots):
+                shot = image_hashes(reshoot(item['path'], rng, rotate))
+                t1 = time.perf_counter()
+                found = idx.lookup(shot)
+                lookup_ms.append((time.perf_counter() - t1) * 1000.0)
+                total += 1
+                if found is not None:
+                    hits += found['ocr_text'] == item['text']
+                    wrong += found['ocr_text'] != item['text']
+        count = idx.count()
+        idx.close()
+
+    per_page = {'hash_ms': _ms(hash_ms), 'preprocess_ms': _ms(pre_ms)}
+    if ocr_available:
+        per_page['ocr_ms'] = _ms(ocr_ms)
+        per_page['speedup_p50'] = round((metrics.percentile(pre_ms, 50) + metrics.percentile(ocr_ms, 50))
+                                        / metrics.percentile(hash_ms, 50), 1)
+    else:
+        per_page['ocr_ms'] = None
+        per_page['note'] = 'tesseract unavailable; OCR cost not measured (typically seconds per page)'
+    return {'pages': len(manifest), **per_page, 'entries': count, 'load_s': round(load_s, 2),
+            'lookup_ms': _ms(lookup_ms), 'reshoots': total, 'hit_rate': round(hits / total, 3),
+            'wrong_page_matches': wrong,
+            'max_distance': idx.max_distance, 'max_phash_distance': idx.max_phash_distance}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark perceptual hashing against preprocess + OCR.')
+    parser.add_argument('--entries', type=int, default=100000, help='random hashes added to the index')
+    parser.add_argument('--shots', type=int, default=3, help='re-shot copies per page')
+    parser.add_argument('--rotate', type=float, default=0.0, help='max rotation (degrees) of re-shots')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', default=None, help='reuse rendered pages in this directory')
+    args = parser.parse_args(argv)
+    result = run(args.entries, args.shots, args.rotate, args.seed, args.corpus)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+from bench.corpus import generate_corpus
+
+
+def _one_upload(session, url: str, path: str, timeout: float):
+    t0 = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            resp = session.post(url, files={'image': (os.path.basename(path), f, 'image/png')}, timeout=timeout)
+        outcome = str(resp.status_code)
+    except Exception as e:
+        outcome = type(e).__name__
+    return outcome, (time.perf_counter() - t0) * 1000.0
+
+
+def run_load(url: str, paths, concurrency: int = 4, total: int = 20, timeout: float = 300.0, progress=None) -> dict:
+    """Fire `total` multipart uploads at url from `concurrency` threads; returns latency and error mix."""
+    import requests
+
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, 's'):
+            local.s = requests.Session()
+        return local.s
+
+    outcomes = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def task(i):
+        outcome, ms = _one_upload(session(), url, paths[i % len(paths)], timeout)
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == '200':
+                latencies.append(ms)
+            done = sum(outcomes.values())
+        if progress:
+            progress(done, total)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(task, range(total)))
+    wall = time.perf_counter() - t0
+    ok = outcomes.get('200', 0)
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'wall_s': wall,
+        'throughput_per_s': ok / wall if wall else None,
+        'latency_ms': {q: metrics.percentile(latencies, int(q[1:])) for q in ('p50', 'p95', 'p99')},
+        'max_ms': max(latencies) if latencies else None,
+        'outcomes': dict(outcomes),
+        'error_rate': 1 - ok / total if total else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent multipart upload load test for the /upload endpoint.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/upload')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--images', nargs='*', help='images to upload (default: generated synthetic corpus)')
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'learncard_bench_corpus'))
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    paths = args.images or [e['path'] for e in generate_corpus(args.corpus_dir, sizes=('small', 'medium'))]
+
+    def progress(done, total):
+        if not args.json:
+            print(f'\r{done}/{total}', end='', file=sys.stderr, flush=True)
+
+    report = run_load(args.url, paths, concurrency=args.concurrency, total=args.requests, timeout=args.timeout, progress=progress)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+    lat = report['latency_ms']
+    print(file=sys.stderr)
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, {report['wall_s']:.2f}s wall")
+    print(f"throughput {report['throughput_per_s'] or 0:.2f} ok/s, error rate {report['error_rate']:.1%}")
+    if lat['p50'] is not None:
+        print(f"latency p50 {lat['p50']:.0f} ms  p95 {lat['p95']:.0f} ms  p99 {lat['p99']:.0f} ms  max {report['max_ms']:.0f} ms")
+    print('outcomes: ' + ', '.join(f'{k}={v}' for k, v in sorted(report['outcomes'].items())))
+    return report
+
+
+if __name__ == '__main__':
+    main()
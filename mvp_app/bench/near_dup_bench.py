@@ -0,0 +1,91 @@
+"""Near-duplicate index lookup latency at scale.
+
+    python -m bench.near_dup_bench --entries 1000000 --queries 2000
+
+Fills a fresh sqlite index with random signatures plus a few real pages, then times
+`nearest()` for perturbed copies of the real pages (hits) and unrelated pages (misses).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import near_dup
+from near_dup import NearDupIndex, minhash
+from bench.corpus import TEXTS
+
+
+def _perturb(text: str, rng, rate: float = 0.01) -> str:
+    chars = list(text)
+    for _ in range(max(1, int(len(chars) * rate))):
+        chars[rng.randrange(len(chars))] = rng.choice('的一是了口日目·,.')
+    return ''.join(chars).replace('\n', ' \n ')
+
+
+def _ms(values):
+    return {'p50': round(metrics.percentile(values, 50), 4), 'p99': round(metrics.percentile(values, 99), 4),
+            'max': round(max(values), 4)}
+
+
+def run(entries: int = 100000, queries: int = 1000, seed: int = 0, db_path=None, batch: int = 50000) -> dict:
+    import numpy as np
+    rng = random.Random(seed)
+    nprng = np.random.default_rng(seed)
+    pages = [t for texts in TEXTS.values() for t in texts]
+
+    with tempfile.TemporaryDirectory() as d:
+        idx = NearDupIndex(db_path or os.path.join(d, 'bench.sqlite'))
+        t0 = time.perf_counter()
+        for start in range(0, entries, batch):
+            n = min(batch, entries - start)
+            sigs = nprng.integers(0, (1 << 61) - 1, size=(n, near_dup.NUM_PERM), dtype=np.uint64)
+            idx.add_signatures(sigs, {'learn_points': ['synthetic'], 'confusions': []})
+        for i, p in enumerate(pages):
+            idx.add(p, {'learn_points': [f'page {i}'], 'confusions': []})
+        fill_s = time.perf_counter() - t0
+
+        hit_ms, miss_ms, full_ms = [], [], []
+        hits = 0
+        for q in range(queries):
+            page = pages[q % len(pages)]
+            sig = minhash(_perturb(page, rng))
+            t1 = time.perf_counter()
+            best = idx.nearest(sig)
+            hit_ms.append((time.perf_counter() - t1) * 1000.0)
+            hits += best is not None and best[1] >= idx.threshold
+
+            other = minhash(''.join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(200)))
+            t1 = time.perf_counter()
+            idx.nearest(other)
+            miss_ms.append((time.perf_counter() - t1) * 1000.0)
+
+            t1 = time.perf_counter()
+            idx.lookup(_perturb(page, rng))
+            full_ms.append((time.perf_counter() - t1) * 1000.0)
+        count = idx.count()
+        idx.close()
+
+    return {'entries': count, 'fill_s': round(fill_s, 2), 'queries': queries,
+            'hit_rate': round(hits / queries, 3), 'nearest_hit_ms': _ms(hit_ms), 'nearest_miss_ms': _ms(miss_ms),
+            'lookup_with_minhash_ms': _ms(full_ms)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark near-duplicate lookups at scale.')
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default=None, help='keep the filled index at this path instead of a temp dir')
+    args = parser.parse_args(argv)
+    result = run(args.entries, args.queries, args.seed, args.db)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result
+
+
+if __name__ == '__main__':
+    main()
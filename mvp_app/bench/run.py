@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+from bench.corpus import generate_corpus, SIZES
+from bench.fake_llm import FakeLLM, installed
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = os.path.join(BENCH_DIR, 'history.json')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+STAGES = ('preprocess_image', 'ocr', 'summarize', 'generate_pdf', 'end_to_end')
+
+
+def run_pipeline(manifest, out_dir: str, repeat: int = 1):
+    """Run preprocess → OCR → summarize → PDF over the corpus; returns per-item stage timings (ms)."""
+    from ocr_utils import preprocess_image, tesseract_ocr
+    from summarizer import summarize, generate_pdf
+
+    os.makedirs(out_dir, exist_ok=True)
+    samples = []
+    for r in range(repeat):
+        for item in manifest:
+            t = {}
+            t0 = time.perf_counter()
+            img = preprocess_image(item['path'])
+            t1 = time.perf_counter()
+            text = tesseract_ocr(img)
+            t2 = time.perf_counter()
+            ocr_available = bool(text and text.strip())
+            if not ocr_available:
+                # same policy as demo_run: fall back to ground truth when Tesseract is missing
+                text = item['text']
+            result = summarize(text)
+            t3 = time.perf_counter()
+            generate_pdf(result, item['path'], os.path.join(out_dir, f"{item['id']}.pdf"))
+            t4 = time.perf_counter()
+            t.update(preprocess_image=(t1 - t0) * 1000, ocr=(t2 - t1) * 1000, summarize=(t3 - t2) * 1000,
+                     generate_pdf=(t4 - t3) * 1000, end_to_end=(t4 - t0) * 1000)
+            samples.append({'id': item['id'], 'size': item['size'], 'lang': item['lang'], 'style': item['style'],
+                            'ocr_available': ocr_available, 'ms': t})
+    return samples
+
+
+def aggregate(samples, wall_s: float) -> dict:
+    stages = {}
+    for name in STAGES:
+        vals = [s['ms'][name] for s in samples]
+        stages[name] = {'p50': metrics.percentile(vals, 50), 'p95': metrics.percentile(vals, 95),
+                        'mean': sum(vals) / len(vals) if vals else None, 'max': max(vals) if vals else None}
+    by_size = {}
+    for s in samples:
+        by_size.setdefault(s['size'], []).append(s['ms']['end_to_end'])
+    return {
+        'items': len(samples),
+        'wall_s': wall_s,
+        'throughput_per_s': len(samples) / wall_s if wall_s else None,
+        'stages': stages,
+        'end_to_end_p50_by_size': {k: metrics.percentile(v, 50) for k, v in sorted(by_size.items())},
+        'ocr_available': any(s['ocr_available'] for s in samples),
+    }
+
+
+def find_regressions(summary: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 5.0):
+    """Stages whose p50 or p95 grew by more than tolerance (and min_delta_ms) over the baseline."""
+    regressions = []
+    for name, cur in summary.get('stages', {}).items():
+        base = (baseline.get('stages') or {}).get(name)
+        if not base:
+            continue
+        for q in ('p50', 'p95'):
+            b, c = base.get(q), cur.get(q)
+            if b is None or c is None:
+                continue
+            if c > b * (1 + tolerance) and c - b > min_delta_ms:
+                regressions.append({'stage': name, 'quantile': q, 'baseline_ms': b, 'current_ms': c, 'ratio': c / b if b else None})
+    return regressions
+
+
+def stage_table(summary: dict) -> str:
+    """Plain-text p50/p95/mean table, '-' where a stage has no samples."""
+    def fmt(v):
+        return '-' if v is None else format(v, '.1f')
+
+    lines = [f"{'stage':<18} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}"]
+    for name, st in summary['stages'].items():
+        lines.append(f"{name:<18} {fmt(st['p50']):>10} {fmt(st['p95']):>10} {fmt(st['mean']):>10}")
+    return '\n'.join(lines)
+
+
+def append_history(record: dict, path: str = HISTORY_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    history = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except ValueError:
+            history = []
+    history.append(record)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline end-to-end pipeline benchmark with a fake LLM.')
+    parser.add_argument('--sizes', default='small,medium', help=f'comma list from {sorted(SIZES)}')
+    parser.add_argument('--languages', default='zh,en,mixed')
+    parser.add_argument('--per-combo', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--llm-latency-ms', type=float, default=200.0)
+    parser.add_argument('--llm-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'learncard_bench_corpus'))
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(args.corpus_dir, sizes=args.sizes.split(','), languages=args.languages.split(','),
+                               per_combo=args.per_combo)
+    fake = FakeLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms)
+    with installed(fake):
+        t0 = time.perf_counter()
+        samples = run_pipeline(manifest, os.path.join(args.corpus_dir, 'pdf'), repeat=args.repeat)
+        wall = time.perf_counter() - t0
+
+    summary = aggregate(samples, wall)
+    record = {
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'config': {'sizes': args.sizes, 'languages': args.languages, 'per_combo': args.per_combo, 'repeat': args.repeat,
+                   'llm_latency_ms': args.llm_latency_ms, 'llm_jitter_ms': args.llm_jitter_ms},
+        'summary': summary,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(summary, json.load(f).get('summary', {}), tolerance=args.tolerance)
+    record['regressions'] = regressions
+    append_history(record, args.history)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+
+    print(f"{summary['items']} items in {wall:.2f}s ({summary['throughput_per_s']:.2f}/s), OCR available: {summary['ocr_available']}")
+    print(stage_table(summary))
+    for r in regressions:
+        print(f"REGRESSION {r['stage']} {r['quantile']}: {r['baseline_ms']:.1f} -> {r['current_ms']:.1f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+from collections import deque
+
+import metrics
+import deadline as deadlines
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_rejected = metrics.REGISTRY.counter('learncard_circuit_rejected_total', 'Calls short-circuited by an open breaker.', ('backend',))
+circuit_transitions = metrics.REGISTRY.counter('learncard_circuit_transitions_total', 'Breaker state changes.', ('backend', 'state'))
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of recent call outcomes.
+
+    Closed: calls pass; once at least min_calls of the last `window` calls are recorded
+    and the failure rate reaches failure_rate, the breaker opens. Open: calls are rejected
+    until open_s has passed, then the breaker goes half-open. Half-open: up to
+    `probes` calls are let through; a success closes the breaker, a failure re-opens it.
+    Thread-safe; one instance is shared by all request threads.
+    """
+
+    def __init__(self, backend: str, endpoint: str = '', window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 open_s: float = 30.0, probes: int = 1, clock=time.monotonic):
+        self.backend = backend
+        self.endpoint = endpoint
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_s = open_s
+        self.probes = probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            circuit_transitions.inc(backend=self.backend, state=state)
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_s:
+            self._set_state(HALF_OPEN)
+            self._probes_in_flight = 0
+
+    def _open(self):
+        self._set_state(OPEN)
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """True if a call may proceed; in half-open state this reserves a probe slot."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+        circuit_rejected.inc(backend=self.backend)
+        return False
+
+    def release(self):
+        """Give back a half-open probe slot reserved by allow() when no call was made."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._set_state(CLOSED)
+                self._outcomes.clear()
+                self._probes_in_flight = 0
+            else:
+                self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            n = len(self._outcomes)
+            if self._state == CLOSED and n >= self.min_calls and self._outcomes.count(False) / n >= self.failure_rate:
+                self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._maybe_half_open()
+            n = len(self._outcomes)
+            return {'state': self._state, 'calls': n,
+                    'failure_rate': round(self._outcomes.count(False) / n, 3) if n else 0.0,
+                    'rejected': self.rejected}
+
+
+class BreakerRegistry:
+    """Process-wide breakers keyed by (backend, endpoint), created from CB_* settings on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, backend: str, endpoint: str = '') -> CircuitBreaker:
+        key = (backend, endpoint)
+        b = self._breakers.get(key)
+        if b is None:
+            with self._lock:
+                b = self._breakers.get(key)
+                if b is None:
+                    b = self._breakers[key] = CircuitBreaker(
+                        backend, endpoint,
+                        window=deadlines.env('CB_WINDOW', '20', int),
+                        min_calls=deadlines.env('CB_MIN_CALLS', '5', int),
+                        failure_rate=deadlines.env('CB_FAILURE_RATE', '0.5'),
+                        open_s=deadlines.env('CB_OPEN_S', '30'),
+                        probes=deadlines.env('CB_HALF_OPEN_PROBES', '1', int),
+                    )
+        return b
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._breakers.items())
+        return {f'{b} {e}'.strip(): br.stats() for (b, e), br in items}
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._breakers.items())
+        lines = ['# HELP learncard_circuit_state Breaker state (0 closed, 1 half-open, 2 open).',
+                 '# TYPE learncard_circuit_state gauge']
+        for (backend, endpoint), br in items:
+            lines.append(f'learncard_circuit_state{{backend="{backend}",endpoint="{metrics._escape(endpoint)}"}} '
+                         f'{_STATE_VALUE[br.state]}')
+        return lines
+
+
+breakers = BreakerRegistry()
+metrics.REGISTRY.register_collector(breakers.render)
+
+
+def enabled() -> bool:
+    return os.getenv('CIRCUIT_BREAKER_ENABLED', '1') == '1'
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import mmap
+import array
+import struct
+import bisect
+import tempfile
+import threading
+from collections import deque
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+GLOSSARY_FILE = os.path.join(DATA_DIR, 'confusion_glossary.tsv')
+
+_MAGIC = b'LCAC'
+_VERSION = 1
+# magic, version, byteorder, n_nodes, n_edges, source size, source mtime_ns, meta length; padded to 64 bytes
+_HEADER = struct.Struct('<4sIIIIQQI')
+_HEADER_SIZE = 64
+_NONE = 0xFFFFFFFF
+# read once at import: os.umask can only be queried by setting it, which races with other threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def load_glossary(path: str) -> list:
+    """Read a tab-separated glossary (left, right, explain, example); '#' starts a comment line."""
+    pairs = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            cols = line.split('\t')
+            if len(cols) < 2 or not cols[0].strip() or not cols[1].strip():
+                continue
+            left, right = cols[0].strip(), cols[1].strip()
+            if (left, right) in seen:
+                continue
+            seen.add((left, right))
+            pairs.append({'left': left, 'right': right,
+                          'explain': cols[2].strip() if len(cols) > 2 else '',
+                          'example': cols[3].strip() if len(cols) > 3 else ''})
+    return pairs
+
+
+def _u32(values=()):
+    a = array.array('I', values)
+    assert a.itemsize == 4
+    return a
+
+
+class ConfusionIndex:
+    """Aho-Corasick automaton over every left/right term of a confusion glossary.
+
+    The automaton is stored as flat uint32 arrays (CSR edges sorted by code point,
+    failure links, terminal term ids and dictionary-suffix links), so the same code
+    matches against freshly built arrays or zero-copy memoryviews over an mmap'ed
+    prebuilt file. `find` makes a single pass over the text regardless of glossary size.
+    """
+
+    def __init__(self, pairs, terms, term_pairs, edge_start, edge_char, edge_target, fail, term_at, dict_link):
+        self.pairs = pairs
+        self.terms = terms
+        self.term_pairs = term_pairs
+        self._edge_start = edge_start
+        self._edge_char = edge_char
+        self._edge_target = edge_target
+        self._fail = fail
+        self._term_at = term_at
+        self._dict_link = dict_link
+        self._term_len = [len(t) for t in terms]
+        # almost every character restarts at the root, so keep its fan-out in a dict
+        self._root = {edge_char[j]: edge_target[j] for j in range(edge_start[0], edge_start[1])}
+
+    @property
+    def node_count(self) -> int:
+        return len(self._fail)
+
+    @classmethod
+    def build(cls, pairs):
+        terms = []
+        term_ids = {}
+        term_pairs = []
+        for i, p in enumerate(pairs):
+            for t in (p['left'], p['right']):
+                t = t.lower()
+                tid = term_ids.get(t)
+                if tid is None:
+                    tid = term_ids[t] = len(terms)
+                    terms.append(t)
+                    term_pairs.append([])
+                if i not in term_pairs[tid]:
+                    term_pairs[tid].append(i)
+
+        goto = [{}]
+        term_at = [_NONE]
+        for tid, t in enumerate(terms):
+            node = 0
+            for ch in t:
+                c = ord(ch)
+                nxt = goto[node].get(c)
+                if nxt is None:
+                    nxt = goto[node][c] = len(goto)
+                    goto.append({})
+                    term_at.append(_NONE)
+                node = nxt
+            term_at[node] = tid
+
+        n = len(goto)
+        fail = [0] * n
+        dict_link = [0] * n
+        q = deque(goto[0].values())
+        while q:
+            u = q.popleft()
+            for c, v in goto[u].items():
+                f = fail[u]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                w = goto[f].get(c, 0) if u else 0
+                fail[v] = w if w != v else 0
+                dict_link[v] = fail[v] if term_at[fail[v]] != _NONE else dict_link[fail[v]]
+                q.append(v)
+
+        edge_start, edge_char, edge_target = _u32([0]), _u32(), _u32()
+        for edges in goto:
+            for c in sorted(edges):
+                edge_char.append(c)
+                edge_target.append(edges[c])
+            edge_start.append(len(edge_char))
+        return cls(list(pairs), terms, term_pairs, edge_start, edge_char, edge_target,
+                   _u32(fail), _u32(term_at), _u32(dict_link))
+
+    # -- persistence --------------------------------------------------------------
+
+    def save(self, path: str, source_stat=(0, 0)):
+        """Write the prebuilt form; source_stat (size, mtime_ns) identifies the glossary it came from."""
+        meta = json.dumps({'pairs': self.pairs, 'terms': self.terms, 'term_pairs': self.term_pairs},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        header = _HEADER.pack(_MAGIC, _VERSION, 1 if sys.byteorder == 'little' else 0, self.node_count,
+                              len(self._edge_char), source_stat[0], source_stat[1], len(meta))
+        # unique temp name in the target directory: concurrent writers (worker processes) never share it
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(os.path.abspath(path)),
+                                         prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as f:
+            try:
+                f.write(header.ljust(_HEADER_SIZE, b'\0'))
+                for arr in (self._edge_start, self._edge_char, self._edge_target, self._fail, self._term_at, self._dict_link):
+                    f.write(_u32(arr).tobytes())
+                f.write(meta)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        # NamedTemporaryFile creates 0600; give the index the mode a plain open() would
+        os.chmod(f.name, 0o666 & ~_UMASK)
+        os.replace(f.name, path)
+
+    @staticmethod
+    def read_header(path: str):
+        with open(path, 'rb') as f:
+            raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            return None
+        magic, version, little, nodes, edges, src_size, src_mtime, meta_len = _HEADER.unpack(raw)
+        if magic != _MAGIC or version != _VERSION or bool(little) != (sys.byteorder == 'little'):
+            return None
+        return {'nodes': nodes, 'edges': edges, 'source_stat': (src_size, src_mtime), 'meta_len': meta_len}
+
+    @classmethod
+    def load(cls, path: str):
+        """Map a prebuilt index file; the automaton arrays are views over the mapping, not copies."""
+        hdr = cls.read_header(path)
+        if hdr is None:
+            raise ValueError(f'not a confusion index: {path}')
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        nodes, edges = hdr['nodes'], hdr['edges']
+        off = _HEADER_SIZE
+        arrays = []
+        for count in (nodes + 1, edges, edges, nodes, nodes, nodes):
+            arrays.append(view[off:off + count * 4].cast('I'))
+            off += count * 4
+        meta = json.loads(bytes(view[off:off + hdr['meta_len']]).decode('utf-8'))
+        idx = cls(meta['pairs'], meta['terms'], meta['term_pairs'], *arrays)
+        idx._mmap = mm
+        return idx
+
+    # -- matching -----------------------------------------------------------------
+
+    def _goto(self, node: int, c: int) -> int:
+        if node == 0:
+            return self._root.get(c, 0)
+        lo, hi = self._edge_start[node], self._edge_start[node + 1]
+        j = bisect.bisect_left(self._edge_char, c, lo, hi)
+        if j < hi and self._edge_char[j] == c:
+            return self._edge_target[j]
+        return 0
+
+    def find(self, text: str):
+        """Yield (term_id, start) for every occurrence of every term, overlaps included."""
+        fail, term_at, dict_link = self._fail, self._term_at, self._dict_link
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            c = ord(ch)
+            nxt = self._goto(node, c)
+            while not nxt and node:
+                node = fail[node]
+                nxt = self._goto(node, c)
+            node = nxt
+            t = node if term_at[node] != _NONE else dict_link[node]
+            while t:
+                tid = term_at[t]
+                yield tid, i - self._term_len[tid] + 1
+                t = dict_link[t]
+
+    def rank(self, text: str, limit: int = 6) -> list:
+        """Pairs mentioned in text, most hits first, then earliest first mention."""
+        hits = {}
+        first = {}
+        for tid, pos in self.find(text):
+            for pi in self.term_pairs[tid]:
+                hits[pi] = hits.get(pi, 0) + 1
+                if pi not in first:
+                    first[pi] = pos
+        order = sorted(hits, key=lambda pi: (-hits[pi], first[pi], pi))
+        return [self.pairs[pi] for pi in order[:limit]]
+
+
+def _source_stat(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def load_index(glossary_path: str, prebuilt_path=None) -> ConfusionIndex:
+    """Load the prebuilt index next to the glossary, rebuilding it when the glossary changed."""
+    prebuilt_path = prebuilt_path or os.path.splitext(glossary_path)[0] + '.idx'
+    src = _source_stat(glossary_path)
+    try:
+        hdr = ConfusionIndex.read_header(prebuilt_path)
+        if hdr and hdr['source_stat'] == src:
+            return ConfusionIndex.load(prebuilt_path)
+    except (OSError, ValueError):
+        pass
+    idx = ConfusionIndex.build(load_glossary(glossary_path))
+    try:
+        idx.save(prebuilt_path, src)
+    except OSError as e:
+        print('保存混淆词索引失败：', e)
+    return idx
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ConfusionIndex:
+    """Process-wide index for CONFUSION_GLOSSARY (default data/confusion_glossary.tsv)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index(os.getenv('CONFUSION_GLOSSARY', GLOSSARY_FILE))
+    return _index
@@ -0,0 +1,112 @@
+import os
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('learncard_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """An absolute point in time (monotonic clock) by which a request must finish.
+
+    `Deadline(None)` never expires. Callers derive per-step timeouts from the time left
+    instead of using fixed ones, so a chain of retries can never outlive the request.
+    """
+
+    def __init__(self, seconds=None, at=None, clock=time.monotonic):
+        self._clock = clock
+        if at is not None:
+            self.at = at
+        elif seconds is None:
+            self.at = math.inf
+        else:
+            self.at = clock() + seconds
+        self.cancelled = False
+
+    @property
+    def bounded(self) -> bool:
+        return self.at != math.inf
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def check(self, what: str = 'request', min_s: float = 0.0):
+        """Raise DeadlineExceeded unless more than min_s seconds are left."""
+        if self.remaining() <= min_s:
+            raise DeadlineExceeded(f'{what}: deadline exceeded')
+
+    def timeout(self, cap: float) -> float:
+        """A per-call timeout: cap, or whatever is left if that is less."""
+        return max(0.001, min(cap, self.remaining()))
+
+    def share(self, fraction: float) -> 'Deadline':
+        """A sub-deadline using `fraction` of the time left (unbounded stays unbounded)."""
+        if not self.bounded:
+            return Deadline(None, clock=self._clock)
+        return Deadline(at=self._clock() + self.remaining() * fraction, clock=self._clock)
+
+    def sleep(self, seconds: float) -> float:
+        """Sleep for seconds, but never past the deadline; returns the time actually slept."""
+        s = min(seconds, self.remaining())
+        if s > 0:
+            time.sleep(s)
+        return s
+
+    def cancel(self):
+        """Expire now: work still running under this deadline is no longer wanted.
+
+        Calls stop at their next check (the HTTP attempt in flight is not interrupted).
+        """
+        self.at = min(self.at, self._clock())
+        self.cancelled = True
+
+    def __repr__(self):
+        return f'Deadline(remaining={self.remaining():.3f}s)' if self.bounded else 'Deadline(None)'
+
+
+NO_DEADLINE = Deadline(None)
+
+
+def current() -> Deadline:
+    """The deadline of the running request, or NO_DEADLINE outside one."""
+    return _current.get() or NO_DEADLINE
+
+
+@contextmanager
+def scope(deadline):
+    """Make `deadline` the ambient deadline for code (and copied contexts) run inside the block.
+
+    A nested scope can only tighten the outer deadline, never extend it.
+    """
+    outer = _current.get()
+    if deadline is None:
+        deadline = outer or NO_DEADLINE
+    elif outer is not None and outer.at < deadline.at:
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def env(name: str, default, cast=float):
+    """Env `name` converted with `cast`; unset, empty or invalid values give `cast(default)`."""
+    try:
+        return cast(os.getenv(name) or default)
+    except ValueError:
+        return cast(default)
+
+
+def from_env(name: str, default: str = '0') -> Deadline:
+    """Deadline after the number of seconds in env `name` (see `env`); 0 means none."""
+    seconds = env(name, default)
+    return Deadline(seconds) if seconds > 0 else Deadline(None)
@@ -0,0 +1,305 @@
+import os
+import io
+import sys
+import json
+import zlib
+import hashlib
+import argparse
+from typing import Iterable, Optional, Tuple
+
+# A4 in PDF points, identical to reportlab.lib.pagesizes.A4 (kept local so the
+# exporter does not pull in reportlab at all).
+PAGE_WIDTH, PAGE_HEIGHT = 595.2755905511812, 841.8897637795277
+MARGIN = 40
+IMAGE_MAX_W, IMAGE_MAX_H = 200, 120
+
+# Adobe's Simplified Chinese CJK font. Viewers ship it, so it never needs to be
+# embedded and a single font object is shared by every page of the deck.
+CJK_FONT = 'STSong-Light'
+
+
+def _pdf_text(s: str) -> str:
+    """Encode text as a UCS-2 hex string for the UniGB-UCS2-H CMap."""
+    s = ''.join(ch if ord(ch) <= 0xFFFF else '?' for ch in str(s))
+    return '<' + s.encode('utf-16-be').hex() + '>'
+
+
+class DeckWriter:
+    """Write many learning cards into one PDF in a single streaming pass.
+
+    Every page is serialised and flushed to disk as soon as it is complete; only
+    object offsets and page ids stay in memory. The font and every distinct
+    image (deduplicated by content hash) are written once as shared objects and
+    referenced from a single resource dictionary that is emitted on close.
+    """
+
+    def __init__(self, pdf_path: str, title: str = '学习卡片', image_dpi: int = 150):
+        self.pdf_path = pdf_path
+        self.title = title
+        self.image_dpi = image_dpi
+        os.makedirs(os.path.dirname(os.path.abspath(pdf_path)), exist_ok=True)
+        self._f = open(pdf_path, 'wb')
+        self._offsets = {}
+        self._next_id = 1
+        self._page_ids = []
+        self._images = {}   # content hash -> (xobject name, obj id, px width, px height)
+        self._ops = []
+        self._y = 0.0
+        self.cards = 0
+        self.closed = False
+
+        self._f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._catalog_id = self._alloc()
+        self._pages_id = self._alloc()
+        self._resources_id = self._alloc()
+        self._font_id = self._alloc()
+        cid_font_id = self._alloc()
+        descriptor_id = self._alloc()
+        self._write_obj(self._catalog_id, f'<< /Type /Catalog /Pages {self._pages_id} 0 R >>'.encode())
+        self._write_obj(self._font_id, (
+            f'<< /Type /Font /Subtype /Type0 /BaseFont /{CJK_FONT} /Encoding /UniGB-UCS2-H '
+            f'/DescendantFonts [{cid_font_id} 0 R] >>').encode())
+        self._write_obj(cid_font_id, (
+            f'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{CJK_FONT} '
+            f'/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> '
+            f'/FontDescriptor {descriptor_id} 0 R /DW 1000 /W [1 95 500] >>').encode())
+        self._write_obj(descriptor_id, (
+            f'<< /Type /FontDescriptor /FontName /{CJK_FONT} /Flags 6 /FontBBox [-25 -254 1000 880] '
+            f'/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>').encode())
+
+    # -- low level object output -------------------------------------------
+
+    def _alloc(self) -> int:
+        oid = self._next_id
+        self._next_id += 1
+        return oid
+
+    def _write_obj(self, oid: int, body: bytes):
+        self._offsets[oid] = self._f.tell()
+        self._f.write(f'{oid} 0 obj\n'.encode() + body + b'\nendobj\n')
+
+    def _write_stream(self, oid: int, data: bytes, extra: str = '', compress: bool = True):
+        if compress:
+            data = zlib.compress(data)
+            extra += ' /Filter /FlateDecode'
+        head = f'<< /Length {len(data)}{extra} >>\nstream\n'.encode()
+        self._write_obj(oid, head + data + b'\nendstream')
+
+    # -- images ----------------------------------------------------------------
+
+    def _image_xobject(self, image_path: str, box_w: float = IMAGE_MAX_W, box_h: float = IMAGE_MAX_H):
+        """Return (name, px_w, px_h) for image_path sized for a box_w x box_h pt box, writing the XObject only once."""
+        with open(image_path, 'rb') as f:
+            raw = f.read()
+        digest = (hashlib.sha1(raw).hexdigest(), box_w, box_h)
+        cached = self._images.get(digest)
+        if cached:
+            return cached[0], cached[2], cached[3]
+
+        from PIL import Image
+        img = Image.open(io.BytesIO(raw))
+        # downscale to what the card actually shows at image_dpi instead of
+        # embedding the full camera image on every page
+        max_px_w = int(box_w / 72.0 * self.image_dpi)
+        max_px_h = int(box_h / 72.0 * self.image_dpi)
+        if img.format == 'JPEG' and img.mode in ('RGB', 'L') and img.width <= max_px_w and img.height <= max_px_h:
+            data, mode, (w, h) = raw, img.mode, img.size
+        else:
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                bg = Image.new('RGB', img.size, 'white')
+                bg.paste(img, mask=img.split()[-1])
+                img = bg
+            elif img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.thumbnail((max_px_w, max_px_h))
+            buf = io.BytesIO()
+            img.save(buf, format='JPEG', quality=85)
+            data, mode, (w, h) = buf.getvalue(), img.mode, img.size
+
+        oid = self._alloc()
+        name = f'Im{len(self._images) + 1}'
+        colorspace = '/DeviceGray' if mode == 'L' else '/DeviceRGB'
+        self._write_stream(oid, data, compress=False, extra=(
+            f' /Type /XObject /Subtype /Image /Width {w} /Height {h} /ColorSpace {colorspace} '
+            f'/BitsPerComponent 8 /Filter /DCTDecode'))
+        self._images[digest] = (name, oid, w, h)
+        return name, w, h
+
+    # -- page layout -------------------------------------------------------------
+
+    def _text(self, x: float, y: float, s: str, size: int = 12):
+        self._ops.append(f'BT /F1 {size} Tf {x:.2f} {y:.2f} Td {_pdf_text(s)} Tj ET')
+
+    def _new_page(self):
+        self._flush_page()
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _flush_page(self):
+        if not self._ops:
+            return
+        content_id = self._alloc()
+        page_id = self._alloc()
+        self._write_stream(content_id, '\n'.join(self._ops).encode('ascii'))
+        self._write_obj(page_id, (
+            f'<< /Type /Page /Parent {self._pages_id} 0 R '
+            f'/MediaBox [0 0 {PAGE_WIDTH:.4f} {PAGE_HEIGHT:.4f}] '
+            f'/Resources {self._resources_id} 0 R /Contents {content_id} 0 R >>').encode())
+        self._page_ids.append(page_id)
+        self._ops = []
+        self._f.flush()
+
+    def add_card(self, result: dict, image_path: Optional[str] = None):
+        """Append one card using the same layout as summarizer.generate_pdf."""
+        if self.closed:
+            raise ValueError('DeckWriter is closed')
+        self._new_page()
+        self._text(MARGIN, PAGE_HEIGHT - MARGIN, self.title, size=18)
+
+        if image_path:
+            try:
+                name, iw, ih = self._image_xobject(image_path)
+                scale = min(IMAGE_MAX_W / iw, IMAGE_MAX_H / ih, 1)
+                w, h = iw * scale, ih * scale
+                x, y = PAGE_WIDTH - MARGIN - w, PAGE_HEIGHT - MARGIN - h
+                self._ops.append(f'q {w:.2f} 0 0 {h:.2f} {x:.2f} {y:.2f} cm /{name} Do Q')
+            except Exception as e:
+                print('插入图片失败：', e)
+
+        self._y = PAGE_HEIGHT - MARGIN - 40
+        self._text(MARGIN, self._y, '精炼学习点：')
+        self._y -= 20
+        for i, p in enumerate(result.get('learn_points', []), 1):
+            self._text(MARGIN + 10, self._y, f'{i}. {p}')
+            self._y -= 18
+            if self._y < 120:
+                self._new_page()
+
+        if self._y < 160:
+            self._new_page()
+        self._text(MARGIN, self._y, '容易混淆的知识点：')
+        self._y -= 20
+        for cpair in result.get('confusions', []):
+            self._text(MARGIN + 10, self._y, f"{cpair.get('left', '')} vs {cpair.get('right', '')} - {cpair.get('explain', '')}")
+            self._y -= 18
+            self._text(MARGIN + 12, self._y, f"例子：{cpair.get('example', '')}")
+            self._y -= 24
+            if self._y < 100:
+                self._new_page()
+        self.cards += 1
+
+    def add_image_page(self, image_path: str, caption: str = ''):
+        """Append a page showing just image_path, scaled to the page (e.g. further photos of a merged card)."""
+        if self.closed:
+            raise ValueError('DeckWriter is closed')
+        self._new_page()
+        self._text(MARGIN, PAGE_HEIGHT - MARGIN, caption or self.title, size=18)
+        box_w, box_h = PAGE_WIDTH - 2 * MARGIN, PAGE_HEIGHT - 2 * MARGIN - 40
+        try:
+            name, iw, ih = self._image_xobject(image_path, box_w, box_h)
+            scale = min(box_w / iw, box_h / ih, 1)
+            w, h = iw * scale, ih * scale
+            self._ops.append(f'q {w:.2f} 0 0 {h:.2f} {MARGIN:.2f} {PAGE_HEIGHT - MARGIN - 40 - h:.2f} cm /{name} Do Q')
+        except Exception as e:
+            print('插入图片失败：', e)
+
+    def close(self) -> dict:
+        """Write the shared resources, page tree, xref and trailer. Returns stats."""
+        if self.closed:
+            return self.stats()
+        self._flush_page()
+        xobjects = ' '.join(f'/{name} {oid} 0 R' for name, oid, _, _ in self._images.values())
+        self._write_obj(self._resources_id, (
+            f'<< /ProcSet [/PDF /Text /ImageC /ImageB] /Font << /F1 {self._font_id} 0 R >> '
+            f'/XObject << {xobjects} >> >>').encode())
+        kids = ' '.join(f'{pid} 0 R' for pid in self._page_ids)
+        self._write_obj(self._pages_id, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+
+        xref_at = self._f.tell()
+        size = self._next_id
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        for oid in range(1, size):
+            lines.append(f'{self._offsets[oid]:010d} 00000 n \n')
+        self._f.write(''.join(lines).encode())
+        self._f.write(f'trailer\n<< /Size {size} /Root {self._catalog_id} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n'.encode())
+        self._f.close()
+        self.closed = True
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {'cards': self.cards, 'pages': len(self._page_ids), 'images': len(self._images), 'pdf_path': self.pdf_path}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def export_deck(cards: Iterable[Tuple[dict, Optional[str]]], pdf_path: str, **kwargs) -> dict:
+    """Export an iterable of (result, image_path) pairs into one PDF deck."""
+    with DeckWriter(pdf_path, **kwargs) as deck:
+        for result, image_path in cards:
+            deck.add_card(result, image_path)
+    return deck.stats()
+
+
+def _card_from_record(rec, base_dir):
+    if not isinstance(rec, dict):
+        return None
+    result = rec.get('result') if isinstance(rec.get('result'), dict) else rec
+    if 'learn_points' not in result and 'confusions' not in result:
+        return None
+    image_path = rec.get('image_path') or rec.get('image')
+    if image_path and not os.path.isabs(image_path):
+        image_path = os.path.join(base_dir, image_path)
+    if image_path and not os.path.exists(image_path):
+        image_path = None
+    return result, image_path
+
+
+def iter_results_dir(results_dir: str):
+    """Yield (result, image_path) pairs from *.json / *.jsonl files in results_dir, sorted by name.
+
+    Each record is either a normalized result ({learn_points, confusions}) or an object
+    with a `result` key and an optional `image_path` (relative paths resolve against results_dir).
+    Files are read one at a time so the deck never holds the whole directory in memory.
+    """
+    for name in sorted(os.listdir(results_dir)):
+        path = os.path.join(results_dir, name)
+        try:
+            if name.endswith('.jsonl'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        card = _card_from_record(json.loads(line), results_dir)
+                        if card:
+                            yield card
+            elif name.endswith('.json'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    card = _card_from_record(json.load(f), results_dir)
+                if card:
+                    yield card
+        except (OSError, ValueError) as e:
+            print(f'跳过 {path}：{e}', file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a directory of results into one multi-card PDF deck.')
+    parser.add_argument('results_dir', help='directory containing *.json / *.jsonl result records')
+    parser.add_argument('-o', '--output', default=None, help='output PDF path (default: <results_dir>/deck.pdf)')
+    parser.add_argument('--title', default='学习卡片')
+    parser.add_argument('--image-dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+
+    out = args.output or os.path.join(args.results_dir, 'deck.pdf')
+    stats = export_deck(iter_results_dir(args.results_dir), out, title=args.title, image_dpi=args.image_dpi)
+    print(f"Deck written to {out}: {stats['cards']} cards, {stats['pages']} pages, {stats['images']} shared images")
+    return stats
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,46 @@
 import os
 import json
 import time
+import threading
 import requests
 from typing import Optional
 
+import metrics
+import tracing
+from log_writer import AsyncLogWriter, SampledLogger, parse_level, DEBUG, INFO, WARNING
+from janitor import parse_size
+import deadline as deadlines
+from deadline import DeadlineExceeded
+
 # Note: read environment variables at runtime inside call_deepseek to allow tests to monkeypatch env
 DEBUG_LOG = os.path.join(os.path.dirname(__file__), 'outputs', 'deepseek_debug.log')
+SUCCESS_FILE = os.path.join(os.path.dirname(__file__), 'outputs', 'deepseek_success_examples.json')
+# serialises read-modify-write of SUCCESS_FILE between request threads and the janitor
+_success_lock = threading.Lock()
+
+
+def _make_log_writer():
+    return AsyncLogWriter(DEBUG_LOG,
+                          max_bytes=parse_size(os.getenv('DEEPSEEK_LOG_MAX_BYTES'), 10 * 1024 ** 2),
+                          backups=deadlines.env('DEEPSEEK_LOG_BACKUPS', '3', int))
 
 
-def _log_debug(msg: str):
+def _sample_rate():
     try:
-        os.makedirs(os.path.join(os.path.dirname(__file__), 'outputs'), exist_ok=True)
-        with open(DEBUG_LOG, 'a', encoding='utf-8') as f:
-            f.write(msg + '\n')
-    except Exception:
-        pass
+        return min(1.0, max(0.0, float(os.getenv('DEEPSEEK_LOG_SAMPLE', '1.0'))))
+    except ValueError:
+        return 1.0
+
+
+# Writes go through a background thread (see log_writer); DEEPSEEK_LOG_LEVEL filters by level and
+# DEEPSEEK_LOG_SAMPLE keeps only that fraction of the per-attempt lines under load.
+debug_logger = SampledLogger(_make_log_writer, level=parse_level(os.getenv('DEEPSEEK_LOG_LEVEL'), DEBUG),
+                             sample_rate=_sample_rate())
+
+
+def _log_debug(msg: str, *args, level: int = DEBUG, sampled: bool = False):
+    """Queue a debug-log line; `msg % args` is only formatted by the writer thread."""
+    debug_logger.log(level, msg, *args, sampled=sampled)
 
 
 def _parse_response_text(resp_text: str, resp_json: Optional[dict]):
@@ -47,21 +73,67 @@ def _parse_response_text(resp_text: str, resp_json: Optional[dict]):
     return ''
 
 
+def iter_success_examples(path: Optional[str] = None, chunk_size: int = 1 << 16):
+    """Yield the saved success examples one at a time without loading the whole file.
+
+    The file is a single JSON array (rewritten by `_persist_success_example`); it is
+    decoded element by element from fixed-size chunks, so memory stays flat however
+    long the history gets. Raises ValueError on a malformed file.
+    """
+    path = path or SUCCESS_FILE
+    if not os.path.exists(path):
+        return
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, started, eof = '', 0, False, False
+        while True:
+            if not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ',')):
+                    pos += 1
+                if pos >= len(buf):
+                    break
+                if not started:
+                    if buf[pos] != '[':
+                        raise ValueError('success examples file is not a JSON array')
+                    started = True
+                    pos += 1
+                    continue
+                if buf[pos] == ']':
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    break  # element continues in the next chunk
+                if end == len(buf) and not eof:
+                    break  # a scalar could still continue; decode again with more data
+                pos = end
+                yield obj
+            if eof:
+                if started:
+                    raise ValueError('success examples file ends before the closing bracket')
+                return
+
+
 def summarize_saved_examples(limit: int = 5):
     """Aggregate saved success examples and return top entries sorted by a score.
 
     Score = frequency + freshness, where freshness = 1 / (1 + age_days).
     Returns list of aggregated entries: { 'key', 'format', 'body', 'freq', 'latest_ts', 'score' }
+    Examples are streamed, so memory grows with the number of distinct bodies only.
     """
     try:
-        success_file = os.path.join(os.path.dirname(__file__), 'outputs', 'deepseek_success_examples.json')
-        if not os.path.exists(success_file):
-            return []
-        with open(success_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
         # aggregate by body (deterministic key)
         groups = {}
-        for e in data:
+        for e in iter_success_examples():
+            if not isinstance(e, dict):
+                continue
             body = e.get('body') or {}
             try:
                 key = json.dumps(body, sort_keys=True, ensure_ascii=False)
@@ -76,6 +148,8 @@ def summarize_saved_examples(limit: int = 5):
                 rec['format'] = e.get('format')
                 rec['body'] = body
             groups[key] = rec
+        if not groups:
+            return []
         # compute score
         now = None
         try:
@@ -101,17 +175,64 @@ def summarize_saved_examples(limit: int = 5):
         entries_sorted = sorted(entries, key=lambda e: e['score'], reverse=True)
         return entries_sorted[:limit]
     except Exception as e:
-        _log_debug(f'Failed to summarize saved examples: {repr(e)}')
+        _log_debug('Failed to summarize saved examples: %r', e, level=WARNING)
         return []
 
 
-def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0) -> str:
+# Per-request HTTP timeout cap; the remaining deadline lowers it further.
+HTTP_TIMEOUT_S = 30
+# Fraction of the remaining budget saved-example replay may use before probing starts.
+REPLAY_BUDGET_SHARE = 0.3
+# Do not start an attempt (or a backoff) with less than this left.
+MIN_ATTEMPT_S = 0.5
+
+
+def _post(url: str, headers: dict, body: dict, fmt: str, timeout: float = HTTP_TIMEOUT_S):
+    """One HTTP attempt, recorded as a `deepseek.http` span and counted by status."""
+    with tracing.span('deepseek.http', format=fmt) as sp:
+        resp = requests.post(url, headers=headers, json=body, timeout=timeout)
+        if sp is not None:
+            sp.set(status=resp.status_code, bytes=len(resp.text or ''))
+    metrics.deepseek_http_requests.inc(status=resp.status_code)
+    return resp
+
+
+def trim_success_examples(max_entries: int) -> int:
+    """Keep only the newest max_entries saved success examples. Returns bytes reclaimed."""
+    success_file = SUCCESS_FILE
+    with _success_lock:
+        if not os.path.exists(success_file):
+            return 0
+        before = os.path.getsize(success_file)
+        try:
+            with open(success_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            _log_debug('Failed to read saved examples for trimming: %r', e, level=WARNING)
+            return 0
+        if not isinstance(data, list) or len(data) <= max_entries:
+            return 0
+        with open(success_file, 'w', encoding='utf-8') as f:
+            json.dump(data[-max_entries:] if max_entries > 0 else [], f, ensure_ascii=False, indent=2)
+        return max(0, before - os.path.getsize(success_file))
+
+
+def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0, deadline=None, replay: bool = True) -> str:
     """Call a DeepSeek-compatible LLM endpoint with automatic payload format detection.
 
     Tries multiple common payload formats (OpenAI chat style, simple prompt, input) and returns
     the first non-empty text extracted from the response. Writes debug log to `outputs/deepseek_debug.log`.
 
     Raises RuntimeError if DEEPSEEK_URL or DEEPSEEK_API_KEY not configured.
+
+    `deadline` (a deadline.Deadline; defaults to the ambient request deadline) bounds the
+    whole call: saved-example replay may use REPLAY_BUDGET_SHARE of it, every HTTP timeout
+    is capped by the time left, and 403 backoffs that would overrun it are skipped.
+    Raises DeadlineExceeded when the budget runs out before a usable answer; its
+    `requests_sent` is the number of HTTP requests made (absent when none was).
+
+    Saved examples are resent as stored, with the prompt they were saved with; callers
+    that need their own prompt answered (e.g. prompt evaluation) pass replay=False.
     """
     # Read runtime config to allow tests to override environment
     DEEPSEEK_URL = os.getenv('DEEPSEEK_URL')
@@ -121,6 +242,9 @@ def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0)
     if not DEEPSEEK_URL or not DEEPSEEK_API_KEY:
         raise RuntimeError('DeepSeek URL or API key not configured')
 
+    deadline = deadline or deadlines.current()
+    deadline.check('deepseek', MIN_ATTEMPT_S)
+
     headers = {'Authorization': f'Bearer {DEEPSEEK_API_KEY}', 'Content-Type': 'application/json'}
 
     import random
@@ -143,37 +267,49 @@ def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0)
 
     def _persist_success_example(entry: dict):
         try:
-            success_file = os.path.join(os.path.dirname(__file__), 'outputs', 'deepseek_success_examples.json')
-            os.makedirs(os.path.join(os.path.dirname(__file__), 'outputs'), exist_ok=True)
-            existing = []
-            if os.path.exists(success_file):
-                try:
-                    with open(success_file, 'r', encoding='utf-8') as f:
-                        existing = json.load(f)
-                except Exception:
-                    existing = []
-            existing.append(entry)
-            with open(success_file, 'w', encoding='utf-8') as f:
-                json.dump(existing, f, ensure_ascii=False, indent=2)
+            success_file = SUCCESS_FILE
+            os.makedirs(os.path.dirname(success_file), exist_ok=True)
+            with _success_lock:
+                existing = []
+                if os.path.exists(success_file):
+                    try:
+                        with open(success_file, 'r', encoding='utf-8') as f:
+                            existing = json.load(f)
+                    except Exception:
+                        existing = []
+                # older entries stored the request headers, including the API key
+                for e in existing:
+                    if isinstance(e, dict):
+                        e.pop('headers', None)
+                existing.append(entry)
+                with open(success_file, 'w', encoding='utf-8') as f:
+                    json.dump(existing, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            _log_debug(f'Failed to persist success example: {repr(e)}')
+            _log_debug('Failed to persist success example: %r', e, level=WARNING)
 
     last_exc = None
+    # HTTP requests actually sent; a budget that runs out before the first one is not a backend failure
+    sent = 0
 
     # First: if there are saved successful examples, try them first (most recent first)
-    saved_examples = summarize_saved_examples()
+    saved_examples = summarize_saved_examples() if replay else []
+    replay_deadline = deadline.share(REPLAY_BUDGET_SHARE)
     for example in saved_examples:
+        if replay_deadline.remaining() < MIN_ATTEMPT_S:
+            _log_debug('Replay budget used up, skipping remaining saved examples', level=INFO)
+            break
         try:
             name = f"saved:{example.get('format') or 'saved'}"
             body = example.get('body') or {}
-            _log_debug(f'Trying saved example {name} (score={example.get("score")}) with body keys: {list(body.keys())} and body sample: {str(list(body.items())[:2])}')
+            _log_debug('Trying saved example %s (score=%s) with body keys: %s', name, example.get('score'), list(body), sampled=True)
             # attempt single request with same 403/backoff logic but limited
-            resp = requests.post(DEEPSEEK_URL, headers=headers, json=body, timeout=30)
-            _log_debug(f'Saved example {name} -> status {resp.status_code} response_snippet: {resp.text[:200]}')
+            sent += 1
+            resp = _post(DEEPSEEK_URL, headers, body, name, timeout=replay_deadline.timeout(HTTP_TIMEOUT_S))
+            _log_debug('Saved example %s -> status %s response_snippet: %.200s', name, resp.status_code, resp.text, sampled=True)
             if resp.status_code == 403:
-                _log_debug(f'Saved example {name} -> 403 (rate limit), will fall through to normal probing')
+                _log_debug('Saved example %s -> 403 (rate limit), will fall through to normal probing', name, sampled=True)
             elif resp.status_code >= 400:
-                _log_debug(f'Saved example {name} -> {resp.status_code} (bad), will fall through to normal probing')
+                _log_debug('Saved example %s -> %s (bad), will fall through to normal probing', name, resp.status_code, sampled=True)
             else:
                 try:
                     j = resp.json()
@@ -181,32 +317,43 @@ def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0)
                     j = None
                 text = _parse_response_text(resp.text, j)
                 if text:
-                    _log_debug(f'Saved example {name} succeeded, extracted text length {len(text)}')
+                    _log_debug('Saved example %s succeeded, extracted text length %d', name, len(text), level=INFO)
+                    metrics.deepseek_format_wins.inc(format=name)
                     return text
         except Exception as e:
-            _log_debug(f'Saved example {example.get("format")} exception: {repr(e)}')
+            _log_debug('Saved example %s exception: %r', example.get('format'), e, level=WARNING)
 
     # If saved examples didn't work, proceed with probing standard formats
     for name, body_fn in formats:
+        if deadline.remaining() < MIN_ATTEMPT_S:
+            last_exc = DeadlineExceeded(f'deepseek: deadline exceeded before format {name}')
+            break
         body = body_fn()
-        _log_debug(f'Trying format {name} with body keys: {list(body.keys())} and body sample: {str(list(body.items())[:2])}')
+        _log_debug('Trying format %s with body keys: %s', name, list(body), sampled=True)
         try:
             # Request with simple retry-on-403/backoff policy
             max_403_retries = 3
             attempt = 0
             while True:
-                resp = requests.post(DEEPSEEK_URL, headers=headers, json=body, timeout=30)
-                _log_debug(f'Format {name} -> status {resp.status_code} response_snippet: {resp.text[:200]}')
+                sent += 1
+                resp = _post(DEEPSEEK_URL, headers, body, name, timeout=deadline.timeout(HTTP_TIMEOUT_S))
+                _log_debug('Format %s -> status %s response_snippet: %.200s', name, resp.status_code, resp.text, sampled=True)
                 # 403: rate limiting / account issue -> backoff and retry a few times
                 if resp.status_code == 403:
                     attempt += 1
                     if attempt > max_403_retries:
                         last_exc = requests.HTTPError(f'{resp.status_code} {resp.text}')
-                        _log_debug(f'Format {name} -> 403 after {attempt} attempts, giving up')
+                        _log_debug('Format %s -> 403 after %d attempts, giving up', name, attempt, level=INFO)
                         break
                     backoff = (2 ** attempt) + random.random() * 0.5
-                    _log_debug(f'Format {name} -> 403 detected, backing off {backoff:.2f}s and retrying')
-                    time.sleep(backoff)
+                    if backoff + MIN_ATTEMPT_S > deadline.remaining():
+                        last_exc = DeadlineExceeded(f'deepseek: no budget left for a {backoff:.1f}s backoff')
+                        _log_debug('Format %s -> 403 but backoff would overrun the deadline', name, level=INFO)
+                        break
+                    metrics.deepseek_403_retries.inc()
+                    _log_debug('Format %s -> 403 detected, backing off %.2fs and retrying', name, backoff, sampled=True)
+                    with tracing.span('deepseek.backoff', format=name, attempt=attempt, seconds=round(backoff, 3)):
+                        time.sleep(backoff)
                     continue
                 # 400-level errors (parameter errors) -> try next format
                 if resp.status_code >= 400:
@@ -219,30 +366,32 @@ def call_deepseek(prompt: str, max_tokens: int = 800, temperature: float = 0.0)
                     j = None
                 text = _parse_response_text(resp.text, j)
                 if text:
-                    _log_debug(f'Format {name} succeeded, extracted text length {len(text)}')
+                    _log_debug('Format %s succeeded, extracted text length %d', name, len(text), level=INFO)
+                    metrics.deepseek_format_wins.inc(format=name)
                     # save success example for future reference
                     try:
                         entry = {
                             'format': name,
                             'body': body,
-                            'headers': headers,
                             'status_code': resp.status_code,
                             'response_snippet': text[:200],
                             'timestamp': datetime.datetime.utcnow().isoformat() + 'Z'
                         }
                         _persist_success_example(entry)
                     except Exception as e:
-                        _log_debug(f'Failed to save success example: {repr(e)}')
+                        _log_debug('Failed to save success example: %r', e, level=WARNING)
                     return text
                 last_exc = RuntimeError('No usable text in response')
                 break
         except Exception as e:
             last_exc = e
-            _log_debug(f'Format {name} exception: {repr(e)}')
+            _log_debug('Format %s exception: %r', name, e, level=WARNING)
         # small backoff before next attempt
-        time.sleep(0.3)
+        deadline.sleep(0.3)
 
-    _log_debug(f'All formats failed, last_exc={repr(last_exc)}')
+    _log_debug('All formats failed, last_exc=%r', last_exc, level=WARNING)
+    if isinstance(last_exc, DeadlineExceeded):
+        last_exc.requests_sent = sent
     if last_exc:
         raise last_exc
     return ''
@@ -6,8 +6,6 @@ from summarizer import summarize, generate_pdf
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 IMG_DIR = os.path.join(BASE_DIR, 'demo_images')
 OUT_DIR = os.path.join(BASE_DIR, 'outputs')
-os.makedirs(IMG_DIR, exist_ok=True)
-os.makedirs(OUT_DIR, exist_ok=True)
 
 printed_text = (
     "导数的定义：函数在某点的瞬时变化率，表示曲线在该点的切线斜率。\n"
@@ -47,46 +45,54 @@ def create_image_with_text(text, path, font=None, size=(800,400), handwritten=Fa
     img.save(path)
     return path
 
-# Create images
-printed_path = os.path.join(IMG_DIR, 'printed_text.png')
-handwritten_path = os.path.join(IMG_DIR, 'handwritten.png')
-create_image_with_text(printed_text, printed_path, handwritten=False)
-create_image_with_text(handwritten_text, handwritten_path, handwritten=True)
+def main():
+    os.makedirs(IMG_DIR, exist_ok=True)
+    os.makedirs(OUT_DIR, exist_ok=True)
 
-examples = [
-    ('打印文本样张', printed_path, printed_text),
-    ('手写样张(模拟)', handwritten_path, handwritten_text)
-]
+    # Create images
+    printed_path = os.path.join(IMG_DIR, 'printed_text.png')
+    handwritten_path = os.path.join(IMG_DIR, 'handwritten.png')
+    create_image_with_text(printed_text, printed_path, handwritten=False)
+    create_image_with_text(handwritten_text, handwritten_path, handwritten=True)
 
-results = []
-for name, path, ground_truth in examples:
-    print('---')
-    print('样张：', name, path)
-    img = preprocess_image(path)
-    ocr_res = tesseract_ocr(img)
-    if not ocr_res or ocr_res.strip()=='' :
-        print('OCR 结果为空，使用 Ground Truth 作为输入（可能是因为未安装 tesseract）。')
-        ocr_res = ground_truth
-    print('OCR 文本：\n', ocr_res)
+    examples = [
+        ('打印文本样张', printed_path, printed_text),
+        ('手写样张(模拟)', handwritten_path, handwritten_text)
+    ]
 
-    res = summarize(ocr_res)
-    print('模型输出：', res)
+    results = []
+    for name, path, ground_truth in examples:
+        print('---')
+        print('样张：', name, path)
+        img = preprocess_image(path)
+        ocr_res = tesseract_ocr(img)
+        if not ocr_res or ocr_res.strip()=='' :
+            print('OCR 结果为空，使用 Ground Truth 作为输入（可能是因为未安装 tesseract）。')
+            ocr_res = ground_truth
+        print('OCR 文本：\n', ocr_res)
 
-    pdf_name = os.path.basename(path).replace('.png', '.pdf')
-    pdf_path = os.path.join(OUT_DIR, 'demo_' + pdf_name)
-    generate_pdf(res, path, pdf_path)
-    print('生成 PDF：', pdf_path)
-    results.append((name, path, ocr_res, res, pdf_path))
+        res = summarize(ocr_res)
+        print('模型输出：', res)
 
-# 写入一个小报告文件
-report = os.path.join(OUT_DIR, 'demo_report.txt')
-with open(report, 'w', encoding='utf-8') as f:
-    for (name, path, ocr_res, res, pdf_path) in results:
-        f.write('样张: ' + name + '\n')
-        f.write('图片: ' + path + '\n')
-        f.write('OCR:\n' + ocr_res + '\n')
-        f.write('结果:\n' + str(res) + '\n')
-        f.write('PDF: ' + pdf_path + '\n')
-        f.write('\n---\n\n')
+        pdf_name = os.path.basename(path).replace('.png', '.pdf')
+        pdf_path = os.path.join(OUT_DIR, 'demo_' + pdf_name)
+        generate_pdf(res, path, pdf_path)
+        print('生成 PDF：', pdf_path)
+        results.append((name, path, ocr_res, res, pdf_path))
 
-print('\nDone. 报告写入：', report)
+    # 写入一个小报告文件
+    report = os.path.join(OUT_DIR, 'demo_report.txt')
+    with open(report, 'w', encoding='utf-8') as f:
+        for (name, path, ocr_res, res, pdf_path) in results:
+            f.write('样张: ' + name + '\n')
+            f.write('图片: ' + path + '\n')
+            f.write('OCR:\n' + ocr_res + '\n')
+            f.write('结果:\n' + str(res) + '\n')
+            f.write('PDF: ' + pdf_path + '\n')
+            f.write('\n---\n\n')
+
+    print('\nDone. 报告写入：', report)
+
+
+if __name__ == '__main__':
+    main()
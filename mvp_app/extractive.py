@@ -0,0 +1,107 @@
+import re
+from collections import Counter
+
+import numpy as np
+
+# sentence ends: Chinese/full-width punctuation, newlines, and English .!?; followed by whitespace
+_SPLIT_RE = re.compile(r'(?<=[。！？；!?;])|\n+|(?<=[.])\s+')
+_SPACE_RE = re.compile(r'\s+')
+NGRAM_RANGE = (1, 3)
+MIN_SENTENCE_CHARS = 4
+# bounds on the TF-IDF matrix (sentences x n-gram columns) and the sentence similarity matrix
+MAX_SENTENCES = 400
+MAX_FEATURES = 4096
+
+
+def split_sentences(text: str) -> list:
+    out = []
+    for s in _SPLIT_RE.split(text or ''):
+        s = _SPACE_RE.sub(' ', s).strip(' \t-•·*')
+        if len(s) >= MIN_SENTENCE_CHARS:
+            out.append(s)
+    return out
+
+
+def _ngrams(s: str, lo: int, hi: int):
+    s = s.lower().replace(' ', '')
+    for n in range(lo, hi + 1):
+        for i in range(len(s) - n + 1):
+            yield s[i:i + n]
+
+
+def tfidf_matrix(sentences, ngram_range=NGRAM_RANGE, max_features=MAX_FEATURES):
+    """Rows are L2-normalized character n-gram TF-IDF vectors, one per sentence.
+
+    Counts are collected sparsely; only the max_features n-grams found in the most
+    sentences become columns (an n-gram of a single sentence never adds to a similarity),
+    so memory is sentences x max_features whatever the vocabulary. Norms count every n-gram.
+    """
+    vocab = {}
+    rows, cols, counts = [], [], []
+    for r, s in enumerate(sentences):
+        for g, c in Counter(_ngrams(s, *ngram_range)).items():
+            rows.append(r)
+            cols.append(vocab.setdefault(g, len(vocab)))
+            counts.append(c)
+    n, v = len(sentences), len(vocab)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    df = np.bincount(cols, minlength=v)
+    w = np.log1p(np.asarray(counts, dtype=np.float64)) * (np.log((1.0 + n) / (1.0 + df[cols])) + 1.0)
+    norms = np.sqrt(np.bincount(rows, weights=w * w, minlength=n))
+    norms[norms == 0] = 1.0
+
+    shared = np.flatnonzero(df >= 2)
+    keep = shared[np.argsort(-df[shared], kind='stable')[:max_features]]
+    col_of = np.full(v, -1, dtype=np.int64)
+    col_of[keep] = np.arange(len(keep))
+    mask = col_of[cols] >= 0
+    x = np.zeros((n, len(keep)))
+    x[rows[mask], col_of[cols[mask]]] = w[mask] / norms[rows[mask]]
+    return x
+
+
+def textrank(sim, damping: float = 0.85, max_iter: int = 50, tol: float = 1e-6):
+    """PageRank over a weighted similarity graph (power iteration)."""
+    n = sim.shape[0]
+    w = sim.copy()
+    np.fill_diagonal(w, 0.0)
+    out = w.sum(axis=1, keepdims=True)
+    # sentences with no neighbours spread their score uniformly
+    trans = np.where(out > 0, w / np.where(out > 0, out, 1.0), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        nxt = (1.0 - damping) / n + damping * (trans.T @ scores)
+        if np.abs(nxt - scores).sum() < tol:
+            return nxt
+        scores = nxt
+    return scores
+
+
+def rank_sentences(text: str, k: int = 6, redundancy: float = 0.8) -> list:
+    """Top-k sentences by TextRank, skipping near-duplicates, returned in document order."""
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        return sentences
+    if len(sentences) > MAX_SENTENCES:
+        # long (e.g. merged multi-page) texts: evenly spaced sentences keep every page represented
+        keep = np.unique(np.linspace(0, len(sentences) - 1, MAX_SENTENCES).round().astype(int))
+        sentences = [sentences[i] for i in keep]
+    x = tfidf_matrix(sentences)
+    sim = x @ x.T
+    scores = textrank(sim)
+    chosen = []
+    for i in np.argsort(-scores, kind='stable'):
+        if any(sim[i, j] > redundancy for j in chosen):
+            continue
+        chosen.append(int(i))
+        if len(chosen) >= k:
+            break
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def extractive_summarize(text: str, k: int = 6) -> dict:
+    """CPU-only summary in the learn_points/confusions schema (confusions from the glossary index)."""
+    from confusion_index import get_index
+    return {'learn_points': rank_sentences(text, k),
+            'confusions': [dict(p) for p in get_index().rank(text, limit=k)]}
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import deadline as deadlines
+
+IMAGE_HASH_DB = os.path.join(os.path.dirname(__file__), 'outputs', 'image_hash.sqlite')
+
+# The dHash (16x16 = 256 bits) is the search key: it is stable under re-shots, but on text
+# pages, where most of the image is white paper, different pages can land within a few bits.
+# Candidates are therefore confirmed with a finer pHash (32x32 = 1024 DCT bits), which on the
+# bench corpus kept different pages >= 340 bits apart and re-shots from the same position
+# below 200. Rotated re-shots mostly miss, which is the safe side.
+DHASH_SIZE = 16
+PHASH_SIZE = 32
+# pHash keeps the low frequencies of the DCT of a PHASH_SIZE*4 square thumbnail
+PHASH_FACTOR = 4
+DEFAULT_MAX_DISTANCE = 24
+DEFAULT_MAX_PHASH_DISTANCE = 288
+
+_dct = {}
+
+
+def _load_gray(src, size):
+    """Grayscale image from a path / file object / PIL image, decoded at reduced size where possible."""
+    from PIL import Image, ImageOps
+    img = src if isinstance(src, Image.Image) else Image.open(src)
+    if img.format == 'JPEG':
+        # let libjpeg decode at 1/2..1/8 scale; the hash only needs a tiny thumbnail
+        img.draft('L', (size * PHASH_FACTOR, size * PHASH_FACTOR))
+    img = ImageOps.exif_transpose(img)
+    return img.convert('L')
+
+
+def _bits_to_int(bits) -> int:
+    import numpy as np
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(img, hash_size: int = DHASH_SIZE) -> int:
+    """Difference hash: sign of horizontal gradients on a (hash_size+1) x hash_size thumbnail."""
+    import numpy as np
+    from PIL import Image
+    small = img.resize((hash_size + 1, hash_size), Image.LANCZOS)
+    a = np.asarray(small, dtype=np.int16)
+    return _bits_to_int(a[:, 1:] > a[:, :-1])
+
+
+def _dct_matrix(n: int):
+    if n not in _dct:
+        import numpy as np
+        k = np.arange(n)
+        _dct[n] = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    return _dct[n]
+
+
+def phash(img, hash_size: int = PHASH_SIZE) -> int:
+    """DCT hash: low-frequency coefficients compared with their median (DC term excluded)."""
+    import numpy as np
+    from PIL import Image
+    n = hash_size * PHASH_FACTOR
+    a = np.asarray(img.resize((n, n), Image.LANCZOS), dtype=np.float64)
+    d = _dct_matrix(n)
+    coeffs = (d @ a @ d.T)[:hash_size, :hash_size].ravel()
+    return _bits_to_int(coeffs > np.median(coeffs[1:]))
+
+
+def image_hashes(src):
+    """(dhash, phash) of an image path, file object or PIL image."""
+    img = _load_gray(src, PHASH_SIZE)
+    return dhash(img), phash(img)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndex:
+    """Multi-index hashing for Hamming-radius search over integer hashes.
+
+    The bits are split into radius+1 disjoint chunks, each with its own exact-match
+    table. Two hashes within the radius agree on at least one whole chunk (pigeonhole),
+    so a search only verifies entries sharing a chunk value with the query instead of
+    scanning everything. Chunks take every (radius+1)-th bit rather than contiguous runs:
+    on photographed pages the margins are blank in every image, and contiguous chunks
+    over them would match all entries.
+    """
+
+    def __init__(self, bits: int, radius: int):
+        self.radius = radius
+        self.chunks = radius + 1
+        self._masks = [sum(1 << b for b in range(c, bits, self.chunks)) for c in range(self.chunks)]
+        self._tables = [{} for _ in range(self.chunks)]
+        self._keys = []
+        self._values = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: int, value):
+        pos = len(self._keys)
+        self._keys.append(key)
+        self._values.append(value)
+        for mask, table in zip(self._masks, self._tables):
+            table.setdefault(key & mask, []).append(pos)
+
+    def search(self, key: int, radius=None):
+        """[(distance, value), ...] for every stored key within radius (<= the index radius), nearest first."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        seen = set()
+        out = []
+        for mask, table in zip(self._masks, self._tables):
+            for pos in table.get(key & mask, ()):
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                d = hamming(key, self._keys[pos])
+                if d <= radius:
+                    out.append((d, self._values[pos]))
+        out.sort(key=lambda x: x[0])
+        return out
+
+
+def _to_blob(h: int, size: int) -> bytes:
+    return h.to_bytes(size * size // 8, 'big')
+
+
+class ImageHashIndex:
+    """Perceptual-hash store: sqlite keeps the entries, an in-memory multi-index over dHash finds them.
+
+    Each entry holds the OCR text of a processed image and, if it came from a remote
+    LLM, its result. The in-memory index is loaded lazily and topped up from sqlite
+    before each lookup, so entries written by other worker processes are found too;
+    it is rebuilt when prune() (in any process) has dropped the oldest rows.
+    """
+
+    def __init__(self, path: str = IMAGE_HASH_DB, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_phash_distance: int = DEFAULT_MAX_PHASH_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_phash_distance = max_phash_distance
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._mih = MultiIndex(DHASH_SIZE * DHASH_SIZE, max_distance)
+        self._loaded_id = 0
+        self._first_id = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = self._db()
+        db.execute('CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, dhash BLOB NOT NULL, '
+                   'phash BLOB NOT NULL, created REAL NOT NULL, ocr_text TEXT NOT NULL, result TEXT)')
+        db.commit()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _refresh(self):
+        """Add rows written since the last refresh (by this or another process) to the in-memory index."""
+        with self._lock:
+            # rows are only ever pruned oldest first: a higher first id means the index holds deleted entries
+            first = self._db().execute('SELECT MIN(id) FROM entries').fetchone()[0] or self._loaded_id + 1
+            if first > self._first_id:
+                self._mih = MultiIndex(DHASH_SIZE * DHASH_SIZE, self.max_distance)
+                self._loaded_id = 0
+                self._first_id = first
+            rows = self._db().execute('SELECT id, dhash, phash FROM entries WHERE id > ? ORDER BY id',
+                                      (self._loaded_id,)).fetchall()
+            for entry_id, dh, ph in rows:
+                self._mih.add(int.from_bytes(dh, 'big'), (entry_id, int.from_bytes(ph, 'big')))
+                self._loaded_id = entry_id
+
+    def nearest(self, hashes):
+        """(entry_id, dhash_distance, phash_distance) of the closest entry within both limits, or None."""
+        self._refresh()
+        dh, ph = hashes
+        for d, (entry_id, stored_ph) in self._mih.search(dh, self.max_distance):
+            pd = hamming(ph, stored_ph)
+            if pd <= self.max_phash_distance:
+                return entry_id, d, pd
+        return None
+
+    def lookup(self, hashes):
+        """{'ocr_text', 'result' (None if not stored), 'distance', 'phash_distance'} or None."""
+        best = self.nearest(hashes)
+        if best is None:
+            return None
+        row = self._db().execute('SELECT ocr_text, result FROM entries WHERE id = ?', (best[0],)).fetchone()
+        if row is None:
+            return None
+        return {'ocr_text': row[0], 'result': json.loads(row[1]) if row[1] else None,
+                'distance': best[1], 'phash_distance': best[2]}
+
+    def add(self, hashes, ocr_text: str, result=None):
+        self.add_many([(hashes, ocr_text, result)])
+
+    def add_many(self, entries):
+        """Bulk insert of (hashes, ocr_text, result) tuples."""
+        now = time.time()
+        db = self._db()
+        db.executemany('INSERT INTO entries (dhash, phash, created, ocr_text, result) VALUES (?, ?, ?, ?, ?)',
+                       [(_to_blob(h[0], DHASH_SIZE), _to_blob(h[1], PHASH_SIZE), now, text,
+                         json.dumps(res, ensure_ascii=False) if res is not None else None)
+                        for h, text, res in entries])
+        db.commit()
+
+    def count(self) -> int:
+        return self._db().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def prune(self, max_entries: int, low_water: float = 0.9) -> int:
+        """Once over max_entries, drop the oldest entries down to low_water * max_entries; returns rows removed.
+
+        Pruning well below the cap means the in-memory indexes are rebuilt once per
+        (1 - low_water) * max_entries new entries rather than after every insert.
+        """
+        if self.count() <= max_entries:
+            return 0
+        db = self._db()
+        cur = db.execute('DELETE FROM entries WHERE id IN (SELECT id FROM entries ORDER BY id DESC LIMIT -1 OFFSET ?)',
+                         (int(max_entries * low_water),))
+        db.commit()
+        return cur.rowcount
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def enabled() -> bool:
+    return os.getenv('IMAGE_HASH_ENABLED', '0') == '1'
+
+
+def max_entries() -> int:
+    """IMAGE_HASH_MAX_ENTRIES (default 100000): entries kept when the janitor prunes; 0 keeps all."""
+    return max(0, deadlines.env('IMAGE_HASH_MAX_ENTRIES', 100000, int))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ImageHashIndex:
+    """Process-wide index at IMAGE_HASH_DB, limits from IMAGE_HASH_MAX_DISTANCE / IMAGE_HASH_MAX_PHASH_DISTANCE."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ImageHashIndex(os.getenv('IMAGE_HASH_DB', IMAGE_HASH_DB),
+                                        deadlines.env('IMAGE_HASH_MAX_DISTANCE', DEFAULT_MAX_DISTANCE, int),
+                                        deadlines.env('IMAGE_HASH_MAX_PHASH_DISTANCE', DEFAULT_MAX_PHASH_DISTANCE, int))
+    return _index
@@ -0,0 +1,75 @@
+import os
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+
+
+def variant_widths():
+    """Widths from IMAGE_VARIANT_WIDTHS (comma separated), falling back to DEFAULT_WIDTHS."""
+    raw = os.getenv('IMAGE_VARIANT_WIDTHS', '')
+    try:
+        widths = sorted({int(w) for w in raw.split(',') if w.strip()})
+    except ValueError:
+        widths = []
+    return tuple(w for w in widths if w > 0) or DEFAULT_WIDTHS
+
+
+def variant_name(filename: str, width: int, ext: str) -> str:
+    stem, _ = os.path.splitext(filename)
+    return f'{stem}.w{width}.{ext}'
+
+
+def generate_variants(path: str, widths=None) -> dict:
+    """Write fixed-width WebP/JPEG thumbnails next to the image at path.
+
+    Widths larger than the original are skipped (the original width is used once
+    instead) so small uploads are never upscaled. Returns
+    {'width', 'height', 'jpeg': [(filename, width)], 'webp': [(filename, width)]}.
+    """
+    from PIL import Image, ImageOps, features
+
+    widths = widths or variant_widths()
+    directory, filename = os.path.split(path)
+    out = {'width': 0, 'height': 0, 'jpeg': [], 'webp': []}
+    with Image.open(path) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            bg = Image.new('RGB', img.size, 'white')
+            bg.paste(img, mask=img.split()[-1])
+            img = bg
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        out['width'], out['height'] = img.size
+
+        targets = sorted({min(w, img.width) for w in widths})
+        webp_ok = features.check('webp')
+        for w in targets:
+            h = max(1, round(img.height * w / img.width))
+            resized = img if w == img.width else img.resize((w, h), Image.LANCZOS)
+            name = variant_name(filename, w, 'jpg')
+            resized.save(os.path.join(directory, name), 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            out['jpeg'].append((name, w))
+            if webp_ok:
+                name = variant_name(filename, w, 'webp')
+                resized.save(os.path.join(directory, name), 'WEBP', quality=WEBP_QUALITY, method=4)
+                out['webp'].append((name, w))
+    return out
+
+
+def srcset(variants, url_prefix: str) -> str:
+    return ', '.join(f'{url_prefix}/{name} {w}w' for name, w in variants)
+
+
+def template_context(variants: dict, url_prefix: str) -> dict:
+    """Build the srcset strings result.html needs; src is the smallest JPEG."""
+    if not variants or not variants.get('jpeg'):
+        return {}
+    return {
+        'webp_srcset': srcset(variants['webp'], url_prefix),
+        'jpeg_srcset': srcset(variants['jpeg'], url_prefix),
+        'src': f"{url_prefix}/{variants['jpeg'][0][0]}",
+        'width': variants['width'],
+        'height': variants['height'],
+    }
@@ -0,0 +1,256 @@
+import os
+import re
+import time
+import hashlib
+import threading
+
+import deadline as deadlines
+
+# Number of two-hex-digit directory levels used when sharding artifacts.
+SHARD_LEVELS = 2
+# Re-stamp last access at most this often so serving a hot file is not a syscall per hit.
+TOUCH_RESOLUTION_S = 3600
+
+_SHARD_DIR_RE = re.compile(r'^[0-9a-f]{2}$')
+_KEY_RE = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{32,64})')
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', re.I)
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+def shard_key(filename: str) -> str:
+    """Group key for a file: the upload uuid / digest prefix if present, else the name.
+
+    An upload, its thumbnails and its PDF share the key and therefore the shard
+    directory, and are evicted together.
+    """
+    name = os.path.basename(filename)
+    m = _KEY_RE.match(name)
+    return m.group(1) if m else name
+
+
+def shard_subdir(filename: str) -> str:
+    h = hashlib.sha1(shard_key(filename).encode('utf-8')).hexdigest()
+    return os.path.join(*[h[i * 2:i * 2 + 2] for i in range(SHARD_LEVELS)])
+
+
+def sharded_path(directory: str, filename: str, create: bool = True) -> str:
+    """Return directory/ab/cd/filename, creating the shard directory when create is set."""
+    sub = os.path.join(directory, shard_subdir(filename))
+    if create:
+        os.makedirs(sub, exist_ok=True)
+    return os.path.join(sub, filename)
+
+
+def touch(path: str):
+    """Record an access for LRU purposes without changing mtime (ETags depend on it)."""
+    try:
+        st = os.stat(path)
+        if time.time() - st.st_atime >= TOUCH_RESOLUTION_S:
+            os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def parse_size(value, default=0) -> int:
+    """Parse '500M', '2G', '1048576' into bytes. Empty or invalid values give default."""
+    if value is None or str(value).strip() == '':
+        return default
+    m = _SIZE_RE.match(str(value))
+    if not m:
+        return default
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).lower()])
+
+
+class DirQuota:
+    """Byte quota and age limit for one directory. 0 disables the respective limit."""
+
+    def __init__(self, name: str, path: str, max_bytes: int = 0, max_age_s: float = 0, low_water: float = 0.9):
+        self.name = name
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        # evict down to low_water * max_bytes so we do not sweep again on the next upload
+        self.low_water = low_water
+
+    @classmethod
+    def from_env(cls, name: str, path: str, default_bytes: str = '1G', default_age_days: str = '30'):
+        prefix = f'JANITOR_{name.upper()}_'
+        try:
+            age_days = float(os.getenv(prefix + 'MAX_AGE_DAYS', default_age_days) or 0)
+        except ValueError:
+            age_days = float(default_age_days)
+        return cls(name, path, parse_size(os.getenv(prefix + 'MAX_BYTES', default_bytes)), age_days * 86400)
+
+
+class Janitor:
+    """Background sweeper enforcing per-directory quotas with LRU eviction.
+
+    Only generated artifacts are swept: files with an upload uuid / digest name that
+    sit in their own shard directory. Caches, logs and tool reports kept alongside
+    them are left alone. Files are grouped by shard_key and a group's last access is
+    the newest atime/mtime among its files. Groups older than max_age are removed, then the
+    least recently used groups are evicted until the directory is under quota.
+    Also caps the DeepSeek success-example history (the debug log rotates itself) and
+    prunes the enabled sqlite caches to their max-entries setting.
+    """
+
+    def __init__(self, quotas, interval_s: float = 300, success_examples_max: int = 1000):
+        self.quotas = list(quotas)
+        self.interval_s = interval_s
+        self.success_examples_max = success_examples_max
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'runs': 0, 'files_removed': 0, 'bytes_reclaimed': 0, 'cache_entries_removed': 0,
+                       'last_run': None, 'last_duration_s': 0.0, 'dirs': {}}
+
+    def _scan(self, quota):
+        groups = {}
+        for root, dirs, files in os.walk(quota.path):
+            rel = os.path.relpath(root, quota.path)
+            depth = 0 if rel == '.' else rel.count(os.sep) + 1
+            dirs[:] = [d for d in dirs if depth < SHARD_LEVELS and _SHARD_DIR_RE.match(d)]
+            if depth != SHARD_LEVELS:
+                continue
+            for name in files:
+                if not _KEY_RE.match(name) or shard_subdir(name) != rel:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                g = groups.setdefault(shard_key(name), {'last': 0.0, 'size': 0, 'paths': []})
+                g['last'] = max(g['last'], st.st_atime, st.st_mtime)
+                g['size'] += st.st_size
+                g['paths'].append(path)
+        return groups
+
+    def _remove_group(self, group):
+        removed = reclaimed = 0
+        for path in group['paths']:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+                reclaimed += size
+            except OSError:
+                pass
+            # drop now-empty shard directories
+            parent = os.path.dirname(path)
+            for _ in range(SHARD_LEVELS):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+        return removed, reclaimed
+
+    def sweep_dir(self, quota, now=None) -> dict:
+        now = time.time() if now is None else now
+        groups = self._scan(quota)
+        total = sum(g['size'] for g in groups.values())
+        removed = reclaimed = 0
+        # oldest access first
+        ordered = sorted(groups.values(), key=lambda g: g['last'])
+        target = int(quota.max_bytes * quota.low_water)
+        for g in ordered:
+            expired = quota.max_age_s and now - g['last'] > quota.max_age_s
+            over = quota.max_bytes and total > quota.max_bytes and total - reclaimed > target
+            if not (expired or over):
+                continue
+            r, b = self._remove_group(g)
+            removed += r
+            reclaimed += b
+        return {'bytes': total - reclaimed, 'files': sum(len(g['paths']) for g in groups.values()) - removed,
+                'files_removed': removed, 'bytes_reclaimed': reclaimed}
+
+    def _cap_deepseek_files(self) -> int:
+        reclaimed = 0
+        try:
+            import deepseek_client
+            if self.success_examples_max:
+                reclaimed += deepseek_client.trim_success_examples(self.success_examples_max)
+        except Exception as e:
+            print('Janitor 清理 DeepSeek 成功样例失败：', e)
+        return reclaimed
+
+    def _cap_caches(self) -> int:
+        removed = 0
+        import near_dup
+        import image_hash
+        for name, cache in (('near_dup', near_dup), ('image_hash', image_hash)):
+            if not cache.enabled() or not cache.max_entries():
+                continue
+            try:
+                removed += cache.get_index().prune(cache.max_entries())
+            except Exception as e:
+                print(f'Janitor 清理 {name} 缓存失败：', e)
+        return removed
+
+    def run_once(self, now=None) -> dict:
+        t0 = time.monotonic()
+        dirs = {}
+        removed = reclaimed = 0
+        for quota in self.quotas:
+            try:
+                d = self.sweep_dir(quota, now=now)
+            except Exception as e:
+                print(f'Janitor 清理 {quota.path} 失败：', e)
+                continue
+            dirs[quota.name] = d
+            removed += d['files_removed']
+            reclaimed += d['bytes_reclaimed']
+        reclaimed += self._cap_deepseek_files()
+        entries_removed = self._cap_caches()
+        with self._lock:
+            s = self._stats
+            s['runs'] += 1
+            s['files_removed'] += removed
+            s['bytes_reclaimed'] += reclaimed
+            s['cache_entries_removed'] += entries_removed
+            s['last_run'] = time.time()
+            s['last_duration_s'] = time.monotonic() - t0
+            for name, d in dirs.items():
+                prev = s['dirs'].get(name, {'files_removed': 0, 'bytes_reclaimed': 0})
+                s['dirs'][name] = {'bytes': d['bytes'], 'files': d['files'],
+                                   'files_removed': prev['files_removed'] + d['files_removed'],
+                                   'bytes_reclaimed': prev['bytes_reclaimed'] + d['bytes_reclaimed']}
+        return self.stats()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s['dirs'] = {k: dict(v) for k, v in self._stats['dirs'].items()}
+        s['quotas'] = {q.name: {'max_bytes': q.max_bytes, 'max_age_s': q.max_age_s} for q in self.quotas}
+        return s
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            self.run_once()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='janitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def janitor_from_env(upload_folder: str, output_folder: str) -> Janitor:
+    """Build a Janitor from JANITOR_* environment variables.
+
+    JANITOR_{UPLOADS,OUTPUTS}_MAX_BYTES (e.g. 2G), JANITOR_{UPLOADS,OUTPUTS}_MAX_AGE_DAYS,
+    JANITOR_INTERVAL_S, JANITOR_SUCCESS_EXAMPLES_MAX.
+    """
+    return Janitor(
+        [DirQuota.from_env('uploads', upload_folder), DirQuota.from_env('outputs', output_folder)],
+        interval_s=deadlines.env('JANITOR_INTERVAL_S', '300'),
+        success_examples_max=deadlines.env('JANITOR_SUCCESS_EXAMPLES_MAX', '1000', int),
+    )
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import threading
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+_NAMES = {v: k for k, v in LEVEL_NAMES.items()}
+
+_STOP = object()
+
+
+def parse_level(value, default=DEBUG) -> int:
+    if value is None or str(value).strip() == '':
+        return default
+    v = str(value).strip().upper()
+    if v.isdigit():
+        return int(v)
+    return LEVEL_NAMES.get(v, default)
+
+
+class AsyncLogWriter:
+    """Queue-backed log file writer.
+
+    `submit` only stamps the record and puts it on a bounded queue; a background
+    thread drains the queue in batches, formats the messages, writes each batch with
+    a single write/flush and rotates the file (path, path.1 ... path.N) once it
+    exceeds max_bytes. When the queue is full, records are dropped and counted rather
+    than blocking the caller.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 ** 2, backups: int = 3,
+                 queue_size: int = 10000, batch_size: int = 512):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._q = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, level: int, msg: str, args=()):
+        try:
+            self._q.put_nowait((time.time(), level, msg, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def _format(self, rec) -> str:
+        ts, level, msg, args = rec
+        if args:
+            try:
+                msg = msg % args
+            except Exception:
+                msg = f'{msg} {args!r}'
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts)) + f'.{int(ts % 1 * 1000):03d}'
+        return f'{stamp} {_NAMES.get(level, level)} {msg}'
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
+
+    def _write(self, batch):
+        data = ''.join(self._format(r) + '\n' for r in batch)
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+            self.written += len(batch)
+        except OSError as e:
+            print('写入调试日志失败：', e, file=sys.stderr)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._q.get()
+            batch = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._q.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything submitted so far is on disk (used by tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def close(self):
+        try:
+            self._q.put(_STOP, timeout=1)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=5)
+
+
+class SampledLogger:
+    """Level-filtered, sampled front end to an AsyncLogWriter.
+
+    Records below `level` are discarded before anything is formatted. Records logged
+    with sampled=True (high-volume per-attempt lines) are kept with probability
+    `sample_rate`; everything else is always kept.
+    """
+
+    def __init__(self, writer_factory, level: int = DEBUG, sample_rate: float = 1.0):
+        self._factory = writer_factory
+        self._writer = None
+        self._lock = threading.Lock()
+        self.level = level
+        self.sample_rate = sample_rate
+        self._rng_state = 0
+
+    @property
+    def writer(self) -> AsyncLogWriter:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = self._factory()
+                    atexit.register(self._writer.close)
+        return self._writer
+
+    def _keep_sample(self) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        # cheap deterministic stride instead of random(): keeps every k-th line
+        self._rng_state += 1
+        return (self._rng_state * self.sample_rate) % 1.0 < self.sample_rate
+
+    def log(self, level: int, msg: str, *args, sampled: bool = False):
+        if level < self.level:
+            return
+        if sampled and not self._keep_sample():
+            return
+        self.writer.submit(level, msg, args)
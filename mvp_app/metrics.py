@@ -0,0 +1,208 @@
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds: OCR and PDF land in the low buckets, LLM probing in the high ones.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _fmt_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _fmt_value(v) -> str:
+    if isinstance(v, float):
+        if math.isinf(v):
+            return '+Inf' if v > 0 else '-Inf'
+        return repr(v)
+    return str(v)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels: dict):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._series.items())
+        for key, v in items:
+            lines.append(f'{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}')
+        return lines
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    render = Counter.render
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                # per-bucket (non-cumulative) counts + [sum, count]
+                s = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            s[idx] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels):
+        s = self._series.get(self._key(labels))
+        return s[-1] if s else 0
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, s in items:
+            cum = 0
+            for bound, n in zip(self.buckets + (float('inf'),), s[:-2]):
+                cum += n
+                le = 'le="' + ('+Inf' if math.isinf(bound) else repr(float(bound))) + '"'
+                lines.append(f'{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cum}')
+            lines.append(f'{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(s[-2])}')
+            lines.append(f'{self.name}_count{_fmt_labels(self.labelnames, key)} {s[-1]}')
+        return lines
+
+
+class Registry:
+    """In-process metric registry rendered in the Prometheus text format (version 0.0.4).
+
+    Metrics are per process; with a pre-fork server each worker exposes its own series.
+    Collectors are callables returning extra exposition lines computed at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for m in metrics:
+            lines.extend(m.render())
+        for fn in collectors:
+            try:
+                lines.extend(fn())
+            except Exception as e:
+                lines.append(f'# collector {getattr(fn, "__name__", fn)} failed: {e!r}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+stage_seconds = REGISTRY.histogram('learncard_stage_seconds', 'Latency of each pipeline stage in seconds.', ('stage',))
+backend_answers = REGISTRY.counter('learncard_backend_answers_total', 'Summaries produced, by the backend that answered.', ('backend',))
+fallback_used = REGISTRY.counter('learncard_fallback_total', 'Times the local fallback summarizer was used, by reason.', ('reason',))
+deepseek_format_wins = REGISTRY.counter('learncard_deepseek_format_wins_total', 'DeepSeek payload format that produced the answer.', ('format',))
+deepseek_http_requests = REGISTRY.counter('learncard_deepseek_http_requests_total', 'DeepSeek HTTP attempts by status code.', ('status',))
+deepseek_403_retries = REGISTRY.counter('learncard_deepseek_403_retries_total', 'DeepSeek 403 (RPM limit) backoff retries.')
+cache_hits = REGISTRY.counter('learncard_cache_hits_total', 'Cache hits, by cache.', ('cache',))
+
+
+def timed(stage: str):
+    """Context manager observing the wall time of a pipeline stage."""
+    return stage_seconds.time(stage=stage)
+
+
+def percentile(values, q: float):
+    """Nearest-rank percentile (q in 0..100) of a sequence; None when empty."""
+    if not values:
+        return None
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, int(math.ceil(q / 100.0 * len(s))) - 1))
+    return s[k]
@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+import deadline as deadlines
+
+NEAR_DUP_DB = os.path.join(os.path.dirname(__file__), 'outputs', 'near_dup.sqlite')
+
+SHINGLE = 3
+NUM_PERM = 32
+# 8 bands of 4 rows: pairs with Jaccard 0.8 share a band with p≈0.99, pairs at 0.3 with p≈0.06
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# texts shorter than this (after normalisation) give unstable fingerprints and are not cached
+MIN_CHARS = 20
+
+_STRIP_RE = re.compile(r'[\W_]+', re.UNICODE)
+_PRIME = (1 << 61) - 1
+_perm = None
+
+
+def normalize(text: str) -> str:
+    """Lowercase and drop whitespace/punctuation, so line breaks and stray marks do not matter."""
+    return _STRIP_RE.sub('', (text or '').lower())
+
+
+def _h32(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def _permutations():
+    global _perm
+    if _perm is None:
+        import numpy as np
+        rng = np.random.default_rng(20240601)
+        # a, b < 2^31 and h < 2^32 keep a*h + b below 2^64
+        _perm = (rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64), rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64))
+    return _perm
+
+
+def minhash(text: str, k: int = SHINGLE):
+    """MinHash signature (NUM_PERM uint64 values) over character k-shingles of the normalised text."""
+    import numpy as np
+    s = normalize(text)
+    shingles = {s[i:i + k] for i in range(max(1, len(s) - k + 1))}
+    h = np.fromiter((_h32(sh) for sh in shingles), dtype=np.uint64, count=len(shingles))
+    a, b = _permutations()
+    return ((h[:, None] * a + b) % np.uint64(_PRIME)).min(axis=0)
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    import numpy as np
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def _band_keys(sig):
+    raw = sig.astype('<u8').tobytes()
+    step = ROWS * 8
+    # signed 63-bit keys fit sqlite INTEGER
+    return [int.from_bytes(hashlib.blake2b(raw[i * step:(i + 1) * step], digest_size=8).digest(), 'little') >> 1
+            for i in range(BANDS)]
+
+
+class NearDupIndex:
+    """MinHash near-duplicate store with banded LSH buckets in sqlite.
+
+    Each entry keeps its signature and one indexed column per band (a hash of that
+    band's rows). A lookup probes the band indexes, estimates Jaccard similarity
+    against the few candidates that share a bucket, and only then loads the result.
+    """
+
+    def __init__(self, path: str = NEAR_DUP_DB, threshold: float = 0.8):
+        self.path = path
+        self.threshold = threshold
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = self._db()
+        db.execute('CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, sig BLOB NOT NULL, '
+                   + ', '.join(f'b{i} INTEGER NOT NULL' for i in range(BANDS))
+                   + ', created REAL NOT NULL, result TEXT NOT NULL)')
+        for i in range(BANDS):
+            db.execute(f'CREATE INDEX IF NOT EXISTS ix_b{i} ON entries (b{i})')
+        db.commit()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def nearest(self, sig):
+        """(entry_id, similarity) of the closest stored signature sharing a band, or None."""
+        import numpy as np
+        keys = _band_keys(sig)
+        sql = ' UNION '.join(f'SELECT id FROM entries WHERE b{i} = ?' for i in range(BANDS))
+        ids = [r[0] for r in self._db().execute(sql, keys)]
+        if not ids:
+            return None
+        best = None
+        rows = self._db().execute(f'SELECT id, sig FROM entries WHERE id IN ({",".join("?" * len(ids))})', ids)
+        for entry_id, blob in rows:
+            sim = similarity(sig, np.frombuffer(blob, dtype='<u8'))
+            if best is None or sim > best[1]:
+                best = (entry_id, sim)
+        return best
+
+    def lookup(self, text: str):
+        """Return (result, score) for a stored near-duplicate at or above the threshold, else None."""
+        if len(normalize(text)) < MIN_CHARS:
+            return None
+        best = self.nearest(minhash(text))
+        if best is None or best[1] < self.threshold:
+            return None
+        row = self._db().execute('SELECT result FROM entries WHERE id = ?', (best[0],)).fetchone()
+        return (json.loads(row[0]), best[1]) if row else None
+
+    def _insert(self, rows):
+        db = self._db()
+        db.executemany(f'INSERT INTO entries (sig, {", ".join(f"b{i}" for i in range(BANDS))}, created, result) '
+                       f'VALUES (?, {", ".join("?" * BANDS)}, ?, ?)', rows)
+        db.commit()
+
+    @staticmethod
+    def _row(sig, now, payload):
+        return [sig.astype('<u8').tobytes(), *_band_keys(sig), now, payload]
+
+    def add(self, text: str, result: dict):
+        if len(normalize(text)) >= MIN_CHARS:
+            self._insert([self._row(minhash(text), time.time(), json.dumps(result, ensure_ascii=False))])
+
+    def add_signatures(self, sigs, result: dict):
+        """Bulk insert (benchmarks / backfills): every signature gets the same result payload."""
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        self._insert(self._row(sig, now, payload) for sig in sigs)
+
+    def count(self) -> int:
+        return self._db().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def prune(self, max_entries: int) -> int:
+        """Drop the oldest entries beyond max_entries; returns rows removed."""
+        db = self._db()
+        cur = db.execute('DELETE FROM entries WHERE id IN (SELECT id FROM entries ORDER BY id DESC LIMIT -1 OFFSET ?)',
+                         (max_entries,))
+        db.commit()
+        return cur.rowcount
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def enabled() -> bool:
+    return os.getenv('NEAR_DUP_ENABLED', '0') == '1'
+
+
+def max_entries() -> int:
+    """NEAR_DUP_MAX_ENTRIES (default 100000): entries kept when the janitor prunes; 0 keeps all."""
+    return max(0, deadlines.env('NEAR_DUP_MAX_ENTRIES', 100000, int))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDupIndex:
+    """Process-wide index at NEAR_DUP_DB with threshold NEAR_DUP_MIN_SIMILARITY (default 0.8)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDupIndex(os.getenv('NEAR_DUP_DB', NEAR_DUP_DB),
+                                      deadlines.env('NEAR_DUP_MIN_SIMILARITY', '0.8'))
+    return _index
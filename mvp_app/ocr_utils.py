@@ -1,5 +1,6 @@
 from PIL import Image, ImageFilter, ImageOps
 import os
+from contextlib import nullcontext
 import pytesseract
 
 try:
@@ -48,4 +49,47 @@ def google_vision_ocr(path):
         return response.full_text_annotation.text
     except Exception as e:
         print('调用 Google Vision OCR 失败：', e)
-        return ''
\ No newline at end of file
+        return ''
+
+
+def tesseract_words(img):
+    """对 PIL.Image 调用 pytesseract.image_to_data，返回带置信度的词列表
+
+    每项为 {'text', 'conf', 'block', 'par', 'line'}，conf 为 0-100；识别失败时返回空列表。
+    """
+    try:
+        data = pytesseract.image_to_data(img, lang='chi_sim+eng', output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        print('Tesseract 识别失败：', e)
+        return []
+    words = []
+    for i, text in enumerate(data.get('text', [])):
+        if not str(text).strip():
+            continue
+        words.append({'text': str(text), 'conf': float(data['conf'][i]), 'block': data['block_num'][i],
+                      'par': data['par_num'][i], 'line': data['line_num'][i]})
+    return words
+
+
+def ocr_image(path, with_words=False, stage=None):
+    """预处理 + OCR：USE_GOOGLE_VISION=1 时优先 Google Vision，否则（或无结果时）用 Tesseract
+
+    with_words=True 时改用 image_to_data 取逐词置信度（供 text_cleanup 清洗）。返回 (text, words)，
+    words 仅在走了 Tesseract 逐词识别时不为 None。stage 为可选的计时上下文（如 tracing.stage），
+    分别包住 'preprocess_image' 与 'ocr' 两步。
+    """
+    stage = stage or (lambda name: nullcontext())
+    with stage('preprocess_image'):
+        processed_img = preprocess_image(path)
+    words = None
+    with stage('ocr'):
+        text = ''
+        if os.getenv('USE_GOOGLE_VISION', '0') == '1':
+            text = google_vision_ocr(path)
+        if not text and with_words:
+            import text_cleanup
+            words = tesseract_words(processed_img)
+            text = text_cleanup.words_to_text(words, min_conf=0, junk_conf=0)[0]
+        elif not text:
+            text = tesseract_ocr(processed_img)
+    return text or '', words
@@ -0,0 +1,83 @@
+import os
+import threading
+
+# JSON schema for structured output; strict mode requires every property listed as required
+# and additionalProperties disabled at each level.
+SUMMARY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'learn_points': {'type': 'array', 'items': {'type': 'string'}},
+        'confusions': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'left': {'type': 'string'},
+                    'right': {'type': 'string'},
+                    'explain': {'type': 'string'},
+                    'example': {'type': 'string'},
+                },
+                'required': ['left', 'right', 'explain', 'example'],
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': ['learn_points', 'confusions'],
+    'additionalProperties': False,
+}
+
+JSON_SCHEMA_FORMAT = {'type': 'json_schema', 'json_schema': {'name': 'learning_card', 'strict': True, 'schema': SUMMARY_SCHEMA}}
+JSON_OBJECT_FORMAT = {'type': 'json_object'}
+
+DEFAULT_TIMEOUT_S = 60
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+# set once a model rejects json_schema, so later calls go straight to json_object mode
+_schema_unsupported = set()
+
+
+def model() -> str:
+    return os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+
+
+def get_client(api_key: str):
+    """Process-wide OpenAI client; its HTTP connection pool is reused across requests and threads."""
+    global _client, _client_key
+    if _client is None or _client_key != api_key:
+        with _client_lock:
+            if _client is None or _client_key != api_key:
+                import openai
+                # retries are owned by our deadline/circuit breaker, not the SDK
+                _client = openai.OpenAI(api_key=api_key, max_retries=0, timeout=DEFAULT_TIMEOUT_S)
+                _client_key = api_key
+    return _client
+
+
+def _rejects_response_format(exc) -> bool:
+    msg = str(exc).lower()
+    return getattr(exc, 'status_code', None) == 400 and ('response_format' in msg or 'json_schema' in msg)
+
+
+def chat_json(api_key: str, system: str, user: str, max_tokens: int = 800, timeout: float = DEFAULT_TIMEOUT_S,
+              model_name: str = None) -> str:
+    """One chat completion constrained to the learning-card schema; returns the message content.
+
+    Uses json_schema structured output, or json_object mode for models that reject it.
+    model_name overrides OPENAI_MODEL (prompt evaluation compares models side by side).
+    """
+    client = get_client(api_key)
+    name = model_name or model()
+    messages = [{'role': 'system', 'content': system}, {'role': 'user', 'content': user}]
+    fmt = JSON_OBJECT_FORMAT if name in _schema_unsupported else JSON_SCHEMA_FORMAT
+    try:
+        resp = client.chat.completions.create(model=name, messages=messages, max_tokens=max_tokens,
+                                              temperature=0.0, response_format=fmt, timeout=timeout)
+    except Exception as e:
+        if fmt is JSON_OBJECT_FORMAT or not _rejects_response_format(e):
+            raise
+        _schema_unsupported.add(name)
+        resp = client.chat.completions.create(model=name, messages=messages, max_tokens=max_tokens,
+                                              temperature=0.0, response_format=JSON_OBJECT_FORMAT, timeout=timeout)
+    return resp.choices[0].message.content or ''
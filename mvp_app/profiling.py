@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import random
+import cProfile
+import pstats
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+import metrics
+import deadline as deadlines
+
+# not under outputs/: that directory is served over HTTP, and profiles show code paths and timings
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), 'profiles')
+SAMPLER, CPROFILE = 'sampler', 'cprofile'
+
+profiles_taken = metrics.REGISTRY.counter('learncard_profiles_total',
+                                          'Profiled requests, by whether the profile was kept (slow) or dropped.', ('outcome',))
+
+_current = contextvars.ContextVar('learncard_profile', default=None)
+
+
+def _frame_label(code) -> str:
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame) -> str:
+    """A frame's stack, root first, as one 'a;b;c' line of the collapsed-stack format."""
+    names = []
+    while frame is not None:
+        names.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class RequestProfile:
+    """Profile of one request across the threads working for it.
+
+    mode 'sampler' snapshots the stacks of the registered threads every interval_s from
+    a helper thread (cheap, output is collapsed stacks for flame graphs); mode 'cprofile'
+    runs a deterministic cProfile.Profile in each registered thread and merges them into
+    one pstats file. Threads join with attach() (e.g. worker threads of /upload_multi).
+    """
+
+    def __init__(self, mode: str = SAMPLER, interval_s: float = 0.005):
+        self.mode = mode
+        self.interval_s = interval_s
+        self.samples = Counter()
+        self._threads = set()
+        self._profilers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self.t0 = None
+        self.duration_ms = None
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        if self.mode == SAMPLER:
+            self._sampler = threading.Thread(target=self._loop, name='profile-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            with self._lock:
+                tids = list(self._threads)
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is not None:
+                    self.samples[collapse(frame)] += 1
+
+    @contextmanager
+    def attach(self):
+        """Profile the calling thread for the duration of the block.
+
+        If the thread cannot be profiled (on Python 3.12+ only one profiler may be active,
+        e.g. under a debugger or another profiling tool), the block runs unprofiled.
+        """
+        tid = threading.get_ident()
+        prof = None
+        if self.mode == CPROFILE:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except Exception as e:
+                print('无法启动性能剖析，跳过：', e)
+                yield self
+                return
+            with self._lock:
+                self._profilers.append(prof)
+        else:
+            with self._lock:
+                self._threads.add(tid)
+        try:
+            yield self
+        finally:
+            if prof is not None:
+                prof.disable()
+            else:
+                with self._lock:
+                    self._threads.discard(tid)
+
+    def empty(self) -> bool:
+        """True when nothing was recorded (e.g. no thread could be profiled)."""
+        return not self._profilers if self.mode == CPROFILE else not self.samples
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration_ms = (time.perf_counter() - self.t0) * 1000.0
+
+    def write(self, out_dir: str, trace_id: str, stage_ms=None) -> dict:
+        """Write <time>_<trace id>.collapsed (or .prof) plus a .json sidecar with the tags; returns the paths."""
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{trace_id}")
+        if self.mode == CPROFILE:
+            path = base + '.prof'
+            stats = None
+            for prof in self._profilers:
+                if stats is None:
+                    stats = pstats.Stats(prof)
+                else:
+                    stats.add(prof)
+            if stats is not None:
+                stats.dump_stats(path)
+        else:
+            path = base + '.collapsed'
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, n in self.samples.most_common():
+                    f.write(f'{stack} {n}\n')
+        meta = {'trace_id': trace_id, 'mode': self.mode, 'duration_ms': round(self.duration_ms, 1),
+                'stage_ms': {k: round(v, 1) for k, v in (stage_ms or {}).items()},
+                'samples': sum(self.samples.values()) if self.mode == SAMPLER else None,
+                'interval_ms': self.interval_s * 1000.0 if self.mode == SAMPLER else None,
+                'profile': os.path.basename(path), 'time': time.time()}
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return {'profile': path, 'meta': base + '.json'}
+
+
+def enabled() -> bool:
+    return os.getenv('PROFILE_ENABLED', '0') == '1'
+
+
+def _prune(out_dir: str, keep: int):
+    # keep the newest `keep` profiles (each is a profile file + its .json sidecar)
+    try:
+        metas = sorted((e for e in os.scandir(out_dir) if e.name.endswith('.json')), key=lambda e: e.stat().st_mtime)
+    except OSError:
+        return
+    for e in metas[:max(0, len(metas) - keep)]:
+        stem = e.path[:-len('.json')]
+        for ext in ('.json', '.collapsed', '.prof'):
+            try:
+                os.remove(stem + ext)
+            except OSError:
+                pass
+
+
+@contextmanager
+def profile(trace):
+    """Profile a sampled fraction of requests; keep only those slower than the threshold.
+
+    PROFILE_ENABLED=1 turns it on; PROFILE_SAMPLE_RATE (default 0.05) is the share of requests
+    profiled, PROFILE_MIN_MS (default 2000) the latency above which a profile is written to
+    PROFILE_DIR, tagged with the trace id and the trace's stage timings. PROFILE_MODE is
+    'sampler' (default, PROFILE_INTERVAL_MS apart) or 'cprofile'; PROFILE_KEEP caps the files kept.
+    Yields the RequestProfile, or None when the request is not sampled.
+    """
+    if not enabled() or random.random() >= deadlines.env('PROFILE_SAMPLE_RATE', '0.05'):
+        yield None
+        return
+    mode = CPROFILE if os.getenv('PROFILE_MODE', SAMPLER) == CPROFILE else SAMPLER
+    prof = RequestProfile(mode, deadlines.env('PROFILE_INTERVAL_MS', '5') / 1000.0).start()
+    token = _current.set(prof)
+    try:
+        with prof.attach():
+            yield prof
+    finally:
+        _current.reset(token)
+        prof.stop()
+        if prof.empty():
+            profiles_taken.inc(outcome='dropped')
+        elif prof.duration_ms >= deadlines.env('PROFILE_MIN_MS', '2000'):
+            out_dir = os.getenv('PROFILE_DIR', PROFILE_DIR)
+            try:
+                prof.write(out_dir, trace.trace_id, trace.stage_totals())
+                _prune(out_dir, deadlines.env('PROFILE_KEEP', '200', int))
+                profiles_taken.inc(outcome='kept')
+            except Exception as e:
+                print('写入性能剖析文件失败：', e)
+        else:
+            profiles_taken.inc(outcome='dropped')
+
+
+@contextmanager
+def attach():
+    """Add the calling thread to the request's profile, if the request is being profiled.
+
+    For worker threads started with a copy of the request context.
+    """
+    prof = _current.get()
+    if prof is None:
+        yield None
+        return
+    with prof.attach():
+        yield prof
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from text_cleanup import estimate_tokens
+
+OUT_DIR = os.path.join(os.path.dirname(__file__), 'outputs', 'prompt_eval')
+LOCAL_BACKENDS = ('extractive', 'fallback')
+# limits the system prompt asks for; the schema score checks them
+MAX_LEARN_POINTS = 6
+MAX_POINT_CHARS = 15
+CONFUSION_KEYS = ('left', 'right', 'explain', 'example')
+
+
+class RateLimiter:
+    """Token bucket shared by the worker threads: `rate` calls per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call may start; returns the time waited (s)."""
+        if not self.rate or self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+# -- variants -------------------------------------------------------------------------
+
+def normalize_variant(v: dict) -> dict:
+    """Fill defaults for a variant spec.
+
+    Keys: name, backend (deepseek / openai / extractive / fallback), model (openai only;
+    DeepSeek takes DEEPSEEK_MODEL from the environment), system (system prompt text) or
+    system_file, few_shot (default true), max_tokens (800), timeout_s (60). Without a
+    name, one is derived from the settings (see default_name).
+    """
+    import summarizer
+    v = dict(v)
+    v['backend'] = summarizer.backend_name(v.get('backend'))
+    if v.get('system_file'):
+        with open(v.pop('system_file'), 'r', encoding='utf-8') as f:
+            v['system'] = f.read()
+    v.setdefault('system', summarizer.SYSTEM_PROMPT)
+    v.setdefault('few_shot', True)
+    v.setdefault('max_tokens', 800)
+    v.setdefault('timeout_s', 60)
+    if not v.get('name'):
+        v['name'] = default_name(v)
+    return v
+
+
+def default_name(v: dict) -> str:
+    """backend[:model], plus the prompt settings that differ from the defaults.
+
+    e.g. 'openai:gpt-4o/prompt-3f9a1c/no-few-shot/max400'; the prompt part is a short hash
+    of the system prompt. Local backends ignore the prompt, so they are named by backend alone.
+    """
+    import summarizer
+    name = v['backend'] + (f":{v['model']}" if v.get('model') else '')
+    if v['backend'] in LOCAL_BACKENDS:
+        return name
+    parts = [name]
+    if v['system'] != summarizer.SYSTEM_PROMPT:
+        parts.append('prompt-' + hashlib.blake2b(v['system'].encode('utf-8'), digest_size=3).hexdigest())
+    if not v['few_shot']:
+        parts.append('no-few-shot')
+    if v['max_tokens'] != 800:
+        parts.append(f"max{v['max_tokens']}")
+    return '/'.join(parts)
+
+
+def build_messages(variant: dict, text: str):
+    """(system, user) for a variant: its system prompt, with or without the shared few-shot block."""
+    import summarizer
+    prefix = summarizer._prompt_prefix() if variant['few_shot'] else summarizer.OCR_MARKER + '\n'
+    return variant['system'], prefix + text
+
+
+def call_variant(variant: dict, text: str) -> str:
+    """Raw model output for one text (no normalisation, fallback or circuit breaker)."""
+    import summarizer
+    from deadline import Deadline
+    backend = variant['backend']
+    if backend == 'fallback':
+        return json.dumps(summarizer.fallback_summarize(text), ensure_ascii=False)
+    if backend == 'extractive':
+        from extractive import extractive_summarize
+        return json.dumps(extractive_summarize(text), ensure_ascii=False)
+    system, user = build_messages(variant, text)
+    if backend == 'deepseek':
+        from deepseek_client import call_deepseek
+        # no saved-example replay: it would resend an old prompt instead of this variant's
+        return call_deepseek(system + '\n' + user, max_tokens=variant['max_tokens'], temperature=0.0,
+                             deadline=Deadline(variant['timeout_s']), replay=False)
+    import openai_client
+    key = os.getenv('OPENAI_API_KEY')
+    if not key:
+        raise RuntimeError('OPENAI_API_KEY not configured')
+    return openai_client.chat_json(key, system, user, max_tokens=variant['max_tokens'],
+                                   timeout=variant['timeout_s'], model_name=variant.get('model'))
+
+
+# -- scoring ----------------------------------------------------------------------------
+
+def parse_output(content: str):
+    """(parsed object or None, strict) — strict means the whole output is one JSON document."""
+    import summarizer
+    try:
+        return json.loads(content), True
+    except (TypeError, ValueError):
+        pass
+    obj = summarizer.try_extract_json(content or '') or summarizer.try_brutal_json_search(content or '')
+    return obj, False
+
+
+def schema_score(obj):
+    """Share of schema checks passed (0..1) and the names of the failed ones.
+
+    Checks mirror SUMMARY_SCHEMA and the system prompt: exact top-level keys, learn_points
+    as a non-empty list of short strings (at most MAX_LEARN_POINTS, MAX_POINT_CHARS each),
+    confusions as a list of objects with exactly the four string fields.
+    """
+    if not isinstance(obj, dict):
+        return 0.0, ['object']
+    lp = obj.get('learn_points')
+    confs = obj.get('confusions')
+    lp_ok = isinstance(lp, list) and all(isinstance(x, str) for x in lp)
+    confs_ok = isinstance(confs, list) and all(isinstance(c, dict) for c in confs)
+    checks = {
+        'top_level_keys': set(obj) == {'learn_points', 'confusions'},
+        'learn_points_list': lp_ok and bool(lp),
+        'learn_points_count': lp_ok and len(lp) <= MAX_LEARN_POINTS,
+        'learn_points_length': lp_ok and all(len(x) <= MAX_POINT_CHARS for x in lp),
+        'confusions_list': confs_ok,
+        'confusion_fields': confs_ok and all(set(c) == set(CONFUSION_KEYS) for c in confs),
+        'confusion_strings': confs_ok and all(isinstance(c.get(k), str) and c.get(k) for c in confs for k in ('left', 'right')),
+    }
+    failed = [name for name, ok in checks.items() if not ok]
+    return round(1 - len(failed) / len(checks), 4), failed
+
+
+def evaluate_call(variant: dict, text: str, limiter: RateLimiter = None) -> dict:
+    """Run one (variant, text) cell and score it."""
+    local = variant['backend'] in LOCAL_BACKENDS
+    waited = limiter.acquire() if limiter is not None and not local else 0.0
+    # local backends never see a prompt
+    prompt_tokens = 0 if local else estimate_tokens(''.join(build_messages(variant, text)))
+    row = {'variant': variant['name'], 'text': text, 'prompt_tokens': prompt_tokens, 'rate_wait_s': round(waited, 3)}
+    t0 = time.perf_counter()
+    try:
+        content = call_variant(variant, text)
+    except Exception as e:
+        row.update(ok=False, error=f'{type(e).__name__}: {e}', latency_ms=round((time.perf_counter() - t0) * 1000.0, 1))
+        return row
+    obj, strict = parse_output(content)
+    score, failed = schema_score(obj)
+    row.update(ok=True, latency_ms=round((time.perf_counter() - t0) * 1000.0, 1), output=content,
+               completion_tokens=estimate_tokens(content), parsed=obj is not None, strict_json=strict,
+               schema_score=score, schema_failed=failed)
+    return row
+
+
+# -- matrix ----------------------------------------------------------------------------
+
+def run_matrix(variants, corpus, concurrency: int = 4, rate: float = 0.0, burst: int = 1, repeat: int = 1,
+               progress=None):
+    """Evaluate every variant on every text (repeat times) concurrently; returns the per-call rows.
+
+    Cells are submitted text by text with the variants interleaved, so all variants see
+    the same backend conditions over the run. `rate` (calls/s, 0 = unlimited) is shared
+    by all remote calls; local backends are not limited. Variant names must be unique
+    (rows are grouped by name); a duplicate raises ValueError.
+    """
+    variants = [normalize_variant(v) for v in variants]
+    seen = set()
+    for v in variants:
+        if v['name'] in seen:
+            raise ValueError(f"duplicate variant name {v['name']!r}; give each variant a distinct 'name'")
+        seen.add(v['name'])
+    limiter = RateLimiter(rate, burst) if rate and rate > 0 else None
+    cells = [(v, t) for _ in range(repeat) for t in corpus for v in variants]
+    rows = []
+    with ThreadPoolExecutor(max(1, concurrency), thread_name_prefix='prompt-eval') as pool:
+        futures = [pool.submit(evaluate_call, v, t, limiter) for v, t in cells]
+        for i, fut in enumerate(futures, 1):
+            rows.append(fut.result())
+            if progress:
+                progress(i, len(futures))
+    return rows
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def aggregate(rows) -> list:
+    """Per-variant summary, in first-seen order."""
+    by_variant = {}
+    for r in rows:
+        by_variant.setdefault(r['variant'], []).append(r)
+    out = []
+    for name, rs in by_variant.items():
+        ok = [r for r in rs if r['ok']]
+        lat = [r['latency_ms'] for r in ok]
+        out.append({
+            'variant': name,
+            'calls': len(rs),
+            'errors': len(rs) - len(ok),
+            'latency_ms': {'p50': metrics.percentile(lat, 50), 'p95': metrics.percentile(lat, 95),
+                           'p99': metrics.percentile(lat, 99), 'mean': _mean(lat)},
+            'prompt_tokens': _mean([r['prompt_tokens'] for r in rs]),
+            'completion_tokens': _mean([r['completion_tokens'] for r in ok]),
+            'parse_rate': round(sum(r['parsed'] for r in ok) / len(rs), 4),
+            'strict_json_rate': round(sum(r['strict_json'] for r in ok) / len(rs), 4),
+            'schema_score': round(sum(r['schema_score'] for r in ok) / len(rs), 4),
+            'schema_pass_rate': round(sum(r['schema_score'] == 1.0 for r in ok) / len(rs), 4),
+        })
+    return out
+
+
+def comparison_table(summary) -> str:
+    """Markdown table, one row per variant."""
+    def fmt(v, spec='.0f'):
+        return '-' if v is None else format(v, spec)
+
+    lines = ['| variant | calls | errors | p50 ms | p95 ms | prompt tok | output tok | parse | strict JSON | schema | schema pass |',
+             '|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|']
+    for s in summary:
+        lat = s['latency_ms']
+        lines.append(f"| {s['variant']} | {s['calls']} | {s['errors']} | {fmt(lat['p50'])} | {fmt(lat['p95'])} | "
+                     f"{fmt(s['prompt_tokens'])} | {fmt(s['completion_tokens'])} | {s['parse_rate']:.0%} | "
+                     f"{s['strict_json_rate']:.0%} | {s['schema_score']:.2f} | {s['schema_pass_rate']:.0%} |")
+    return '\n'.join(lines)
+
+
+def write_report(rows, summary, out_dir: str = OUT_DIR) -> dict:
+    """calls.jsonl (every cell), summary.json and comparison.md in out_dir; returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {'calls': os.path.join(out_dir, 'calls.jsonl'), 'summary': os.path.join(out_dir, 'summary.json'),
+             'table': os.path.join(out_dir, 'comparison.md')}
+    with open(paths['calls'], 'w', encoding='utf-8') as f:
+        for r in rows:
+            f.write(json.dumps(r, ensure_ascii=False) + '\n')
+    with open(paths['summary'], 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    with open(paths['table'], 'w', encoding='utf-8') as f:
+        f.write('# Prompt variant comparison\n\nToken counts are estimates (CJK characters + ~4 chars/token).\n\n')
+        f.write(comparison_table(summary) + '\n')
+    return paths
+
+
+def load_corpus(path: str = None):
+    """Texts from a JSON list (strings or {'text'}), JSONL, or a text file with blank-line separated pages.
+
+    Without a path: the bench corpus texts plus the run_prompt_comparison samples.
+    """
+    if not path:
+        from bench.corpus import TEXTS
+        from run_prompt_comparison import texts
+        return [t for group in TEXTS.values() for t in group] + list(texts)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            entries = json.load(f)
+        elif path.endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = [p.strip() for p in f.read().split('\n\n') if p.strip()]
+    return [e['text'] if isinstance(e, dict) else e for e in entries]
+
+
+DEFAULT_VARIANTS = [
+    {'name': 'fallback', 'backend': 'fallback'},
+    {'name': 'extractive', 'backend': 'extractive'},
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='A/B evaluate prompt / backend / model variants over a corpus.')
+    parser.add_argument('--variants', help='JSON file with a list of variant specs (default: the local backends)')
+    parser.add_argument('--corpus', help='texts (.json / .jsonl / blank-line separated .txt)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=2.0, help='remote calls per second, shared (0 = unlimited)')
+    parser.add_argument('--burst', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('-o', '--output', default=OUT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.variants:
+        with open(args.variants, 'r', encoding='utf-8') as f:
+            variants = json.load(f)
+    else:
+        variants = DEFAULT_VARIANTS
+    corpus = load_corpus(args.corpus)
+
+    def progress(done, total):
+        print(f'\r{done}/{total}', end='', file=sys.stderr, flush=True)
+
+    try:
+        rows = run_matrix(variants, corpus, args.concurrency, args.rate, args.burst, args.repeat, progress)
+    except ValueError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+    summary = aggregate(rows)
+    paths = write_report(rows, summary, args.output)
+    print(comparison_table(summary))
+    print('\n报告已写入', paths['table'])
+    return summary
+
+
+if __name__ == '__main__':
+    main()
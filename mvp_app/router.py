@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+import tracing
+import summarizer
+import deadline as deadlines
+
+# successful remote latencies kept per backend for the hedge threshold
+LATENCY_WINDOW = 200
+# below this many samples the configured minimum hedge delay is used
+MIN_SAMPLES = 20
+
+router_wins = metrics.REGISTRY.counter('learncard_router_wins_total', 'Routed summaries by the path whose result was returned.', ('path',))
+router_hedges = metrics.REGISTRY.counter('learncard_router_hedges_total', 'Hedged requests sent to the secondary backend.', ('backend',))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per backend, shared by all requests."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def observe(self, backend: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(backend, deque(maxlen=self.window)).append(seconds)
+
+    def p95(self, backend: str):
+        with self._lock:
+            samples = list(self._samples.get(backend, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return metrics.percentile(samples, 95)
+
+    def hedge_delay(self, backend: str, minimum: float) -> float:
+        p = self.p95(backend)
+        return minimum if p is None else max(minimum, p)
+
+
+latency = LatencyTracker()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=deadlines.env('ROUTER_WORKERS', 16, int), thread_name_prefix='router')
+    return _pool
+
+
+def _timed_call(backend, text, budget):
+    # remote calls run under the route's own deadline, which is cancelled once the route
+    # is decided, so a losing call gives its worker back instead of probing on
+    t0 = time.perf_counter()
+    with deadlines.scope(budget):
+        res = summarizer.call_backend(backend, text)
+    latency.observe(backend, time.perf_counter() - t0)
+    return res
+
+
+def _submit(fn, *args):
+    # run in a copy of the caller's context so spans land in the request's trace
+    ctx = contextvars.copy_context()
+    return _executor().submit(ctx.run, fn, *args)
+
+
+def _call_local(backend, text):
+    # the speculative local answer: (result, None) or (None, error)
+    try:
+        return summarizer.call_backend(backend, text), None
+    except Exception as e:
+        return None, e
+
+
+def route(text, primary=None, hedge=None, local=None, deadline_s=None, hedge_min_s=None):
+    """Summarize with a speculative local result, a hedged remote request and a deadline.
+
+    The local backend (ROUTER_LOCAL, default 'fallback') runs on the request thread right
+    after the primary (ROUTER_PRIMARY, default LLM_BACKEND) is sent, so it never waits for
+    a pool slot held by slow remote calls. If the primary has not answered after
+    its observed p95 (at least ROUTER_HEDGE_MIN_S) the secondary (ROUTER_HEDGE) is asked
+    too, and the first good remote answer wins. When both remotes fail or ROUTER_DEADLINE_S
+    (or the ambient request deadline, if sooner) passes, the local result is returned.
+    Once the route is decided, remote calls that lost are stopped: queued ones are
+    cancelled and running ones end at their next deadline check (after the HTTP attempt
+    in flight), without counting as backend failures. Otherwise they would hold pool
+    workers and leave new primaries queued until the deadline.
+    """
+    primary = summarizer.backend_name(primary or os.getenv('ROUTER_PRIMARY') or os.getenv('LLM_BACKEND', 'openai'))
+    hedge = hedge if hedge is not None else os.getenv('ROUTER_HEDGE', '')
+    hedge = summarizer.backend_name(hedge) if hedge else None
+    if hedge == primary:
+        hedge = None
+    local = summarizer.backend_name(local or os.getenv('ROUTER_LOCAL', 'fallback'))
+    deadline_s = deadlines.env('ROUTER_DEADLINE_S', 20) if deadline_s is None else deadline_s
+    hedge_min_s = deadlines.env('ROUTER_HEDGE_MIN_S', 2) if hedge_min_s is None else hedge_min_s
+    # never wait past the request's own deadline
+    budget = deadlines.Deadline(at=min(time.monotonic() + deadline_s, deadlines.current().at))
+    end = budget.at
+
+    with tracing.span('router', primary=primary, hedge=hedge or '', local=local) as sp:
+        remote = {_submit(_timed_call, primary, text, budget): 'primary'}
+        local_result, local_error = _call_local(local, text)
+        hedge_at = time.monotonic() + latency.hedge_delay(primary, hedge_min_s)
+        hedged = False
+        failures = []
+        result = path = None
+
+        def send_hedge():
+            remote[_submit(_timed_call, hedge, text, budget)] = 'hedge'
+            router_hedges.inc(backend=hedge)
+            return True
+
+        while result is None:
+            if not remote:
+                # primary failed before the hedge delay: ask the secondary straight away
+                if hedge and not hedged:
+                    hedged = send_hedge()
+                    continue
+                break
+            now = time.monotonic()
+            if now >= end:
+                break
+            wake = end if hedged or not hedge else min(end, hedge_at)
+            done, _ = wait(list(remote), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for f in done:
+                name = remote.pop(f)
+                try:
+                    result, path = f.result(), name
+                    break
+                except summarizer.BackendError as e:
+                    failures.append(e.reason)
+                except Exception as e:
+                    print('路由后端调用失败：', e)
+                    failures.append(f'{name}_error')
+            if result is None and hedge and not hedged and time.monotonic() >= hedge_at:
+                hedged = send_hedge()
+
+        budget.cancel()
+        for f in remote:
+            f.cancel()
+
+        if result is not None:
+            summarizer.record_answer(primary if path == 'primary' else hedge)
+        else:
+            reason = 'router_deadline' if remote else (failures[0] if failures else 'router_failed')
+            path = 'local'
+            if local_result is not None:
+                result = local_result
+                metrics.fallback_used.inc(reason=reason)
+                summarizer.record_answer(local)
+            else:
+                print('本地回退失败：', local_error)
+                result = summarizer.fallback_result(text, reason)
+        router_wins.inc(path=path)
+        if sp is not None:
+            sp.set(path=path, hedged=hedged)
+        return result
@@ -1,19 +1,274 @@
 import os
+import csv
+import html
 import json
+import shutil
 from summarizer import summarize
 
 BASE = os.path.dirname(__file__)
 OUT = os.path.join(BASE, 'outputs', 'prompt_comparison.json')
+# report.css / report.js are copied next to the HTML pages once instead of being inlined in each
+ASSET_DIR = os.path.join(BASE, 'static', 'report')
+# examples per HTML page
+REPORT_PAGE_SIZE = 500
 texts = [
     "求导数的定义并举例。",
     "偏导数和全导数有什么不同？请说明并举例。",
     "解释行列式和矩阵的区别，给出一个类比帮助记忆。"
 ]
 
-def generate_report(out_dir: str | None = None, texts_list=None):
+TITLE = 'DeepSeek Discovered Payload Examples and Recommendations'
+INTRO = 'This report lists saved payload examples discovered during probing runs, scored by frequency and freshness.'
+RECOMMENDATION_MD = ('**Recommendation:** Prefer high-score payloads first; if these fail, try simpler payloads '
+                     '(e.g., `text` or `prompt` without `model`).\n'
+                     '\nContact DeepSeek support with an example payload and the `response_snippet` if you see repeated 400/403 errors.\n')
+# defined once per page and referenced by every copy button
+COPY_ICON_SYMBOL = ('<svg xmlns="http://www.w3.org/2000/svg" style="display:none"><symbol id="icon-copy" viewBox="0 0 24 24">'
+                    '<path fill="currentColor" d="M19 3h-4.18C14.4 1.84 13.3 1 12 1s-2.4.84-2.82 2H5a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2V5a2 2 0 0 0-2-2zM12 3c.55 0 1 .45 1 1s-.45 1-1 1-1-.45-1-1 .45-1 1-1zM7 7h10v2H7V7z"></path>'
+                    '</symbol></svg>')
+
+
+def curl_snippet(body) -> str:
+    """curl command with placeholders (compact JSON) for a payload."""
+    body_json_compact = json.dumps(body, ensure_ascii=False, separators=(',', ':'))
+    return (f"curl -X POST 'https://YOUR_DEEPSEEK_ENDPOINT' -H 'Authorization: Bearer YOUR_API_KEY' "
+            f"-H 'Content-Type: application/json' -d '{body_json_compact}'")
+
+
+def example_rows(examples):
+    """Report rows from raw saved examples (headers are dropped: they carry the API key)."""
+    for i, e in enumerate(examples, 1):
+        if not isinstance(e, dict):
+            continue
+        yield {'n': i, 'timestamp': e.get('timestamp') or '', 'format': e.get('format') or '',
+               'status': e.get('status_code', ''), 'body': e.get('body') or {},
+               'response_snippet': e.get('response_snippet') or ''}
+
+
+class ExampleSummary:
+    """Per-format / per-status counts and first/last timestamps, accumulated in one pass."""
+
+    def __init__(self):
+        self.total = 0
+        self._groups = {}
+
+    def add(self, row):
+        self.total += 1
+        key = (str(row['format']), str(row['status']))
+        g = self._groups.get(key)
+        ts = row['timestamp']
+        if g is None:
+            self._groups[key] = {'format': key[0], 'status': key[1], 'count': 1, 'first_ts': ts, 'last_ts': ts}
+            return
+        g['count'] += 1
+        if ts and (not g['first_ts'] or ts < g['first_ts']):
+            g['first_ts'] = ts
+        if ts and ts > g['last_ts']:
+            g['last_ts'] = ts
+
+    def rows(self):
+        """Groups sorted by count (desc), then format and status."""
+        return sorted(self._groups.values(), key=lambda g: (-g['count'], g['format'], g['status']))
+
+    def by_format(self):
+        totals = {}
+        for g in self._groups.values():
+            totals[g['format']] = totals.get(g['format'], 0) + g['count']
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+class MarkdownReport:
+    def __init__(self, path, top):
+        self.path = path
+        self.f = open(path, 'w', encoding='utf-8')
+        m = self.f
+        m.write(f'# {TITLE}\n\n{INTRO}\n\n')
+        if top:
+            m.write('## Top payloads\n\n')
+            for e in top:
+                m.write(f"### Format: {e['format']} (score={e['score']:.3f})\n")
+                m.write(f"- Frequency: {e['freq']}\n")
+                m.write(f"- Latest seen: {e['latest_ts']}\n\n")
+                m.write('Sample payload:\n```json\n')
+                m.write(json.dumps(e['body'], ensure_ascii=False, indent=2))
+                m.write('\n```\n\n')
+            m.write(RECOMMENDATION_MD + '\n')
+        self.rows = 0
+
+    def write_row(self, row):
+        if not self.rows:
+            self.f.write('## History\n\n| # | timestamp | format | status | payload |\n|---:|---|---|---|---|\n')
+        body = json.dumps(row['body'], ensure_ascii=False).replace('|', '\\|')
+        self.f.write(f"| {row['n']} | {row['timestamp']} | {row['format']} | {row['status']} | `{body}` |\n")
+        self.rows += 1
+
+    def close(self, summary):
+        m = self.f
+        if not summary.total:
+            m.write('No saved examples found.\n')
+        else:
+            m.write('\n## Summary by format and status\n\n| format | status | count | first seen | last seen |\n|---|---|---:|---|---|\n')
+            for g in summary.rows():
+                m.write(f"| {g['format']} | {g['status']} | {g['count']} | {g['first_ts']} | {g['last_ts']} |\n")
+        m.close()
+
+
+class CsvReport:
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(['n', 'timestamp', 'format', 'status', 'body_json', 'response_snippet'])
+
+    def write_row(self, row):
+        self.writer.writerow([row['n'], row['timestamp'], row['format'], row['status'],
+                              json.dumps(row['body'], ensure_ascii=False), row['response_snippet']])
+
+    def close(self):
+        self.f.close()
+
+
+def _page_name(n: int) -> str:
+    return 'deepseek_examples_report.html' if n == 1 else f'deepseek_examples_report_p{n}.html'
+
+
+SUMMARY_PAGE = 'deepseek_examples_summary.html'
+
+
+def _html_head(title: str) -> str:
+    return ('<!doctype html>\n<html><head><meta charset="utf-8">'
+            f'<title>{html.escape(title)}</title>'
+            '<link rel="stylesheet" href="deepseek_examples_report.css">'
+            '<script src="deepseek_examples_report.js" defer></script>'
+            '</head><body>'
+            '<button id="theme-toggle" aria-label="Toggle light/dark theme">🌗 Theme</button>')
+
+
+class HtmlPager:
+    """Writes rows into numbered HTML pages of page_size rows, one open file at a time.
+
+    A page is only closed (with its "next" link) when the next row arrives, so the
+    writer never needs to know the total up front.
+    """
+
+    def __init__(self, out_dir, page_size=REPORT_PAGE_SIZE):
+        self.out_dir = out_dir
+        self.page_size = max(1, page_size)
+        self.pages = []
+        self.f = None
+        self.on_page = 0
+
+    def _nav(self, n, has_next):
+        links = []
+        if n > 1:
+            links.append(f'<a href="{_page_name(n - 1)}">&larr; Previous</a>')
+        links.append(f'<span>Page {n}</span>')
+        if has_next:
+            links.append(f'<a href="{_page_name(n + 1)}">Next &rarr;</a>')
+        links.append(f'<a href="{SUMMARY_PAGE}">Summary by format/status</a>')
+        return '<nav class="pager">' + ' '.join(links) + '</nav>'
+
+    def _open(self):
+        n = len(self.pages) + 1
+        path = os.path.join(self.out_dir, _page_name(n))
+        self.pages.append(path)
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write(_html_head(TITLE if n == 1 else f'{TITLE} (page {n})'))
+        self.f.write(COPY_ICON_SYMBOL)
+        self.f.write(f'<h1>{TITLE}</h1><p>{INTRO}</p>')
+        self.f.write(self._nav(n, False))
+        self.f.write('<table><thead><tr><th>#</th><th>timestamp</th><th>format</th><th>status</th>'
+                     '<th>sample payload</th><th>curl</th><th>copy</th></tr></thead><tbody>')
+        self.on_page = 0
+
+    def _close(self, has_next):
+        n = len(self.pages)
+        self.f.write('</tbody></table>')
+        self.f.write(self._nav(n, has_next))
+        self.f.write('<p><strong>Recommendation:</strong> Prefer high-score payloads first; if these fail, try simpler '
+                     'payloads (e.g., <code>text</code> or <code>prompt</code> without <code>model</code>).'
+                     '<br>Contact DeepSeek support with an example payload and the response snippet if you see '
+                     'repeated 400/403 errors.</p>')
+        self.f.write('</body></html>')
+        self.f.close()
+        self.f = None
+
+    def write_row(self, row):
+        if self.f is not None and self.on_page >= self.page_size:
+            self._close(has_next=True)
+        if self.f is None:
+            self._open()
+        n = row['n']
+        curl_id = f'curl-{n}'
+        self.f.write('<tr>'
+                     f"<td>{n}</td><td>{html.escape(str(row['timestamp']))}</td>"
+                     f"<td>{html.escape(str(row['format']))}</td><td>{html.escape(str(row['status']))}</td>"
+                     f"<td><pre>{html.escape(json.dumps(row['body'], ensure_ascii=False))}</pre></td>"
+                     f"<td><pre id=\"{curl_id}\">{html.escape(curl_snippet(row['body']))}</pre></td>"
+                     f"<td><button class=\"copy-btn\" id=\"copy-btn-{n}\" data-target=\"{curl_id}\" aria-label=\"Copy cURL\">"
+                     '<svg class="icon-svg" aria-hidden="true" focusable="false"><use href="#icon-copy"></use></svg>'
+                     '<span class="label">Copy</span></button></td>'
+                     '</tr>')
+        self.on_page += 1
+
+    def close(self, summary):
+        if self.f is None and not self.pages:
+            # no rows: still write the first page so links to the report keep working
+            self._open()
+            self.f.write('<tr><td colspan="7">No saved examples found.</td></tr>')
+        if self.f is not None:
+            self._close(has_next=False)
+        path = os.path.join(self.out_dir, SUMMARY_PAGE)
+        with open(path, 'w', encoding='utf-8') as h:
+            h.write(_html_head(f'{TITLE} — summary'))
+            h.write(f'<h1>Summary by format and status</h1><p>{summary.total} examples in {len(self.pages)} page(s). '
+                    f'<a href="{_page_name(1)}">Back to the report</a></p>')
+            h.write('<table><thead><tr><th>format</th><th>status</th><th>count</th><th>first seen</th><th>last seen</th>'
+                    '</tr></thead><tbody>')
+            for g in summary.rows():
+                h.write(f"<tr><td>{html.escape(g['format'])}</td><td>{html.escape(g['status'])}</td><td>{g['count']}</td>"
+                        f"<td>{html.escape(g['first_ts'])}</td><td>{html.escape(g['last_ts'])}</td></tr>")
+            h.write('</tbody></table></body></html>')
+        return path
+
+
+def copy_assets(out_dir: str):
+    for ext in ('css', 'js'):
+        shutil.copyfile(os.path.join(ASSET_DIR, f'report.{ext}'), os.path.join(out_dir, f'deepseek_examples_report.{ext}'))
+
+
+def write_examples_report(rows, out_dir: str, top=None, page_size: int = REPORT_PAGE_SIZE) -> dict:
+    """Stream report rows into the Markdown, CSV and paginated HTML reports in a single pass.
+
+    Memory does not depend on the number of rows: each row is written to all three
+    reports and folded into the per-format/per-status summary, then dropped.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    copy_assets(out_dir)
+    summary = ExampleSummary()
+    md = MarkdownReport(os.path.join(out_dir, 'deepseek_examples_report.md'), top or [])
+    csv_out = CsvReport(os.path.join(out_dir, 'deepseek_examples.csv'))
+    pager = HtmlPager(out_dir, page_size)
+    try:
+        for row in rows:
+            md.write_row(row)
+            csv_out.write_row(row)
+            pager.write_row(row)
+            summary.add(row)
+    finally:
+        md.close(summary)
+        csv_out.close()
+        summary_page = pager.close(summary)
+    return {'markdown': md.path, 'csv': os.path.join(out_dir, 'deepseek_examples.csv'), 'html_pages': pager.pages,
+            'html_summary': summary_page, 'examples': summary.total, 'summary': summary.rows(),
+            'by_format': summary.by_format()}
+
+
+def generate_report(out_dir: str | None = None, texts_list=None, page_size: int = REPORT_PAGE_SIZE):
     """Generate prompt comparison and saved example reports into out_dir (defaults to package outputs).
 
-    Returns a dict with results and saved_examples summary.
+    The saved-example history is streamed from the success file into the Markdown, CSV
+    and paginated HTML reports. Returns a dict with results, the top saved examples and
+    the history summary.
     """
     if texts_list is None:
         texts_list = texts
@@ -33,125 +288,23 @@ def generate_report(out_dir: str | None = None, texts_list=None):
     except Exception:
         saved_summary = []
 
-    out_json = os.path.join(BASE_OUT, 'prompt_comparison.json')
-    with open(out_json, 'w', encoding='utf-8') as f:
-        json.dump({'results': results, 'saved_examples': saved_summary}, f, ensure_ascii=False, indent=2)
-
-    # produce human-friendly markdown, CSV and HTML reports
-    report_md = os.path.join(BASE_OUT, 'deepseek_examples_report.md')
-    report_csv = os.path.join(BASE_OUT, 'deepseek_examples.csv')
-    report_html = os.path.join(BASE_OUT, 'deepseek_examples_report.html')
+    history = {}
     try:
-        # Markdown
-        with open(report_md, 'w', encoding='utf-8') as m:
-            m.write('# DeepSeek Discovered Payload Examples and Recommendations\n\n')
-            m.write('This report lists saved payload examples discovered during probing runs, scored by frequency and freshness.\n\n')
-            if not saved_summary:
-                m.write('No saved examples found.\n')
-            else:
-                for e in saved_summary:
-                    m.write(f"## Format: {e['format']} (score={e['score']:.3f})\n")
-                    m.write(f"- Frequency: {e['freq']}\n")
-                    m.write(f"- Latest seen: {e['latest_ts']}\n")
-                    m.write('\n')
-                    m.write('Sample payload:\n')
-                    m.write('```json\n')
-                    m.write(json.dumps(e['body'], ensure_ascii=False, indent=2))
-                    m.write('\n```\n\n')
-                m.write('**Recommendation:** Prefer high-score payloads first; if these fail, try simpler payloads (e.g., `text` or `prompt` without `model`).\n')
-                m.write('\nContact DeepSeek support with an example payload and the `response_snippet` if you see repeated 400/403 errors.\n')
-
-        # write CSV
-        import csv
-        with open(report_csv, 'w', encoding='utf-8', newline='') as c:
-            writer = csv.writer(c)
-            writer.writerow(['format','freq','latest_ts','score','body_json'])
-            for e in saved_summary:
-                writer.writerow([e['format'], e['freq'], e['latest_ts'], f"{e['score']:.6f}", json.dumps(e['body'], ensure_ascii=False)])
-
-        # write HTML
-        try:
-            import html
-            with open(report_html, 'w', encoding='utf-8') as h:
-                h.write('<!doctype html>\n<html><head><meta charset="utf-8"><title>DeepSeek Examples Report</title>')
-                h.write('<style>/* layout */table{border-collapse:collapse;width:100%}td,th{border:1px solid var(--border);padding:8px;vertical-align:top}th{background:var(--th-bg);text-align:left} pre{white-space:pre-wrap;word-break:break-word}/* buttons */ .copy-btn{background:var(--btn-bg);border:1px solid var(--btn-border);padding:6px 10px;border-radius:6px;cursor:pointer;font-size:13px;display:inline-flex;align-items:center;gap:8px;color:var(--btn-color)} .copy-btn .icon-svg{width:18px;height:18px;display:inline-block;vertical-align:middle} .copy-btn.copied{background:#28a745;color:#fff;border-color:#28a745;box-shadow:0 2px 6px rgba(40,167,69,0.2)} .copy-btn.copied .icon-svg{filter:brightness(0) invert(1)} .copy-btn:focus{outline:2px solid #69c;outline-offset:2px} button.copy-btn{transition:all 0.16s cubic-bezier(0.2,0,0.2,1)}/* transitions for theme changes */ .theme-transition, .theme-transition *{transition:background-color 0.4s cubic-bezier(0.4,0,0.2,1),color 0.4s cubic-bezier(0.4,0,0.2,1),border-color 0.4s cubic-bezier(0.4,0,0.2,1),box-shadow 0.4s cubic-bezier(0.4,0,0.2,1)}/* theming */:root{--bg:#ffffff;--text:#111111;--border:#ddd;--th-bg:#f7f7f7;--btn-bg:#fff;--btn-border:#ccc;--btn-color:#111}@media (prefers-color-scheme: dark){:root{--bg:#0e0f11;--text:#e6e6e6;--border:#222;--th-bg:#131416;--btn-bg:#0f1720;--btn-border:#2b3036;--btn-color:#e6e6e6}}body.dark{--bg:#0e0f11;--text:#e6e6e6;--border:#222;--th-bg:#131416;--btn-bg:#0f1720;--btn-border:#2b3036;--btn-color:#e6e6e6}body{background:var(--bg);color:var(--text);font-family:Segoe UI,Roboto,Arial,Helvetica,sans-serif;margin:18px;transition:background-color .4s cubic-bezier(0.4,0,0.2,1),color .4s cubic-bezier(0.4,0,0.2,1)}#theme-toggle{position:fixed;right:18px;top:18px;background:transparent;border:1px solid var(--btn-border);padding:6px 10px;border-radius:6px;color:var(--btn-color);cursor:pointer}#theme-toggle:focus{outline:2px solid #69c;outline-offset:2px}</style>')
-                h.write('</head><body>')
-                h.write('<h1>DeepSeek Discovered Payload Examples and Recommendations</h1>')
-                h.write('<p>This report lists saved payload examples discovered during probing runs, scored by frequency and freshness.</p>')
-                # theme toggle button
-                h.write('<button id="theme-toggle" aria-label="Toggle light/dark theme">🌗 Theme</button>')
-                if not saved_summary:
-                    h.write('<p>No saved examples found.</p>')
-                else:
-                    h.write('<table>')
-                    h.write('<thead><tr><th>format</th><th>freq</th><th>latest_ts</th><th>score</th><th>sample payload</th><th>curl</th><th>copy</th></tr></thead>')
-                    h.write('<tbody>')
-                    idx = 0
-                    for e in saved_summary:
-                        body_json = json.dumps(e['body'], ensure_ascii=False)
-                        body_escaped = html.escape(body_json)
-                        # curl snippet with placeholders (compact JSON)
-                        body_json_compact = json.dumps(e['body'], ensure_ascii=False, separators=(',', ':'))
-                        curl = f"curl -X POST 'https://YOUR_DEEPSEEK_ENDPOINT' -H 'Authorization: Bearer YOUR_API_KEY' -H 'Content-Type: application/json' -d '{body_json_compact}'"
-                        curl_escaped = html.escape(curl)
-                        curl_id = f'curl-{idx}'
-                        btn_id = f'copy-btn-{idx}'
-                        h.write('<tr>')
-                        h.write(f"<td>{html.escape(str(e['format']))}</td>")
-                        h.write(f"<td>{e['freq']}</td>")
-                        h.write(f"<td>{html.escape(str(e['latest_ts']))}</td>")
-                        h.write(f"<td>{e['score']:.6f}</td>")
-                        h.write(f"<td><pre>{body_escaped}</pre></td>")
-                        h.write(f"<td><pre id=\"{curl_id}\">{curl_escaped}</pre></td>")
-                        # prettier button with icon + label
-                        h.write(f"<td><button class=\"copy-btn\" id=\"{btn_id}\" data-target=\"{curl_id}\" aria-label=\"Copy cURL\"><svg class=\"icon-svg\" viewBox=\"0 0 24 24\" aria-hidden=\"true\" focusable=\"false\" xmlns=\"http://www.w3.org/2000/svg\"><path fill=\"currentColor\" d=\"M19 3h-4.18C14.4 1.84 13.3 1 12 1s-2.4.84-2.82 2H5a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2V5a2 2 0 0 0-2-2zM12 3c.55 0 1 .45 1 1s-.45 1-1 1-1-.45-1-1 .45-1 1-1zM7 7h10v2H7V7z\"></path></svg><span class=\"label\">Copy</span></button></td>")
-                        h.write('</tr>')
-                        idx += 1
-                    h.write('</tbody></table>')
-                    h.write('<p><strong>Recommendation:</strong> Prefer high-score payloads first; if these fail, try simpler payloads (e.g., <code>text</code> or <code>prompt</code> without <code>model</code>).')
-                    h.write('<br>Contact DeepSeek support with an example payload and the response snippet if you see repeated 400/403 errors.</p>')
-                    # add improved JS to implement copy-to-clipboard behavior with visual state
-                    h.write("<script>\n")
-                    h.write("document.addEventListener('click', function(ev){\n")
-                    h.write("  const btn = ev.target.closest('.copy-btn');\n")
-                    h.write("  if(!btn) return;\n")
-                    h.write("  const targetId = btn.getAttribute('data-target');\n")
-                    h.write("  if(!targetId) return;\n")
-                    h.write("  const pre = document.getElementById(targetId);\n")
-                    h.write("  if(!pre) return;\n")
-                    h.write("  const text = pre.innerText;\n")
-                    h.write("  // visual feedback: add copied class and change label\n")
-                    h.write("  const label = btn.querySelector('.label');\n")
-                    h.write("  const origLabel = label ? label.innerText : '';\n")
-                    h.write("  function showCopied(){ btn.classList.add('copied'); if(label) label.innerText='Copied!'; setTimeout(()=>{ btn.classList.remove('copied'); if(label) label.innerText=origLabel; },1500); }\n")
-                    h.write("  if(navigator && navigator.clipboard && navigator.clipboard.writeText){\n")
-                    h.write("    navigator.clipboard.writeText(text).then(()=>{ showCopied(); }).catch(()=>{\n")
-                    h.write("      // fallback to execCommand\n")
-                    h.write("      const ta = document.createElement('textarea'); ta.value=text; document.body.appendChild(ta); ta.select(); try{document.execCommand('copy'); showCopied();}catch(e){} ta.remove();\n")
-                    h.write("    });\n")
-                    h.write("  }else{\n")
-                    h.write("    const ta = document.createElement('textarea'); ta.value=text; document.body.appendChild(ta); ta.select(); try{document.execCommand('copy'); showCopied();}catch(e){} ta.remove();\n")
-                    h.write("  }\n")
-                    h.write("});\n")
-                    # theme toggle script: remember in localStorage
-                    h.write("(function(){ const tbtn=document.getElementById('theme-toggle'); if(!tbtn) return; function setDark(d){ if(d){document.body.classList.add('dark'); tbtn.innerText='🌙 Dark'; }else{document.body.classList.remove('dark'); tbtn.innerText='🌗 Theme'; } } try{ const pref=localStorage.getItem('ds_theme'); if(pref){ setDark(pref==='dark'); } else if(window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches){ setDark(true); } }catch(e){}\n")
-                    h.write("  function animateTheme(){ document.body.classList.add('theme-transition'); setTimeout(()=>document.body.classList.remove('theme-transition'),460); }\n")
-                    h.write("  // listen to system theme changes\n")
-                    h.write("  try{ if(window.matchMedia){ const mq=window.matchMedia('(prefers-color-scheme: dark)'); if(mq.addEventListener){ mq.addEventListener('change', function(ev){ animateTheme(); setDark(ev.matches); }); } else if(mq.addListener){ mq.addListener(function(ev){ animateTheme(); setDark(ev.matches); }); } } }catch(e){}\n")
-                    h.write("  tbtn.addEventListener('click', ()=>{ try{ animateTheme(); const willDark = !document.body.classList.contains('dark'); localStorage.setItem('ds_theme', willDark? 'dark':'light'); setDark(willDark); }catch(e){} }); })();\n")
-                    h.write("</script>\n")
-                h.write('</body></html>')
-        except Exception as e:
-            print('Failed to write HTML report:', repr(e))
-
+        from deepseek_client import iter_success_examples
+        history = write_examples_report(example_rows(iter_success_examples()), BASE_OUT, saved_summary, page_size)
     except Exception as e:
         print('Failed to write examples report:', repr(e))
 
+    out_json = os.path.join(BASE_OUT, 'prompt_comparison.json')
+    with open(out_json, 'w', encoding='utf-8') as f:
+        json.dump({'results': results, 'saved_examples': saved_summary,
+                   'history': {k: history.get(k) for k in ('examples', 'summary', 'by_format')}},
+                  f, ensure_ascii=False, indent=2)
+
     print('Prompt comparison written to', out_json)
-    print('Examples report written to', report_md)
-    return {'results': results, 'saved_examples': saved_summary}
+    print('Examples report written to', os.path.join(BASE_OUT, 'deepseek_examples_report.md'))
+    return {'results': results, 'saved_examples': saved_summary, 'history': history}
 
 
 if __name__ == '__main__':
     generate_report()
-
@@ -0,0 +1,48 @@
+// Shared script of the DeepSeek examples report pages: copy-to-clipboard buttons and theme toggle.
+
+// copy-to-clipboard with visual state (one delegated listener per page)
+document.addEventListener('click', function(ev){
+  const btn = ev.target.closest('.copy-btn');
+  if(!btn) return;
+  const targetId = btn.getAttribute('data-target');
+  if(!targetId) return;
+  const pre = document.getElementById(targetId);
+  if(!pre) return;
+  const text = pre.innerText;
+  // visual feedback: add copied class and change label
+  const label = btn.querySelector('.label');
+  const origLabel = label ? label.innerText : '';
+  function showCopied(){ btn.classList.add('copied'); if(label) label.innerText='Copied!'; setTimeout(()=>{ btn.classList.remove('copied'); if(label) label.innerText=origLabel; },1500); }
+  function fallbackCopy(){
+    const ta = document.createElement('textarea'); ta.value=text; document.body.appendChild(ta); ta.select();
+    try{ document.execCommand('copy'); showCopied(); }catch(e){}
+    ta.remove();
+  }
+  if(navigator && navigator.clipboard && navigator.clipboard.writeText){
+    navigator.clipboard.writeText(text).then(()=>{ showCopied(); }).catch(fallbackCopy);
+  }else{
+    fallbackCopy();
+  }
+});
+
+// theme toggle: remembered in localStorage, follows the system theme otherwise
+(function(){
+  const tbtn=document.getElementById('theme-toggle');
+  if(!tbtn) return;
+  function setDark(d){ if(d){ document.body.classList.add('dark'); tbtn.innerText='🌙 Dark'; }else{ document.body.classList.remove('dark'); tbtn.innerText='🌗 Theme'; } }
+  try{
+    const pref=localStorage.getItem('ds_theme');
+    if(pref){ setDark(pref==='dark'); }
+    else if(window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches){ setDark(true); }
+  }catch(e){}
+  function animateTheme(){ document.body.classList.add('theme-transition'); setTimeout(()=>document.body.classList.remove('theme-transition'),460); }
+  // listen to system theme changes
+  try{
+    if(window.matchMedia){
+      const mq=window.matchMedia('(prefers-color-scheme: dark)');
+      if(mq.addEventListener){ mq.addEventListener('change', function(ev){ animateTheme(); setDark(ev.matches); }); }
+      else if(mq.addListener){ mq.addListener(function(ev){ animateTheme(); setDark(ev.matches); }); }
+    }
+  }catch(e){}
+  tbtn.addEventListener('click', ()=>{ try{ animateTheme(); const willDark = !document.body.classList.contains('dark'); localStorage.setItem('ds_theme', willDark? 'dark':'light'); setDark(willDark); }catch(e){} });
+})();
@@ -1,104 +1,260 @@
 import os
 import json
+import functools
+import contextvars
 from dotenv import load_dotenv
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+import metrics
+import deadline as deadlines
+import tracing
 
 # Load .env if present so OPENAI_API_KEY can be read when the module is imported
 load_dotenv()
 OPENAI_KEY = os.getenv('OPENAI_API_KEY')
 
-# 尝试调用 OpenAI（可选），否则使用本地回退逻辑
+SYSTEM_PROMPT = (
+    "你是一个教学助理。输入是学生拍摄的题目或课堂笔记经 OCR 提取的文本。你的任务：\n"
+    "1) 提取最多 6 条 `learn_points`（中文每条不超过 15 个字，或等价简短英文）；\n"
+    "2) 提取 `confusions` 列表，项为 {left,right,explain,example}，其中 explain 不超过两行；\n"
+    "严格要求：只返回一个有效的 JSON 对象，只包含顶层键 `learn_points` 和 `confusions`。输出语言：中文。"
+)
+# OCR 文本紧跟在这一行之后
+OCR_MARKER = '现在请分析下面文本并仅返回 JSON：'
 
-def summarize(text):
+
+@functools.lru_cache(maxsize=1)
+def _prompt_prefix():
+    """few-shot 部分与输入无关，只拼接一次。"""
+    user = '请仅以 JSON 返回分析结果；以下是几个示例（输入 → 输出）：\n'
+    for inp, outp in build_few_shot_examples():
+        user += '输入：' + inp + '\n输出：' + json.dumps(outp, ensure_ascii=False) + '\n---\n'
+    return user + '\n' + OCR_MARKER + '\n'
+
+
+def build_prompt(text):
+    """返回 (system, user) 两段提示词。"""
+    return SYSTEM_PROMPT, _prompt_prefix() + text
+
+
+class BackendError(Exception):
+    """后端没有给出可用结果；reason 即 fallback_used 指标里记录的原因。"""
+
+    def __init__(self, reason, message='', sent=True):
+        super().__init__(message or reason)
+        self.reason = reason
+        # 是否真的向后端发出过请求（截止时间在请求前就用完时为 False）
+        self.sent = sent
+
+
+def _parse_content(content, reason):
+    parsed = try_extract_json(content) or try_brutal_json_search(content)
+    if parsed is None:
+        raise BackendError(reason)
+    return normalize_result(parsed)
+
+
+def _call_deepseek_backend(text):
+    try:
+        from deepseek_client import call_deepseek
+        # build prompt using the same few-shot examples
+        system, user = build_prompt(text)
+        with tracing.stage('llm_deepseek'):
+            content = call_deepseek(system + '\n' + user, max_tokens=800, temperature=0.0)
+    except deadlines.DeadlineExceeded as e:
+        print('DeepSeek 调用超出截止时间：', e)
+        raise BackendError('deadline_exceeded', str(e), sent=getattr(e, 'requests_sent', 0) > 0)
+    except Exception as e:
+        print('DeepSeek 调用失败：', e)
+        raise BackendError('deepseek_error', str(e))
+    return _parse_content(content, 'deepseek_unparsable')
+
+
+def _call_openai_backend(text):
+    if not OPENAI_KEY:
+        raise BackendError('not_configured')
+    try:
+        d = deadlines.current()
+        d.check('openai', 0.5)
+        import openai_client
+
+        system, user = build_prompt(text)
+        # 结构化输出（json_schema）一次往返即返回合法 JSON；文本抽取仅作兜底
+        with tracing.stage('llm_openai'):
+            content = openai_client.chat_json(OPENAI_KEY, system, user, max_tokens=800,
+                                              timeout=d.timeout(openai_client.DEFAULT_TIMEOUT_S))
+    except deadlines.DeadlineExceeded as e:
+        # 只会来自调用前的预算检查，请求尚未发出
+        raise BackendError('deadline_exceeded', str(e), sent=False)
+    except Exception as e:
+        print('OpenAI 调用失败：', e)
+        raise BackendError('openai_error', str(e))
+    return _parse_content(content, 'openai_unparsable')
+
+
+def _call_extractive_backend(text):
+    # 纯本地 CPU 抽取式摘要（TF-IDF + TextRank），不调用任何 LLM
+    try:
+        from extractive import extractive_summarize
+        with tracing.stage('extractive'):
+            res = extractive_summarize(text)
+    except Exception as e:
+        print('抽取式摘要失败：', e)
+        raise BackendError('extractive_error', str(e))
+    return normalize_result(res)
+
+
+def _call_fallback_backend(text):
+    return normalize_result(fallback_summarize(text))
+
+
+BACKENDS = {
+    'deepseek': _call_deepseek_backend,
+    'openai': _call_openai_backend,
+    'extractive': _call_extractive_backend,
+    'fallback': _call_fallback_backend,
+}
+
+
+def backend_name(name):
+    """LLM_BACKEND 取值规范化；未知取值沿用 openai 分支。"""
+    name = (name or 'openai').lower()
+    return name if name in BACKENDS else 'openai'
+
+
+# 远端后端的熔断键：同一后端的不同地址各自熔断
+_ENDPOINTS = {
+    'deepseek': lambda: os.getenv('DEEPSEEK_URL', ''),
+    'openai': lambda: os.getenv('OPENAI_MODEL', 'gpt-4o-mini'),
+}
+
+
+def call_backend(backend, text):
+    """调用单个后端并返回规范化结果；失败时抛出 BackendError。
+
+    远端后端经过熔断器：连续故障后直接抛出 circuit_open，不再等待探测与超时。
+    """
+    name = backend_name(backend)
+    endpoint = _ENDPOINTS.get(name)
+    import circuit_breaker
+    if endpoint is None or not circuit_breaker.enabled():
+        return BACKENDS[name](text)
+    breaker = circuit_breaker.breakers.get(name, endpoint())
+    if not breaker.allow():
+        raise BackendError('circuit_open', f'{name} circuit open')
+    try:
+        res = BACKENDS[name](text)
+    except BackendError as e:
+        # 能返回内容（即使无法解析）说明端点可用；调用错误和请求发出后超出截止时间计为失败
+        if e.reason == 'deadline_exceeded' and (not e.sent or deadlines.current().cancelled):
+            # 请求前预算就已用完（例如 OCR 太慢），或调用方已不需要结果（路由中落败的请求）：
+            # 与后端无关，只归还半开状态的探测名额
+            breaker.release()
+        elif e.reason.endswith('_error') or e.reason == 'deadline_exceeded':
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return res
+
+
+# 尝试调用配置的后端（deepseek / openai / extractive），失败时使用本地回退逻辑
+
+# 最近一次给出结果的后端（供近似重复缓存判断是否值得保存）
+_answer_source = contextvars.ContextVar('learncard_answer_source', default=None)
+# 只缓存远端 LLM 的结果，避免把回退结果固化下来
+CACHEABLE_BACKENDS = ('deepseek', 'openai')
+
+
+def record_answer(backend):
+    metrics.backend_answers.inc(backend=backend)
+    _answer_source.set(backend)
+
+
+def answer_source():
+    """本次 summarize 的结果来源（deepseek / openai / near_dup / fallback ...），供调用方判断结果是否值得缓存。"""
+    return _answer_source.get()
+
+
+def summarize(text, deadline=None):
+    """生成学习卡片内容。deadline（deadline.Deadline）限制远端调用的总耗时，默认沿用当前请求的截止时间。
+
+    NEAR_DUP_ENABLED=1 时先查近似重复缓存：命中则直接复用之前的结果，并在 result['near_dup']['score'] 中给出相似度。
+    """
+    _answer_source.set(None)
+    with deadlines.scope(deadline):
+        import near_dup
+        if not near_dup.enabled() or not (text or '').strip():
+            return _summarize(text)
+        return _summarize_near_dup(text, near_dup.get_index())
+
+
+def _summarize_near_dup(text, index):
+    try:
+        with tracing.stage('near_dup_lookup') as sp:
+            hit = index.lookup(text)
+            if sp is not None:
+                sp.set(hit=hit is not None, score=round(hit[1], 3) if hit else None)
+    except Exception as e:
+        print('近似重复缓存查询失败：', e)
+        hit = None
+    if hit is not None:
+        res, score = hit
+        metrics.cache_hits.inc(cache='near_dup')
+        record_answer('near_dup')
+        res = dict(res)
+        res['near_dup'] = {'score': round(score, 3)}
+        return res
+
+    res = _summarize(text)
+    if _answer_source.get() in CACHEABLE_BACKENDS:
+        try:
+            index.add(text, res)
+        except Exception as e:
+            print('写入近似重复缓存失败：', e)
+    return res
+
+
+def _summarize(text):
     text = (text or '').strip()
     if not text:
+        record_answer('empty')
         return {
             'learn_points': ['无法从图片中提取出明确的学习点，请拍清晰图片或补充文字。'],
             'confusions': []
         }
 
-    # Determine backend: environment variable LLM_BACKEND can be 'deepseek' or 'openai'.
-    backend = os.getenv('LLM_BACKEND', 'openai').lower()
+    # ROUTER_ENABLED=1 时由 router 并行调度：本地回退抢跑、主后端超过 p95 时对冲、截止时间到返回已有最佳结果
+    if os.getenv('ROUTER_ENABLED', '0') == '1':
+        import router
+        return router.route(text)
 
-    if backend == 'deepseek':
-        try:
-            from deepseek_client import call_deepseek
-            # build prompt using the same few-shot examples
-            examples = build_few_shot_examples()
-            system = (
-                "你是一个教学助理。输入是学生拍摄的题目或课堂笔记经 OCR 提取的文本。你的任务：\n"
-                "1) 提取最多 6 条 `learn_points`（中文每条不超过 15 个字，或等价简短英文）；\n"
-                "2) 提取 `confusions` 列表，项为 {left,right,explain,example}，其中 explain 不超过两行；\n"
-                "严格要求：只返回一个有效的 JSON 对象，只包含顶层键 `learn_points` 和 `confusions`。输出语言：中文。"
-            )
-            user = '请仅以 JSON 返回分析结果；以下是几个示例（输入 → 输出）：\n'
-            for inp, outp in examples:
-                user += '输入：' + inp + '\n输出：' + json.dumps(outp, ensure_ascii=False) + '\n---\n'
-            user += '\n现在请分析下面文本并仅返回 JSON：\n' + text
+    # Determine backend: environment variable LLM_BACKEND can be 'deepseek', 'openai' or 'extractive'.
+    backend = backend_name(os.getenv('LLM_BACKEND', 'openai'))
+    try:
+        res = call_backend(backend, text)
+    except BackendError as e:
+        return fallback_result(text, e.reason)
+    record_answer(backend)
+    return res
 
-            content = call_deepseek(system + '\n' + user, max_tokens=800, temperature=0.0)
-            parsed = try_extract_json(content) or try_brutal_json_search(content)
-            if parsed is None:
-                return normalize_result(fallback_summarize(text))
-            return normalize_result(parsed)
-        except Exception as e:
-            print('DeepSeek 调用失败，使用回退算法：', e)
-            return normalize_result(fallback_summarize(text))
-    else:
-        # fallback to OpenAI if configured
-        if OPENAI_KEY:
-            try:
-                import openai
-                openai.api_key = OPENAI_KEY
-
-                def build_for_openai():
-                    examples = build_few_shot_examples()
-                    system = (
-                        "你是一个教学助理。输入是学生拍摄的题目或课堂笔记经 OCR 提取的文本。你的任务：\n"
-                        "1) 提取最多 6 条 `learn_points`（中文每条不超过 15 个字，或等价简短英文）；\n"
-                        "2) 提取 `confusions` 列表，项为 {left,right,explain,example}，其中 explain 不超过两行；\n"
-                        "严格要求：只返回一个有效的 JSON 对象，只包含顶层键 `learn_points` 和 `confusions`。输出语言：中文。"
-                    )
-                    examples = build_few_shot_examples()
-                    user = '请仅以 JSON 返回分析结果；以下是几个示例（输入 → 输出）：\n'
-                    for inp, outp in examples:
-                        user += '输入：' + inp + '\n输出：' + json.dumps(outp, ensure_ascii=False) + '\n---\n'
-                    user += '\n现在请分析下面文本并仅返回 JSON：\n' + text
-                    return system, user
-
-                system, user = build_for_openai()
-                resp = openai.ChatCompletion.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-                    max_tokens=800,
-                    temperature=0.0
-                )
-                content = resp['choices'][0]['message']['content']
-                parsed = try_extract_json(content) or try_brutal_json_search(content)
-                if parsed is None:
-                    follow = "请严格且仅输出一个有效的 JSON 对象，且不要附加任何解释或非 JSON 文本。"
-                    resp2 = openai.ChatCompletion.create(
-                        model="gpt-4o-mini",
-                        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}, {"role":"user","content":follow}],
-                        max_tokens=400,
-                        temperature=0.0
-                    )
-                    parsed = try_extract_json(resp2['choices'][0]['message']['content']) or try_brutal_json_search(resp2['choices'][0]['message']['content'])
-
-                if parsed is None:
-                    return normalize_result(fallback_summarize(text))
-                return normalize_result(parsed)
-            except Exception as e:
-                print('OpenAI 调用失败，使用回退算法：', e)
-                return normalize_result(fallback_summarize(text))
-        else:
-            return normalize_result(fallback_summarize(text))
+
+def fallback_result(text, reason):
+    """使用本地回退算法，并记录回退原因（供 router 等调用方在远端不可用时直接使用）。"""
+    metrics.fallback_used.inc(reason=reason)
+    record_answer('fallback')
+    return normalize_result(fallback_summarize(text))
 
 
 def normalize_result(obj):
     """规范化输出：确保包含 learn_points 和 confusions，限制条数与长度，并用中文提示作为回退。"""
+    with tracing.stage('normalize_result'):
+        return _normalize_result(obj)
+
+
+def _normalize_result(obj):
     if not isinstance(obj, dict):
         return {'learn_points': ['无法解析模型输出，请重试或补充文本。'], 'confusions': []}
 
@@ -200,6 +356,9 @@ def build_few_shot_examples():
     examples.append((ex3_in, ex3_out))
     return examples
 
+MAX_FALLBACK_CONFUSIONS = 6
+
+
 def fallback_summarize(text):
     # 极简回退：取前几句作为学习点；尝试基于常见关键词检测混淆
     lines = [l.strip() for l in text.replace('\r','\n').split('\n') if l.strip()]
@@ -220,22 +379,14 @@ def fallback_summarize(text):
     if not learn_points:
         learn_points = ['请明确题目或拍清晰一点的图片，以便提取学习点。']
 
-    # 混淆点检测（增强版）：使用关键词到解释/例子的字典以生成更友好的输出
-    common_map = {
-        ('导数','微分'):("导数表示瞬时变化率；微分常用于表示小变化的近似。", "速度(导数) vs 小路程增量(微分)"),
-        ('偏导数','全导数'):("偏导数针对单个变量的变化；全导数考虑多个变量的联合变化。", "例如：温度关于时间和位置的全导数 vs 仅对时间的偏导数"),
-        ('行列式','矩阵'):("矩阵是数据结构，行列式是矩阵的一个数值特征。", "矩阵像变换，行列式像该变换放大缩小的程度"),
-        ('概率','频率'):("概率是模型的主观/理论值；频率是实验观察到的比率。", "抛硬币理论概率 0.5 vs 实际抛 10 次出现 7 次的频率 0.7")
-    }
+    # 混淆点检测：词表（data/confusion_glossary.tsv）编译成 Aho-Corasick 自动机，一次扫描匹配全部词条，
+    # 按命中次数和首次出现位置排序
     confusions = []
-    for (a,b), (ex, examp) in common_map.items():
-        if a in text or b in text:
-            confusions.append({
-                'left': a,
-                'right': b,
-                'explain': ex,
-                'example': examp
-            })
+    try:
+        from confusion_index import get_index
+        confusions = [dict(p) for p in get_index().rank(text, limit=MAX_FALLBACK_CONFUSIONS)]
+    except Exception as e:
+        print('加载混淆词表失败：', e)
     if not confusions:
         confusions = [{
             'left':'导数','right':'微分','explain':'导数=瞬时变化率，微分=用于近似的增量。','example':'速度(导数) vs 小路程增量(微分)'
@@ -245,6 +396,11 @@ def fallback_summarize(text):
 
 
 def generate_pdf(result, image_path, pdf_path):
+    # reportlab 加载较慢，推迟到第一次生成 PDF 时导入（warmup() 会提前加载）
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+
     c = canvas.Canvas(pdf_path, pagesize=A4)
     width, height = A4
     margin = 40
@@ -0,0 +1,28 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture(autouse=True, scope='session')
+def _isolated_outputs(tmp_path_factory):
+    """Keep traces, the DeepSeek debug log and generated uploads/PDFs out of the real outputs/."""
+    import app as app_module
+    import deepseek_client
+    import tracing
+    base = tmp_path_factory.mktemp('outputs')
+    for d in ('uploads', 'outputs'):
+        os.makedirs(base / d, exist_ok=True)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('TRACE_LOG', str(base / 'traces.jsonl'))
+        mp.setattr(tracing, '_writer', None)
+        mp.setattr(deepseek_client, 'DEBUG_LOG', str(base / 'deepseek_debug.log'))
+        mp.setattr(deepseek_client.debug_logger, '_writer', None)
+        mp.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(base / 'uploads'))
+        mp.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(base / 'outputs'))
+        yield base
+        for writer in (tracing._writer, deepseek_client.debug_logger._writer):
+            if writer is not None:
+                writer.close()
@@ -0,0 +1,96 @@
+import sys
+import os
+import io
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import admission
+import deadline as deadlines
+from admission import Limiter, Overloaded
+
+
+def test_full_queue_is_rejected_at_once():
+    lim = Limiter('t_full', limit=1, queue=0, max_wait_s=5)
+    before = admission.admission_rejected.value(stage='t_full', reason='queue_full')
+    with lim.slot():
+        t0 = time.monotonic()
+        with pytest.raises(Overloaded) as e:
+            lim.acquire()
+        assert time.monotonic() - t0 < 0.5
+    assert e.value.status == 429 and e.value.retry_after >= 1
+    assert admission.admission_rejected.value(stage='t_full', reason='queue_full') == before + 1
+    assert lim.stats()['in_flight'] == 0
+
+
+def test_queued_request_gets_the_released_slot():
+    lim = Limiter('t_queue', limit=1, queue=1, max_wait_s=5)
+    lim.acquire()
+    got = []
+    t = threading.Thread(target=lambda: (lim.acquire(), got.append(True)))
+    t.start()
+    for _ in range(100):
+        if lim.waiting:
+            break
+        time.sleep(0.01)
+    assert lim.waiting == 1 and admission.queue_depth.value(stage='t_queue') == 1
+    # the queue (one waiter) is full now
+    with pytest.raises(Overloaded):
+        lim.acquire()
+    lim.release(0.2)
+    t.join(2)
+    assert got == [True] and lim.in_flight == 1 and lim.waiting == 0
+
+
+def test_wait_is_bounded_by_max_wait_and_deadline():
+    lim = Limiter('t_wait', limit=1, queue=4, max_wait_s=0.1)
+    lim.acquire()
+    with pytest.raises(Overloaded) as e:
+        lim.acquire()
+    assert e.value.status == 503 and e.value.reason == 'timeout'
+    lim.max_wait_s = 30
+    with deadlines.scope(deadlines.Deadline(0.05)):
+        t0 = time.monotonic()
+        with pytest.raises(Overloaded):
+            lim.acquire()
+        assert time.monotonic() - t0 < 1
+
+
+def test_upload_is_shed_with_retry_after(monkeypatch, tmp_path):
+    import app as app_module
+    monkeypatch.setenv('ADMISSION_ENABLED', '1')
+    monkeypatch.setenv('ADMISSION_REQUEST_LIMIT', '1')
+    monkeypatch.setenv('ADMISSION_REQUEST_QUEUE', '0')
+    admission.controller.reset()
+    try:
+        with admission.slot('request'):
+            resp = app_module.app.test_client().post('/upload', data={'image': (io.BytesIO(b'x'), 'a.png')},
+                                                     content_type='multipart/form-data')
+        assert resp.status_code == 429
+        assert int(resp.headers['Retry-After']) >= 1
+        assert app_module.app.test_client().get('/admission').get_json()['request']['rejected'] == 1
+    finally:
+        admission.controller.reset()
+
+
+def test_saturated_llm_stage_degrades_to_fallback(monkeypatch, tmp_path):
+    import app as app_module
+    import metrics
+    monkeypatch.setenv('ADMISSION_LLM_LIMIT', '1')
+    monkeypatch.setenv('ADMISSION_LLM_QUEUE', '0')
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '0')
+    monkeypatch.setattr(app_module, '_ocr', lambda path: '导数是瞬时变化率')
+    monkeypatch.setattr(app_module, 'summarize', lambda text: pytest.fail('the LLM stage is full'))
+    admission.controller.reset()
+    before = metrics.fallback_used.value(reason='overloaded')
+    try:
+        with admission.slot('llm'):
+            resp = app_module.app.test_client().post('/upload', data={'image': (io.BytesIO(b'x'), 'a.png')},
+                                                     content_type='multipart/form-data')
+        assert resp.status_code == 200
+        assert '导数是瞬时变化率' in resp.get_data(as_text=True)
+        assert metrics.fallback_used.value(reason='overloaded') == before + 1
+    finally:
+        admission.controller.reset()
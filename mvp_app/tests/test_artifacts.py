@@ -0,0 +1,69 @@
+import sys
+import os
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import app as app_module
+from artifacts import content_etag, is_content_addressed
+
+
+def _client(monkeypatch, tmp_path):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path / 'outputs'))
+    os.makedirs(tmp_path / 'uploads', exist_ok=True)
+    os.makedirs(tmp_path / 'outputs', exist_ok=True)
+    return app_module.app.test_client()
+
+
+def test_upload_served_with_etag_and_immutable(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    name = f'{uuid.uuid4()}_page.png'
+    payload = bytes(range(256)) * 40
+    (tmp_path / 'uploads' / name).write_bytes(payload)
+
+    resp = client.get(f'/uploads/{name}')
+    assert resp.status_code == 200
+    assert resp.data == payload
+    etag = resp.headers['ETag'].strip('"')
+    assert etag == content_etag(str(tmp_path / 'uploads' / name))
+    assert 'immutable' in resp.headers['Cache-Control']
+    assert resp.headers.get('Accept-Ranges') == 'bytes'
+
+    resp = client.get(f'/uploads/{name}', headers={'If-None-Match': f'"{etag}"'})
+    assert resp.status_code == 304
+    assert resp.data == b''
+
+
+def test_range_request(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    name = f'{uuid.uuid4()}.pdf'
+    payload = b'0123456789' * 100
+    (tmp_path / 'outputs' / name).write_bytes(payload)
+
+    resp = client.get(f'/outputs/{name}', headers={'Range': 'bytes=10-19'})
+    assert resp.status_code == 206
+    assert resp.data == payload[10:20]
+    assert resp.headers['Content-Range'] == f'bytes 10-19/{len(payload)}'
+
+
+def test_internal_files_and_traversal_blocked(monkeypatch, tmp_path):
+    client = _client(monkeypatch, tmp_path)
+    (tmp_path / 'outputs' / 'report.html').write_text('<html></html>', encoding='utf-8')
+    (tmp_path / 'outputs' / 'deepseek_success_examples.json').write_text('[]', encoding='utf-8')
+    os.makedirs(tmp_path / 'outputs' / 'batch', exist_ok=True)
+    name = f'{uuid.uuid4()}.pdf'
+    (tmp_path / 'outputs' / 'batch' / name).write_bytes(b'%PDF')
+    (tmp_path / 'secret.txt').write_text('secret', encoding='utf-8')
+
+    # only generated artifact names are served; reports, examples and sub-directories are not
+    assert client.get('/outputs/report.html').status_code == 404
+    assert client.get('/outputs/deepseek_success_examples.json').status_code == 404
+    assert client.get(f'/outputs/batch/{name}').status_code == 404
+    assert client.get('/outputs/../secret.txt').status_code == 404
+    assert client.get(f'/outputs/{uuid.uuid4()}.pdf').status_code == 404
+
+
+def test_content_addressed_names():
+    assert is_content_addressed(f'{uuid.uuid4()}_photo.jpg')
+    assert is_content_addressed('ab' * 16 + '.webp')
+    assert not is_content_addressed('deepseek_examples_report.html')
@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import batch
+from bench.corpus import generate_corpus
+
+
+def _records(out_dir):
+    with open(os.path.join(out_dir, batch.RESULTS_NAME), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def _fake_ocr(path):
+    return {'text': '导数是瞬时变化率，微分是增量的线性主部。' + os.path.basename(path), 'ms': 1.0}
+
+
+def test_discover_directory_and_manifests(tmp_path):
+    (tmp_path / 'imgs' / 'sub').mkdir(parents=True)
+    for name in ('b.png', 'a.jpg', 'notes.txt', 'sub/c.webp'):
+        (tmp_path / 'imgs' / name).write_bytes(b'x')
+    assert [i['id'] for i in batch.discover(str(tmp_path / 'imgs'))] == ['a.jpg', 'b.png', 'sub/c.webp']
+
+    (tmp_path / 'list.txt').write_text('imgs/a.jpg\n# comment\nimgs/b.png\n', encoding='utf-8')
+    items = batch.discover(str(tmp_path / 'list.txt'))
+    assert [i['id'] for i in items] == ['imgs/a.jpg', 'imgs/b.png']
+    assert items[0]['path'] == str(tmp_path / 'imgs' / 'a.jpg')
+
+    (tmp_path / 'm.json').write_text(json.dumps([{'id': 'p1', 'path': 'imgs/a.jpg', 'text': 't'}]), encoding='utf-8')
+    assert batch.discover(str(tmp_path / 'm.json')) == [{'id': 'p1', 'path': str(tmp_path / 'imgs' / 'a.jpg'), 'text': 't'}]
+
+
+def test_discover_deduplicates_ids(tmp_path):
+    (tmp_path / 'm.jsonl').write_text('\n'.join(json.dumps(e) for e in [
+        {'id': 'p1', 'path': 'a.png'}, {'id': 'p1', 'path': 'a.png'}, {'id': 'p1', 'path': 'b.png'},
+        {'path': 'c.png'}, {'id': 'c.png', 'path': 'd.png'}]), encoding='utf-8')
+    items = batch.discover(str(tmp_path / 'm.jsonl'))
+    assert [(i['id'], os.path.basename(i['path'])) for i in items] == [
+        ('p1', 'a.png'), ('p1#2', 'b.png'), ('c.png', 'c.png'), ('c.png#2', 'd.png')]
+
+
+def test_run_writes_records_and_resumes(monkeypatch, tmp_path):
+    monkeypatch.setenv('LLM_BACKEND', 'extractive')
+    items = [{'id': f'p{i}.png', 'path': f'/nowhere/p{i}.png'} for i in range(6)]
+    fail = {'/nowhere/p2.png'}
+
+    def flaky_ocr(path):
+        if path in fail:
+            return {'error': 'ocr: boom'}
+        return _fake_ocr(path)
+
+    monkeypatch.setattr(batch, 'ocr_job', flaky_ocr)
+    out = str(tmp_path / 'out')
+    summary = batch.run_batch(items, out, ocr_workers=0, llm_workers=3, progress_stream=None)
+    assert summary['ok'] == 5 and summary['failed'] == 1 and summary['skipped'] == 0
+    recs = _records(out)
+    ok = [r for r in recs if r['status'] == 'ok']
+    assert {r['id'] for r in ok} == {f'p{i}.png' for i in (0, 1, 3, 4, 5)}
+    assert all(r['result']['learn_points'] and r['source'] == 'extractive' for r in ok)
+
+    # simulate a run killed mid-write, then resume: only the failed item is redone
+    with open(os.path.join(out, batch.RESULTS_NAME), 'a', encoding='utf-8') as f:
+        f.write('{"id": "p0.png", "sta')
+    fail.clear()
+    seen = []
+    monkeypatch.setattr(batch, 'ocr_job', lambda path: seen.append(path) or _fake_ocr(path))
+    summary = batch.run_batch(items, out, ocr_workers=0, llm_workers=3, progress_stream=None)
+    assert seen == ['/nowhere/p2.png']
+    assert summary['skipped'] == 5 and summary['ok'] == 1
+    assert batch.load_checkpoint(os.path.join(out, batch.RESULTS_NAME)) == {i['id'] for i in items}
+
+    # nothing left to do
+    assert batch.run_batch(items, out, ocr_workers=0, progress_stream=None)['skipped'] == 6
+
+
+def test_summarize_errors_are_recorded(monkeypatch, tmp_path):
+    import summarizer
+    monkeypatch.setattr(batch, 'ocr_job', _fake_ocr)
+
+    def broken(text, deadline=None):
+        raise RuntimeError('llm down')
+
+    monkeypatch.setattr(summarizer, 'summarize', broken)
+    summary = batch.run_batch([{'id': 'a', 'path': '/x/a.png'}], str(tmp_path), ocr_workers=0, progress_stream=None)
+    assert summary['failed'] == 1
+    assert _records(str(tmp_path))[0]['error'] == 'summarize: llm down'
+
+
+def test_cli_process_pool_with_pdfs_and_deck(monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv('LLM_BACKEND', 'extractive')
+    corpus = tmp_path / 'corpus'
+    generate_corpus(str(corpus), sizes=('small',), languages=('zh',), styles=('printed', 'handwritten'))
+    out = tmp_path / 'out'
+    summary = batch.main([str(corpus / 'manifest.json'), '-o', str(out), '--ocr-workers', '2', '--llm-workers', '2',
+                          '--pdf', '--deck', '--fallback-text'])
+    assert summary['ok'] == 2 and summary['failed'] == 0
+    recs = _records(str(out))
+    assert all(os.path.exists(r['pdf_path']) for r in recs)
+    assert summary['deck']['cards'] == 2 and os.path.exists(out / 'deck.pdf')
+    assert json.loads(capsys.readouterr().out)['ok'] == 2
+
+
+def test_ocr_job_shares_the_upload_ocr_path(monkeypatch, tmp_path):
+    import app as app_module
+    import ocr_utils
+    monkeypatch.setenv('OCR_CLEANUP', '1')
+    monkeypatch.setattr(ocr_utils, 'preprocess_image', lambda path: 'img')
+    monkeypatch.setattr(ocr_utils, 'tesseract_words', lambda img: [
+        {'text': '导数', 'conf': 95, 'block': 1, 'par': 1, 'line': 1},
+        {'text': '是瞬时变化率', 'conf': 90, 'block': 1, 'par': 1, 'line': 1},
+        {'text': '~', 'conf': 10, 'block': 1, 'par': 1, 'line': 2}])
+    res = batch.ocr_job(str(tmp_path / 'p.png'))
+    assert res['text'] == '导数是瞬时变化率' == app_module._ocr(str(tmp_path / 'p.png'))
@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench.corpus import generate_corpus
+from bench.fake_llm import FakeLLM, installed
+from bench import run as bench_run
+
+
+def test_corpus_is_deterministic(tmp_path):
+    a = generate_corpus(str(tmp_path / 'a'), sizes=('small',), languages=('zh', 'en'), per_combo=1)
+    b = generate_corpus(str(tmp_path / 'b'), sizes=('small',), languages=('zh', 'en'), per_combo=1)
+    assert len(a) == 4
+    assert [e['text'] for e in a] == [e['text'] for e in b]
+    assert all(os.path.exists(e['path']) for e in a)
+    assert os.path.exists(tmp_path / 'a' / 'manifest.json')
+
+
+def test_fake_llm_routes_summarize(monkeypatch):
+    fake = FakeLLM(latency_ms=0)
+    from summarizer import summarize
+    with installed(fake):
+        res = summarize('导数是瞬时变化率\n微分是近似增量')
+    assert fake.calls == 1
+    assert res['learn_points'][0] == '导数是瞬时变化率'
+    assert os.getenv('DEEPSEEK_URL') != 'http://fake-llm.invalid'
+
+
+def test_regressions_flagged():
+    base = {'stages': {'ocr': {'p50': 100.0, 'p95': 200.0}, 'summarize': {'p50': 10.0, 'p95': 12.0}}}
+    cur = {'stages': {'ocr': {'p50': 130.0, 'p95': 210.0}, 'summarize': {'p50': 13.0, 'p95': 12.0}}}
+    regs = bench_run.find_regressions(cur, base, tolerance=0.2, min_delta_ms=5)
+    # summarize grew 30% but only by 3 ms, which is noise
+    assert [(r['stage'], r['quantile']) for r in regs] == [('ocr', 'p50')]
+
+
+def test_main_writes_history_and_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr('ocr_utils.tesseract_ocr', lambda img: '')
+    args = ['--sizes', 'small', '--languages', 'en', '--llm-latency-ms', '0',
+            '--corpus-dir', str(tmp_path / 'corpus'), '--history', str(tmp_path / 'history.json'),
+            '--baseline', str(tmp_path / 'baseline.json')]
+    assert bench_run.main(args + ['--save-baseline']) == 0
+    assert bench_run.main(args + ['--tolerance', '1000']) == 0
+    history = json.loads((tmp_path / 'history.json').read_text(encoding='utf-8'))
+    assert len(history) == 2
+    summary = history[-1]['summary']
+    assert summary['items'] == 2
+    assert set(summary['stages']) == {'preprocess_image', 'ocr', 'summarize', 'generate_pdf', 'end_to_end'}
+    assert history[-1]['regressions'] == []
+
+
+def test_stage_table_prints_dash_for_empty_stages():
+    summary = bench_run.aggregate([], 0.0)
+    table = bench_run.stage_table(summary)
+    assert table.splitlines()[1].split() == ['preprocess_image', '-', '-', '-']
+    assert bench_run.HISTORY_FILE == os.path.join(bench_run.BENCH_DIR, 'history.json')
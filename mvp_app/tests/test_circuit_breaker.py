@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import summarizer
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, BreakerRegistry, CLOSED, OPEN, HALF_OPEN
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_opens_on_failure_rate_and_recovers_through_probe():
+    clock = Clock()
+    b = CircuitBreaker('deepseek', 'http://x', window=10, min_calls=4, failure_rate=0.5, open_s=30, clock=clock)
+    for ok in (True, False, True):
+        b.record_success() if ok else b.record_failure()
+    assert b.state == CLOSED
+    b.record_failure()  # 2 of 4 failed
+    assert b.state == OPEN
+    assert not b.allow()
+
+    clock.t = 31
+    assert b.state == HALF_OPEN
+    assert b.allow()
+    assert not b.allow()  # only one probe at a time
+    b.record_failure()
+    assert b.state == OPEN
+
+    clock.t = 62
+    assert b.allow()
+    b.record_success()
+    assert b.state == CLOSED and b.allow()
+
+
+def test_shared_across_threads():
+    b = CircuitBreaker('deepseek', window=100, min_calls=50, failure_rate=0.5)
+    threads = [threading.Thread(target=lambda: [b.record_failure() for _ in range(10)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert b.state == OPEN
+
+
+def test_summarize_short_circuits_dead_backend(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, 'breakers', BreakerRegistry())
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://dead.invalid')
+    monkeypatch.setenv('CB_MIN_CALLS', '3')
+    calls = []
+
+    def dead(text):
+        calls.append(text)
+        time.sleep(0.05)
+        raise summarizer.BackendError('deepseek_error')
+
+    monkeypatch.setitem(summarizer.BACKENDS, 'deepseek', dead)
+    for _ in range(3):
+        summarizer.summarize('导数')
+    assert circuit_breaker.breakers.get('deepseek', 'http://dead.invalid').state == OPEN
+
+    before = metrics.fallback_used.value(reason='circuit_open')
+    t0 = time.monotonic()
+    res = summarizer.summarize('导数是瞬时变化率')
+    assert time.monotonic() - t0 < 0.05
+    assert len(calls) == 3
+    assert res['learn_points'] == ['导数是瞬时变化率']
+    assert metrics.fallback_used.value(reason='circuit_open') == before + 1
+    assert 'learncard_circuit_state{backend="deepseek",endpoint="http://dead.invalid"} 2' in circuit_breaker.breakers.render()
+
+
+def test_unparsable_answers_do_not_trip(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, 'breakers', BreakerRegistry())
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://garbled.invalid')
+
+    def garbled(text):
+        raise summarizer.BackendError('deepseek_unparsable')
+
+    monkeypatch.setitem(summarizer.BACKENDS, 'deepseek', garbled)
+    for _ in range(10):
+        summarizer.summarize('导数')
+    assert circuit_breaker.breakers.get('deepseek', 'http://garbled.invalid').state == CLOSED
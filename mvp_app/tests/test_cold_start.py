@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import summarizer
+import warmup
+
+# generous: a cold `import app` is ~0.25 s here; the point is to catch reportlab/openai creeping back in
+IMPORT_BUDGET_US = 2_000_000
+
+
+def test_app_import_defers_heavy_modules():
+    audit = warmup.import_audit('app')
+    loaded = [m for m in warmup.DEFERRED_MODULES if m in audit['modules']]
+    assert loaded == []
+    assert audit['total_us'] < IMPORT_BUDGET_US
+
+
+def test_summarizer_import_does_not_load_reportlab():
+    audit = warmup.import_audit('summarizer')
+    assert 'reportlab' not in audit['modules']
+
+
+def test_prompt_prefix_built_once():
+    summarizer._prompt_prefix.cache_clear()
+    system, user = summarizer.build_prompt('牛顿第一定律')
+    assert system == summarizer.SYSTEM_PROMPT
+    assert user.endswith(summarizer.OCR_MARKER + '\n牛顿第一定律')
+    summarizer.build_prompt('另一段文本')
+    assert summarizer._prompt_prefix.cache_info().hits >= 1
+
+
+def test_warmup_reports_timings():
+    timings = warmup.warmup(start_background=False)
+    assert set(timings) == {'reportlab', 'tesseract', 'http', 'openai', 'prompts'}
+    assert timings['reportlab'] is not None and timings['prompts'] is not None
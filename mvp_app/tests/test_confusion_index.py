@@ -0,0 +1,80 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import confusion_index
+from confusion_index import ConfusionIndex, load_glossary, load_index
+from summarizer import fallback_summarize
+from bench import confusion_bench
+
+
+def _pairs(*items):
+    return [{'left': a, 'right': b, 'explain': '', 'example': ''} for a, b in items]
+
+
+def test_find_reports_overlapping_terms():
+    idx = ConfusionIndex.build(_pairs(('he', 'she'), ('his', 'hers')))
+    assert sorted((idx.terms[t], pos) for t, pos in idx.find('ushers')) == [('he', 2), ('hers', 2), ('she', 1)]
+
+
+def test_rank_by_hits_then_position():
+    idx = ConfusionIndex.build(_pairs(('概率', '频率'), ('导数', '微分'), ('矩阵', '行列式')))
+    ranked = idx.rank('概率是什么？导数，微分，导数。')
+    assert [p['left'] for p in ranked] == ['导数', '概率']
+    assert idx.rank('无关内容') == []
+
+
+def test_prebuilt_roundtrip_and_rebuild(tmp_path):
+    src = tmp_path / 'g.tsv'
+    src.write_text('# 注释\n导数\t微分\t解释\t例子\n', encoding='utf-8')
+    idx = load_index(str(src))
+    prebuilt = tmp_path / 'g.idx'
+    assert prebuilt.exists()
+    mapped = ConfusionIndex.load(str(prebuilt))
+    assert mapped.rank('导数') == idx.rank('导数') == [{'left': '导数', 'right': '微分', 'explain': '解释', 'example': '例子'}]
+
+    # editing the glossary invalidates the prebuilt file
+    src.write_text('导数\t微分\t解释\t例子\n极限\t连续\t\t\n', encoding='utf-8')
+    os.utime(src, ns=(1, 1))
+    assert [p['left'] for p in load_index(str(src)).rank('极限与连续')] == ['极限']
+
+
+def test_concurrent_saves_do_not_share_a_temp_file(tmp_path):
+    import threading
+    idx = ConfusionIndex.build(_pairs(('导数', '微分'), ('极限', '连续')))
+    path = str(tmp_path / 'g.idx')
+    threads = [threading.Thread(target=idx.save, args=(path,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert os.listdir(tmp_path) == ['g.idx']
+    assert ConfusionIndex.load(path).rank('导数') == idx.rank('导数')
+
+
+def test_saved_index_follows_umask(tmp_path):
+    import stat
+    import confusion_index
+    path = str(tmp_path / 'g.idx')
+    ConfusionIndex.build(_pairs(('导数', '微分'))).save(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~confusion_index._UMASK
+
+
+def test_fallback_uses_glossary(monkeypatch, tmp_path):
+    src = tmp_path / 'g.tsv'
+    src.write_text('向量\t标量\t有方向 vs 无方向\t速度 vs 速率\n', encoding='utf-8')
+    monkeypatch.setenv('CONFUSION_GLOSSARY', str(src))
+    monkeypatch.setattr(confusion_index, '_index', None)
+    res = fallback_summarize('向量的加法')
+    assert res['confusions'] == [{'left': '向量', 'right': '标量', 'explain': '有方向 vs 无方向', 'example': '速度 vs 速率'}]
+    monkeypatch.setattr(confusion_index, '_index', None)
+
+
+def test_shipped_glossary_loads():
+    pairs = load_glossary(confusion_index.GLOSSARY_FILE)
+    assert ('导数', '微分') in {(p['left'], p['right']) for p in pairs}
+
+
+def test_bench_matches_linear_scan():
+    r = confusion_bench.run(n_pairs=500, text_chars=300, repeat=1)
+    assert r['matched_pairs'] > 0 and r['index_bytes'] > 0
@@ -0,0 +1,129 @@
+import sys
+import os
+import time
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import summarizer
+import deepseek_client
+import circuit_breaker
+import deadline as deadlines
+from deadline import Deadline, DeadlineExceeded
+
+
+class Resp:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        raise ValueError
+
+
+def _configure(monkeypatch, tmp_path):
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'fake')
+    monkeypatch.delenv('DEEPSEEK_MODEL', raising=False)
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(tmp_path / 'none.json'))
+
+
+def test_deadline_arithmetic():
+    now = [100.0]
+    d = Deadline(10, clock=lambda: now[0])
+    assert d.remaining() == 10 and d.timeout(30) == 10 and d.timeout(3) == 3
+    half = d.share(0.5)
+    assert half.remaining() == 5
+    now[0] = 111
+    assert d.expired()
+    with pytest.raises(DeadlineExceeded):
+        d.check()
+    assert not Deadline(None).bounded and Deadline(None).timeout(30) == 30
+
+
+def test_scope_only_tightens():
+    outer = Deadline(1)
+    with deadlines.scope(outer):
+        with deadlines.scope(Deadline(100)) as inner:
+            assert inner is outer
+        with deadlines.scope(None) as same:
+            assert same is outer
+    assert deadlines.current() is deadlines.NO_DEADLINE
+
+
+def test_http_timeouts_follow_remaining_budget(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    timeouts = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        timeouts.append(timeout)
+        return Resp(403, 'RPM limit exceeded')
+
+    monkeypatch.setattr(requests, 'post', fake_post)
+    monkeypatch.setattr('time.sleep', lambda s: None)
+    before = metrics.deepseek_403_retries.value()
+    with pytest.raises(DeadlineExceeded):
+        deepseek_client.call_deepseek('hi', deadline=Deadline(1.5))
+    assert timeouts and all(t <= 1.5 for t in timeouts)
+    # a 2s+ backoff never fits into the budget, so no 403 retry is attempted
+    assert metrics.deepseek_403_retries.value() == before
+
+
+def test_slow_endpoint_bounded_by_deadline(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+
+    def slow_post(url, headers=None, json=None, timeout=None):
+        time.sleep(min(timeout, 0.3))
+        return Resp(400, 'bad')
+
+    monkeypatch.setattr(requests, 'post', slow_post)
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        deepseek_client.call_deepseek('hi', deadline=Deadline(1.0))
+    assert time.monotonic() - t0 < 1.3
+
+
+def test_summarize_falls_back_on_expired_deadline(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    monkeypatch.setattr(circuit_breaker, 'breakers', circuit_breaker.BreakerRegistry())
+
+    def no_post(*a, **kw):
+        raise AssertionError('no HTTP call once the budget is spent')
+
+    monkeypatch.setattr(requests, 'post', no_post)
+    before = metrics.fallback_used.value(reason='deadline_exceeded')
+    res = summarizer.summarize('导数是瞬时变化率', deadline=Deadline(0))
+    assert res['learn_points'] == ['导数是瞬时变化率']
+    assert metrics.fallback_used.value(reason='deadline_exceeded') == before + 1
+
+
+def test_spent_budget_does_not_trip_the_breaker(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    monkeypatch.setenv('CB_MIN_CALLS', '3')
+    monkeypatch.setattr(circuit_breaker, 'breakers', circuit_breaker.BreakerRegistry())
+    monkeypatch.setattr(requests, 'post', lambda *a, **kw: Resp(500, 'boom'))
+    for _ in range(10):
+        summarizer.summarize('导数', deadline=Deadline(0))
+    breaker = circuit_breaker.breakers.get('deepseek', 'http://fake')
+    assert breaker.state == circuit_breaker.CLOSED
+
+    # a half-open probe slot is handed back, not held by a call that never went out
+    breaker._set_state(circuit_breaker.HALF_OPEN)
+    summarizer.summarize('导数', deadline=Deadline(0))
+    assert breaker.allow()
+
+
+def test_env_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv('LEARNCARD_TEST_ENV', '2.5')
+    assert deadlines.env('LEARNCARD_TEST_ENV', '1') == 2.5
+    for bad in ('', 'abc', '3.5'):
+        monkeypatch.setenv('LEARNCARD_TEST_ENV', bad)
+        assert deadlines.env('LEARNCARD_TEST_ENV', 10, int) == 10
+    monkeypatch.delenv('LEARNCARD_TEST_ENV')
+    assert deadlines.env('LEARNCARD_TEST_ENV', '0.5') == 0.5
+    monkeypatch.setenv('UPLOAD_DEADLINE_S', 'soon')
+    assert 59 < deadlines.from_env('UPLOAD_DEADLINE_S', '60').remaining() <= 60
@@ -0,0 +1,72 @@
+import sys
+import os
+import re
+import json
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from deck_export import DeckWriter, export_deck, iter_results_dir, main
+
+RESULT = {'learn_points': ['导数的几何意义', 'derivative'], 'confusions': [{'left': '导数', 'right': '微分', 'explain': '区别', 'example': '例子'}]}
+
+
+def _make_image(path, color='red'):
+    Image.new('RGB', (800, 600), color).save(path)
+    return str(path)
+
+
+def _xref_offsets_valid(data: bytes):
+    start = int(data.rsplit(b'startxref', 1)[1].split()[0])
+    assert data[start:start + 4] == b'xref'
+    header = data[start:].split(b'\n')[1].split()
+    size = int(header[1])
+    entries = data[start:].split(b'\n')[3:3 + size - 1]
+    for oid, entry in enumerate(entries, 1):
+        off = int(entry.split()[0])
+        assert data[off:].startswith(f'{oid} 0 obj'.encode())
+
+
+def test_deck_shares_images_and_font(tmp_path):
+    img = _make_image(tmp_path / 'a.png')
+    other = _make_image(tmp_path / 'b.png', color='blue')
+    pdf = str(tmp_path / 'deck.pdf')
+
+    stats = export_deck([(RESULT, img), (RESULT, img), (RESULT, other), (RESULT, None)], pdf)
+    assert stats['cards'] == 4
+    assert stats['pages'] == 4
+    assert stats['images'] == 2
+
+    data = open(pdf, 'rb').read()
+    assert data.startswith(b'%PDF-1.4')
+    assert data.rstrip().endswith(b'%%EOF')
+    assert data.count(b'/Subtype /Image') == 2
+    assert data.count(b'/Subtype /Type0') == 1
+    assert len(re.findall(rb'/Type /Page\b', data)) == 4
+    assert b'/Count 4' in data
+    _xref_offsets_valid(data)
+
+
+def test_long_card_spills_onto_extra_pages(tmp_path):
+    result = {'learn_points': [f'点{i}' for i in range(60)], 'confusions': []}
+    pdf = str(tmp_path / 'long.pdf')
+    with DeckWriter(pdf) as deck:
+        deck.add_card(result)
+    assert deck.stats()['pages'] > 1
+    _xref_offsets_valid(open(pdf, 'rb').read())
+
+
+def test_cli_over_results_dir(tmp_path):
+    img = _make_image(tmp_path / 'page.png')
+    with open(tmp_path / '001.json', 'w', encoding='utf-8') as f:
+        json.dump({'result': RESULT, 'image_path': 'page.png'}, f, ensure_ascii=False)
+    with open(tmp_path / '002.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(RESULT, ensure_ascii=False) + '\n')
+        f.write(json.dumps({'result': RESULT, 'image_path': img}, ensure_ascii=False) + '\n')
+    with open(tmp_path / 'notes.json', 'w', encoding='utf-8') as f:
+        json.dump({'unrelated': True}, f)
+
+    assert len(list(iter_results_dir(str(tmp_path)))) == 3
+    stats = main([str(tmp_path), '-o', str(tmp_path / 'out' / 'deck.pdf')])
+    assert stats['cards'] == 3
+    assert stats['images'] == 1
+    assert os.path.exists(tmp_path / 'out' / 'deck.pdf')
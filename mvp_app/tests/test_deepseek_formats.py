@@ -89,6 +89,8 @@ def test_minimal_text_payload_tried_first_and_persist(monkeypatch, tmp_path):
     with open(persisted, 'r', encoding='utf-8') as f:
         data = json.load(f)
     assert any(e.get('format') == 'text' for e in data)
+    # request headers carry the API key and are never persisted
+    assert all('headers' not in e for e in data)
 
 
 def test_saved_example_playback(monkeypatch, tmp_path):
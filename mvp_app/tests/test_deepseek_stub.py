@@ -0,0 +1,99 @@
+import sys
+import os
+import io
+import json
+import threading
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench.deepseek_stub import StubConfig, detect_format, serve
+from bench.loadtest import run_load
+
+
+def _deepseek_env(monkeypatch, tmp_path, url, model=None):
+    import deepseek_client
+    monkeypatch.setenv('DEEPSEEK_URL', url)
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'k')
+    if model:
+        monkeypatch.setenv('DEEPSEEK_MODEL', model)
+    else:
+        monkeypatch.delenv('DEEPSEEK_MODEL', raising=False)
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(tmp_path / 'success.json'))
+    monkeypatch.setattr('time.sleep', lambda s: None)
+    return deepseek_client
+
+
+def test_detect_every_probed_format(monkeypatch, tmp_path):
+    seen = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        seen.append(detect_format(json))
+        raise requests.ConnectionError('nope')
+
+    dc = _deepseek_env(monkeypatch, tmp_path, 'http://x', model='m')
+    monkeypatch.setattr(requests, 'post', fake_post)
+    try:
+        dc.call_deepseek('p')
+    except Exception:
+        pass
+    assert seen == ['text', 'prompt', 'input', 'input_wrapped', 'openai_chat_simple_nomodel',
+                    'openai_chat_system_nomodel', 'prompt_with_model', 'openai_chat_simple', 'openai_chat_system']
+
+
+def test_call_deepseek_against_stub(monkeypatch, tmp_path):
+    cfg = StubConfig(accept=['openai_chat_simple_nomodel'], latency_ms=0, api_key='k')
+    server, url = serve(cfg)
+    try:
+        dc = _deepseek_env(monkeypatch, tmp_path, url)
+        out = dc.call_deepseek('现在请分析下面文本并仅返回 JSON：\n导数')
+        assert json.loads(out)['learn_points'] == ['导数']
+        assert cfg.stats['ok:openai_chat_simple_nomodel'] == 1
+        assert cfg.stats['rejected:text'] == 1
+        # the winner was persisted and is replayed first next time
+        dc.call_deepseek('again')
+        assert cfg.stats['requests'] == 6
+    finally:
+        server.shutdown()
+
+
+def test_stub_rpm_limit_and_malformed():
+    cfg = StubConfig(latency_ms=0, rpm=2, malformed_rate=1.0)
+    server, url = serve(cfg)
+    try:
+        codes = [requests.post(url, json={'text': 'a'}, timeout=5).status_code for _ in range(3)]
+        assert codes == [200, 200, 403]
+        cfg.rpm = 0
+        resp = requests.post(url, json={'prompt': 'a'}, timeout=5)
+        assert resp.status_code == 200
+        try:
+            resp.json()
+            assert False, 'expected malformed JSON'
+        except ValueError:
+            pass
+        assert requests.get(url + '/stats', timeout=5).json()['rpm_limited'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_load_driver_against_app(monkeypatch, tmp_path):
+    from werkzeug.serving import make_server
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(app_module, 'summarize', lambda text: {'learn_points': ['点'], 'confusions': []})
+    img = tmp_path / 'page.png'
+    Image.new('RGB', (64, 64), 'white').save(img)
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/upload'
+        report = run_load(url, [str(img)], concurrency=3, total=6)
+        bad = run_load(f'http://127.0.0.1:{server.server_port}/nope', [str(img)], concurrency=2, total=2)
+    finally:
+        server.shutdown()
+    assert report['outcomes'] == {'200': 6}
+    assert report['latency_ms']['p50'] is not None
+    assert report['throughput_per_s'] > 0
+    assert bad['outcomes'] == {'404': 2} and bad['error_rate'] == 1.0
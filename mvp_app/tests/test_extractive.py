@@ -0,0 +1,57 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import summarizer
+import extractive
+from extractive import split_sentences, rank_sentences, extractive_summarize, tfidf_matrix
+from bench import extractive_bench
+
+PAGE = ('导数表示函数在某一点的瞬时变化率。微分是函数增量的线性主部，用于近似计算。\n'
+        '例如速度是位移对时间的导数。导数的几何意义是切线的斜率！\n'
+        'The derivative measures the rate of change. Differentials approximate small changes.')
+
+
+def test_split_sentences_mixed_punctuation():
+    assert split_sentences('第一句。第二句！Third one. Fourth?\n第五句话\n短') == \
+        ['第一句。', '第二句！', 'Third one.', 'Fourth?', '第五句话']
+
+
+def test_rank_sentences_keeps_document_order_and_drops_duplicates():
+    text = PAGE + '\n导数表示函数在某一点的瞬时变化率。'
+    picked = rank_sentences(text, k=3)
+    assert len(picked) == 3
+    assert picked.count('导数表示函数在某一点的瞬时变化率。') <= 1
+    order = [split_sentences(PAGE).index(s) for s in rank_sentences(PAGE, k=4)]
+    assert order == sorted(order)
+
+
+def test_extractive_schema_and_glossary_confusions():
+    res = extractive_summarize(PAGE)
+    assert 1 <= len(res['learn_points']) <= 6
+    assert all(lp in PAGE for lp in res['learn_points'])
+    assert ('导数', '微分') in {(c['left'], c['right']) for c in res['confusions']}
+
+
+def test_summarize_extractive_backend(monkeypatch):
+    monkeypatch.setenv('LLM_BACKEND', 'extractive')
+    before = metrics.backend_answers.value(backend='extractive')
+    res = summarizer.summarize(PAGE)
+    assert res['learn_points'] and res['confusions']
+    assert metrics.backend_answers.value(backend='extractive') == before + 1
+
+
+def test_extractive_bench_runs():
+    r = extractive_bench.run(pages=5, size='small')
+    assert r['pages'] == 5 and r['ms_per_page']['p50'] >= 0
+
+
+def test_matrix_stays_bounded_on_long_text():
+    sentences = [f'第{i}句讲导数与微分的区别{i * 7}。' for i in range(3000)]
+    x = tfidf_matrix(sentences, max_features=256)
+    assert x.shape == (3000, 256)
+    # merged multi-page text: at most MAX_SENTENCES are ranked, spread over the whole text
+    picked = rank_sentences(''.join(sentences), k=6)
+    assert 1 <= len(picked) <= 6
+    assert len(split_sentences(''.join(sentences))) > extractive.MAX_SENTENCES
@@ -0,0 +1,138 @@
+import sys
+import os
+import io
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import image_hash
+from image_hash import ImageHashIndex, MultiIndex, image_hashes, hamming
+from bench.corpus import generate_corpus
+from bench.image_hash_bench import reshoot
+
+RESULT = {'learn_points': ['导数=瞬时变化率'], 'confusions': []}
+
+
+def _pages(tmp_path):
+    manifest = generate_corpus(str(tmp_path / 'corpus'), sizes=('small', 'medium'), languages=('zh', 'en'),
+                               styles=('printed',), per_combo=2)
+    # small pages can repeat the same text (and so the same image); keep one per text
+    return list({p['text']: p for p in manifest}.values())
+
+
+def test_multi_index_matches_brute_force():
+    rng = random.Random(1)
+    mih = MultiIndex(256, 12)
+    keys = [rng.getrandbits(256) for _ in range(300)]
+    base = keys[0]
+    # near copies of the first key, with 1..20 flipped bits
+    for n in range(1, 21):
+        k = base
+        for b in rng.sample(range(256), n):
+            k ^= 1 << b
+        keys.append(k)
+    for i, k in enumerate(keys):
+        mih.add(k, i)
+    found = mih.search(base)
+    assert [v for _, v in found] == sorted((i for i, k in enumerate(keys) if hamming(base, k) <= 12),
+                                           key=lambda i: hamming(base, keys[i]))
+    assert found[0] == (0, 0)
+    assert all(d <= 5 for d, _ in mih.search(base, 5))
+
+
+def test_reshot_page_matches_and_other_pages_do_not(tmp_path):
+    pages = _pages(tmp_path)
+    idx = ImageHashIndex(str(tmp_path / 'ih.sqlite'))
+    for p in pages:
+        idx.add(image_hashes(p['path']), p['text'], {'learn_points': [p['id']], 'confusions': []})
+    rng = random.Random(0)
+    for p in pages:
+        hit = idx.lookup(image_hashes(reshoot(p['path'], rng)))
+        assert hit is not None and hit['ocr_text'] == p['text']
+        assert hit['result']['learn_points'] == [p['id']]
+        assert hit['distance'] <= idx.max_distance and hit['phash_distance'] <= idx.max_phash_distance
+    # with only the first page stored, the others must miss
+    only = ImageHashIndex(str(tmp_path / 'one.sqlite'))
+    only.add(image_hashes(pages[0]['path']), pages[0]['text'])
+    assert only.lookup(image_hashes(pages[0]['path']))['result'] is None
+    for p in pages[1:]:
+        assert only.lookup(image_hashes(p['path'])) is None
+
+
+def test_entries_from_other_instances_are_picked_up(tmp_path):
+    pages = _pages(tmp_path)
+    a = ImageHashIndex(str(tmp_path / 'ih.sqlite'))
+    b = ImageHashIndex(str(tmp_path / 'ih.sqlite'))
+    h = image_hashes(pages[0]['path'])
+    assert b.lookup(h) is None
+    a.add(h, pages[0]['text'], RESULT)
+    assert b.lookup(h)['result'] == RESULT
+    assert b.count() == 1
+
+
+def test_prune_drops_oldest_and_other_instances_rebuild(tmp_path):
+    rng = random.Random(2)
+    a = ImageHashIndex(str(tmp_path / 'ih.sqlite'))
+    b = ImageHashIndex(str(tmp_path / 'ih.sqlite'))
+    hashes = [(rng.getrandbits(256), rng.getrandbits(1024)) for _ in range(10)]
+    a.add_many([(h, str(i), None) for i, h in enumerate(hashes)])
+    assert b.lookup(hashes[0])['ocr_text'] == '0'
+    assert a.prune(10) == 0
+    a.add(hashes[0], '0 again')
+    assert a.prune(10) == 2 and a.count() == 9
+    assert b.lookup(hashes[1]) is None
+    assert b.lookup(hashes[0])['ocr_text'] == '0 again'
+    assert len(b._mih) == 9
+
+
+def _upload(app_module, path):
+    with open(path, 'rb') as f:
+        data = {'image': (io.BytesIO(f.read()), 'page.png')}
+    return app_module.app.test_client().post('/upload', data=data, content_type='multipart/form-data')
+
+
+def test_upload_skips_ocr_for_reshot_page(monkeypatch, tmp_path):
+    import app as app_module
+    pages = _pages(tmp_path)
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '1')
+    monkeypatch.setattr(image_hash, '_index', ImageHashIndex(str(tmp_path / 'ih.sqlite')))
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    ocr_calls, summarize_calls = [], []
+    monkeypatch.setattr(app_module, '_ocr', lambda path: ocr_calls.append(path) or 'OCR 文本')
+    monkeypatch.setattr(app_module, 'summarize', lambda text: summarize_calls.append(text) or dict(RESULT))
+    monkeypatch.setattr(app_module, 'answer_source', lambda: 'openai')
+    before = metrics.cache_hits.value(cache='image_hash')
+
+    assert _upload(app_module, pages[0]['path']).status_code == 200
+    assert len(ocr_calls) == 1 and len(summarize_calls) == 1
+
+    shot = tmp_path / 'shot.jpg'
+    shot.write_bytes(reshoot(pages[0]['path'], random.Random(3)).read())
+    resp = _upload(app_module, str(shot))
+    assert resp.status_code == 200
+    assert len(ocr_calls) == 1 and len(summarize_calls) == 1
+    assert 'OCR 文本' in resp.get_data(as_text=True)
+    assert metrics.cache_hits.value(cache='image_hash') == before + 1
+
+    # a different page still goes through OCR
+    _upload(app_module, pages[1]['path'])
+    assert len(ocr_calls) == 2
+
+
+def test_fallback_results_are_not_reused(monkeypatch, tmp_path):
+    import app as app_module
+    pages = _pages(tmp_path)
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '1')
+    monkeypatch.setattr(image_hash, '_index', ImageHashIndex(str(tmp_path / 'ih.sqlite')))
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    ocr_calls, summarize_calls = [], []
+    monkeypatch.setattr(app_module, '_ocr', lambda path: ocr_calls.append(path) or 'OCR 文本')
+    monkeypatch.setattr(app_module, 'summarize', lambda text: summarize_calls.append(text) or dict(RESULT))
+    monkeypatch.setattr(app_module, 'answer_source', lambda: 'fallback')
+
+    _upload(app_module, pages[0]['path'])
+    _upload(app_module, pages[0]['path'])
+    # OCR text is reused, the fallback result is recomputed
+    assert len(ocr_calls) == 1 and len(summarize_calls) == 2
@@ -0,0 +1,57 @@
+import sys
+import os
+import io
+from PIL import Image, features
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import app as app_module
+from image_variants import generate_variants, template_context, variant_widths
+
+
+def test_generate_variants_widths_and_size(tmp_path):
+    src = tmp_path / 'photo.png'
+    Image.effect_noise((2000, 1500), 64).convert('RGB').save(src)
+
+    v = generate_variants(str(src), widths=(320, 640))
+    assert (v['width'], v['height']) == (2000, 1500)
+    assert [w for _, w in v['jpeg']] == [320, 640]
+    for name, w in v['jpeg']:
+        with Image.open(tmp_path / name) as im:
+            assert im.size == (w, 240 if w == 320 else 480)
+    if features.check('webp'):
+        assert [n for n, _ in v['webp']] == ['photo.w320.webp', 'photo.w640.webp']
+    # the smallest variant is an order of magnitude lighter than the original
+    assert os.path.getsize(tmp_path / v['jpeg'][0][0]) * 10 < os.path.getsize(src)
+
+
+def test_small_images_not_upscaled(tmp_path):
+    src = tmp_path / 'small.jpg'
+    Image.new('RGB', (200, 100), 'white').save(src)
+    v = generate_variants(str(src), widths=(320, 640))
+    assert [w for _, w in v['jpeg']] == [200]
+    ctx = template_context(v, '/uploads')
+    assert ctx['src'] == '/uploads/small.w200.jpg'
+    assert ctx['jpeg_srcset'] == '/uploads/small.w200.jpg 200w'
+
+
+def test_variant_widths_env(monkeypatch):
+    monkeypatch.setenv('IMAGE_VARIANT_WIDTHS', '800, 400')
+    assert variant_widths() == (400, 800)
+    monkeypatch.setenv('IMAGE_VARIANT_WIDTHS', 'bogus')
+    assert variant_widths() == (320, 640, 1024)
+
+
+def test_result_page_uses_srcset(monkeypatch, tmp_path):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(app_module, 'summarize', lambda text: {'learn_points': ['点'], 'confusions': []})
+    buf = io.BytesIO()
+    Image.new('RGB', (1200, 900), 'white').save(buf, 'PNG')
+    buf.seek(0)
+
+    resp = app_module.app.test_client().post('/upload', data={'image': (buf, 'page.png')}, content_type='multipart/form-data')
+    assert resp.status_code == 200
+    page = resp.get_data(as_text=True)
+    assert 'srcset="/uploads/' in page
+    assert '.w320.jpg 320w' in page
+    assert any(name.endswith('.w640.jpg') for _, _, files in os.walk(tmp_path) for name in files)
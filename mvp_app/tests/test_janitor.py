@@ -0,0 +1,84 @@
+import sys
+import os
+import json
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import deepseek_client
+from janitor import DirQuota, Janitor, parse_size, shard_key, sharded_path, touch
+
+
+def _write(path, size, age_s, now):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (now - age_s, now - age_s))
+    return path
+
+
+def test_sharding_groups_upload_artifacts(tmp_path):
+    fid = str(uuid.uuid4())
+    a = sharded_path(str(tmp_path), f'{fid}_page.png')
+    b = sharded_path(str(tmp_path), f'{fid}_page.w320.webp')
+    c = sharded_path(str(tmp_path), f'{fid}.pdf')
+    assert os.path.dirname(a) == os.path.dirname(b) == os.path.dirname(c)
+    assert os.path.relpath(os.path.dirname(a), tmp_path).count(os.sep) == 1
+    assert shard_key('report.html') == 'report.html'
+
+
+def test_age_and_lru_quota(tmp_path):
+    now = time.time()
+    ids = [str(uuid.uuid4()) for _ in range(4)]
+    # group 0 is expired; groups 1..3 are 300 bytes each with increasing recency
+    _write(sharded_path(str(tmp_path), f'{ids[0]}_old.png'), 100, 40 * 86400, now)
+    for i, fid in enumerate(ids[1:], 1):
+        _write(sharded_path(str(tmp_path), f'{fid}_p.png'), 200, 1000 - i * 100, now)
+        _write(sharded_path(str(tmp_path), f'{fid}_p.w320.jpg'), 100, 1000 - i * 100, now)
+    # files that are not sharded artifacts are never swept, however old
+    _write(str(tmp_path / 'deepseek_success_examples.json'), 50, 90 * 86400, now)
+    _write(str(tmp_path / 'bench_history.json'), 50, 90 * 86400, now)
+    _write(str(tmp_path / 'prompt_eval' / 'calls.jsonl'), 50, 90 * 86400, now)
+    stray = f'{uuid.uuid4()}_unsharded.png'
+    _write(str(tmp_path / stray), 50, 90 * 86400, now)
+
+    j = Janitor([DirQuota('uploads', str(tmp_path), max_bytes=700, max_age_s=30 * 86400, low_water=1.0)],
+                success_examples_max=0)
+    stats = j.run_once(now=now)
+
+    remaining = sorted(n for _, _, files in os.walk(tmp_path) for n in files)
+    # expired group and the least recently used group are gone, protected file kept
+    assert not any(n.startswith(ids[0]) or n.startswith(ids[1]) for n in remaining)
+    assert sum(n.startswith(ids[3]) for n in remaining) == 2
+    assert {'deepseek_success_examples.json', 'bench_history.json', 'calls.jsonl', stray} <= set(remaining)
+    assert stats['files_removed'] == 3
+    assert stats['bytes_reclaimed'] == 400
+    assert stats['dirs']['uploads']['bytes'] == 600
+
+
+def test_touch_updates_access_but_keeps_mtime(tmp_path):
+    now = time.time()
+    p = _write(str(tmp_path / 'a.png'), 10, 7200, now)
+    mtime = os.stat(p).st_mtime_ns
+    touch(p)
+    st = os.stat(p)
+    assert st.st_mtime_ns == mtime
+    assert st.st_atime > now - 60
+
+
+def test_trims_success_examples(monkeypatch, tmp_path):
+    success = tmp_path / 'deepseek_success_examples.json'
+    success.write_text(json.dumps([{'format': 'text', 'n': i} for i in range(10)]), encoding='utf-8')
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(success))
+
+    stats = Janitor([], success_examples_max=3).run_once()
+    assert [e['n'] for e in json.loads(success.read_text(encoding='utf-8'))] == [7, 8, 9]
+    assert stats['bytes_reclaimed'] > 0
+
+
+def test_parse_size():
+    assert parse_size('2G') == 2 * 1024 ** 3
+    assert parse_size('512mb') == 512 * 1024 ** 2
+    assert parse_size('100') == 100
+    assert parse_size('', default=7) == 7
+    assert parse_size('lots', default=7) == 7
@@ -0,0 +1,106 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from log_writer import AsyncLogWriter, SampledLogger, parse_level, DEBUG, INFO, WARNING
+
+
+def _lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_writes_in_background_with_lazy_formatting(tmp_path):
+    w = AsyncLogWriter(str(tmp_path / 'd.log'))
+    w.submit(INFO, 'Format %s -> status %s snippet: %.5s', ('text', 200, 'abcdefghij'))
+    w.submit(DEBUG, 'bad format %d', ('x',))
+    w.flush()
+    lines = _lines(tmp_path / 'd.log')
+    assert lines[0].endswith('INFO Format text -> status 200 snippet: abcde')
+    assert 'bad format %d' in lines[1]
+    w.close()
+
+
+def test_rotation_keeps_backups(tmp_path):
+    path = str(tmp_path / 'd.log')
+    w = AsyncLogWriter(path, max_bytes=200, backups=2, batch_size=1)
+    for i in range(30):
+        w.submit(DEBUG, 'line %02d ' + 'x' * 40, (i,))
+    w.flush()
+    w.close()
+    assert os.path.exists(path + '.1') and os.path.exists(path + '.2')
+    assert not os.path.exists(path + '.3')
+    assert all(os.path.getsize(p) <= 200 for p in (path, path + '.1', path + '.2'))
+    assert 'line 29' in _lines(path)[-1]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    w = AsyncLogWriter(str(tmp_path / 'd.log'), queue_size=1)
+    for i in range(2000):
+        w.submit(DEBUG, 'spam %d', (i,))
+    w.flush()
+    assert w.dropped > 0
+    assert w.written + w.dropped == 2000
+    w.close()
+
+
+def test_level_filter_and_sampling(tmp_path):
+    submitted = []
+
+    class FakeWriter:
+        def submit(self, level, msg, args):
+            submitted.append((level, msg % args))
+
+        def close(self):
+            pass
+
+    log = SampledLogger(lambda: FakeWriter(), level=INFO, sample_rate=0.25)
+    log.log(DEBUG, 'dropped by level')
+    for i in range(100):
+        log.log(INFO, 'attempt %d', i, sampled=True)
+    log.log(WARNING, 'always kept')
+    assert ('dropped by level' not in [m for _, m in submitted])
+    assert len([m for _, m in submitted if m.startswith('attempt')]) == 25
+    assert submitted[-1] == (WARNING, 'always kept')
+
+
+def test_parse_level():
+    assert parse_level('warning') == WARNING
+    assert parse_level('15') == 15
+    assert parse_level('', default=INFO) == INFO
+    assert parse_level('nonsense') == DEBUG
+
+
+def test_deepseek_client_logs_through_writer(monkeypatch, tmp_path):
+    import requests
+    import deepseek_client
+    writer = AsyncLogWriter(str(tmp_path / 'deepseek_debug.log'))
+    monkeypatch.setattr(deepseek_client, 'debug_logger', SampledLogger(lambda: writer))
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(tmp_path / 'success.json'))
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'fake')
+    monkeypatch.delenv('DEEPSEEK_MODEL', raising=False)
+
+    class Resp:
+        status_code = 200
+        text = '{"text": "ok"}'
+
+        def json(self):
+            return {'text': 'ok'}
+
+    monkeypatch.setattr(requests, 'post', lambda url, headers=None, json=None, timeout=None: Resp())
+    assert deepseek_client.call_deepseek('p') == 'ok'
+    writer.flush()
+    text = '\n'.join(_lines(tmp_path / 'deepseek_debug.log'))
+    assert 'Trying format text' in text
+    assert 'INFO Format text succeeded' in text
+    writer.close()
+
+
+def test_invalid_log_settings_fall_back_to_defaults(monkeypatch, tmp_path):
+    import deepseek_client
+    monkeypatch.setattr(deepseek_client, 'DEBUG_LOG', str(tmp_path / 'deepseek_debug.log'))
+    monkeypatch.setenv('DEEPSEEK_LOG_BACKUPS', 'three')
+    writer = deepseek_client._make_log_writer()
+    assert writer.backups == 3
+    writer.close()
@@ -0,0 +1,97 @@
+import sys
+import os
+import io
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+from metrics import Registry, percentile
+
+
+class DummyResp:
+    def __init__(self, status_code=200, text='', j=None):
+        self.status_code = status_code
+        self.text = text
+        self._json = j
+
+    def json(self):
+        if self._json is None:
+            raise ValueError('No JSON')
+        return self._json
+
+
+def test_histogram_and_counter_exposition():
+    reg = Registry()
+    h = reg.histogram('t_seconds', 'test histogram', ('stage',), buckets=(0.1, 1.0))
+    c = reg.counter('t_total', 'test counter', ('kind',))
+    h.observe(0.05, stage='ocr')
+    h.observe(0.5, stage='ocr')
+    h.observe(5, stage='ocr')
+    c.inc(kind='a"b')
+    text = reg.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{stage="ocr",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="ocr",le="1.0"} 2' in text
+    assert 't_seconds_bucket{stage="ocr",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="ocr"} 3' in text
+    assert 't_total{kind="a\\"b"} 1' in text
+    # registering the same name again returns the existing metric
+    assert reg.counter('t_total', 'again', ('kind',)) is c
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile(list(range(1, 101)), 50) == 50
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([3, 1, 2], 100) == 3
+
+
+def test_deepseek_counters(monkeypatch, tmp_path):
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'fake')
+    monkeypatch.delenv('DEEPSEEK_MODEL', raising=False)
+    import deepseek_client
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(tmp_path / 'success.json'))
+    calls = {'n': 0}
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        calls['n'] += 1
+        if calls['n'] == 1:
+            return DummyResp(403, 'RPM limit')
+        return DummyResp(200, j={'text': 'ok'})
+
+    monkeypatch.setattr(requests, 'post', fake_post)
+    monkeypatch.setattr('time.sleep', lambda s: None)
+    retries = metrics.deepseek_403_retries.value()
+    wins = metrics.deepseek_format_wins.value(format='text')
+    assert deepseek_client.call_deepseek('p') == 'ok'
+    assert metrics.deepseek_403_retries.value() == retries + 1
+    assert metrics.deepseek_format_wins.value(format='text') == wins + 1
+
+
+def test_metrics_endpoint_after_upload(monkeypatch, tmp_path):
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setenv('LLM_BACKEND', 'openai')
+    monkeypatch.setattr('summarizer.OPENAI_KEY', None)
+    # plain-text OCR path (the cleanup stage reads word boxes instead)
+    monkeypatch.setenv('OCR_CLEANUP', '0')
+    monkeypatch.setattr('ocr_utils.tesseract_ocr', lambda img: '导数与微分')
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), 'white').save(buf, 'PNG')
+    buf.seek(0)
+    client = app_module.app.test_client()
+    fallbacks = metrics.fallback_used.value(reason='not_configured')
+    assert client.post('/upload', data={'image': (buf, 'a.png')}, content_type='multipart/form-data').status_code == 200
+
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    body = resp.get_data(as_text=True)
+    for stage in ('upload', 'preprocess_image', 'ocr', 'summarize', 'normalize_result', 'generate_pdf'):
+        assert f'learncard_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'learncard_backend_answers_total{backend="fallback"}' in body
+    assert metrics.fallback_used.value(reason='not_configured') == fallbacks + 1
+    assert 'learncard_janitor_bytes_reclaimed_total' in body
@@ -0,0 +1,83 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import near_dup
+import summarizer
+import circuit_breaker
+from near_dup import NearDupIndex, minhash, similarity
+from bench import near_dup_bench
+
+PAGE = ('导数表示函数在某一点的瞬时变化率，微分是函数增量的线性主部，用于近似计算。'
+        '例如速度是位移对时间的导数，加速度是速度对时间的导数。')
+RESULT = {'learn_points': ['导数=瞬时变化率'], 'confusions': [{'left': '导数', 'right': '微分', 'explain': 'e', 'example': 'x'}]}
+
+
+def test_signature_ignores_layout_and_punctuation():
+    assert similarity(minhash(PAGE), minhash(PAGE.replace('，', '\n').replace('。', ' . '))) == 1.0
+    assert similarity(minhash(PAGE), minhash('概率是理论值，频率是实验中观察到的比率，二者不要混淆。')) < 0.3
+
+
+def test_lookup_reports_score(tmp_path):
+    idx = NearDupIndex(str(tmp_path / 'nd.sqlite'))
+    idx.add(PAGE, RESULT)
+    noisy = PAGE.replace('速度', '速庋', 1)
+    res, score = idx.lookup(noisy)
+    assert res == RESULT and idx.threshold <= score < 1.0
+    assert idx.lookup('概率是理论值，频率是实验中观察到的比率，二者不要混淆。') is None
+    assert idx.lookup('太短') is None
+    # persisted: a new instance over the same file sees the entry
+    assert NearDupIndex(str(tmp_path / 'nd.sqlite')).lookup(PAGE)[1] == 1.0
+
+
+def test_prune_keeps_newest(tmp_path):
+    idx = NearDupIndex(str(tmp_path / 'nd.sqlite'))
+    for i in range(5):
+        idx.add(PAGE + str(i) * 30, {'learn_points': [str(i)], 'confusions': []})
+    assert idx.prune(2) == 3 and idx.count() == 2
+
+
+def test_summarize_reuses_near_duplicate(monkeypatch, tmp_path):
+    monkeypatch.setenv('NEAR_DUP_ENABLED', '1')
+    monkeypatch.setattr(near_dup, '_index', NearDupIndex(str(tmp_path / 'nd.sqlite')))
+    monkeypatch.setattr(circuit_breaker, 'breakers', circuit_breaker.BreakerRegistry())
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    calls = []
+    monkeypatch.setitem(summarizer.BACKENDS, 'deepseek', lambda text: calls.append(text) or dict(RESULT))
+
+    first = summarizer.summarize(PAGE)
+    assert 'near_dup' not in first
+    before = metrics.cache_hits.value(cache='near_dup')
+    second = summarizer.summarize(PAGE.replace('，', '\n'))
+    assert len(calls) == 1
+    assert second['learn_points'] == RESULT['learn_points'] and second['near_dup']['score'] == 1.0
+    assert metrics.cache_hits.value(cache='near_dup') == before + 1
+
+
+def test_fallback_results_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setenv('NEAR_DUP_ENABLED', '1')
+    monkeypatch.setattr(near_dup, '_index', NearDupIndex(str(tmp_path / 'nd.sqlite')))
+    monkeypatch.setattr(summarizer, 'OPENAI_KEY', None)
+    monkeypatch.setenv('LLM_BACKEND', 'openai')
+    summarizer.summarize(PAGE)
+    assert near_dup.get_index().count() == 0
+
+
+def test_bench_small():
+    r = near_dup_bench.run(entries=2000, queries=20)
+    assert r['entries'] >= 2000 and r['hit_rate'] > 0.5
+
+
+def test_janitor_prunes_to_max_entries(monkeypatch, tmp_path):
+    from janitor import Janitor
+    idx = NearDupIndex(str(tmp_path / 'nd.sqlite'))
+    for i in range(5):
+        idx.add(PAGE + str(i) * 30, {'learn_points': [str(i)], 'confusions': []})
+    monkeypatch.setattr(near_dup, '_index', idx)
+    monkeypatch.setenv('NEAR_DUP_MAX_ENTRIES', '2')
+    monkeypatch.setenv('NEAR_DUP_ENABLED', '0')
+    assert Janitor([]).run_once()['cache_entries_removed'] == 0
+    monkeypatch.setenv('NEAR_DUP_ENABLED', '1')
+    assert Janitor([]).run_once()['cache_entries_removed'] == 3
+    assert idx.count() == 2 and idx.lookup(PAGE + '4' * 30) is not None
@@ -0,0 +1,76 @@
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import summarizer
+import openai_client
+import circuit_breaker
+
+ANSWER = {'learn_points': ['导数是瞬时变化率'], 'confusions': [{'left': '导数', 'right': '微分', 'explain': 'e', 'example': 'x'}]}
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class FakeClient:
+    def __init__(self, contents, reject_schema=False):
+        self.contents = list(contents)
+        self.reject_schema = reject_schema
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kw):
+        self.calls.append(kw)
+        if self.reject_schema and kw['response_format']['type'] == 'json_schema':
+            raise BadRequest("Invalid parameter: 'response_format' of type 'json_schema' is not supported with this model")
+        msg = SimpleNamespace(content=self.contents.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+
+def _install(monkeypatch, client, model='gpt-4o-mini'):
+    monkeypatch.setattr(summarizer, 'OPENAI_KEY', 'sk-test')
+    monkeypatch.setattr(openai_client, 'get_client', lambda key: client)
+    monkeypatch.setattr(circuit_breaker, 'breakers', circuit_breaker.BreakerRegistry())
+    monkeypatch.setenv('LLM_BACKEND', 'openai')
+    monkeypatch.setenv('OPENAI_MODEL', model)
+
+
+def test_structured_output_single_round_trip(monkeypatch):
+    client = FakeClient([json.dumps(ANSWER, ensure_ascii=False)])
+    _install(monkeypatch, client)
+    res = summarizer.summarize('导数与微分')
+    assert res['learn_points'] == ANSWER['learn_points']
+    assert len(client.calls) == 1
+    fmt = client.calls[0]['response_format']
+    assert fmt['type'] == 'json_schema'
+    assert fmt['json_schema']['schema']['required'] == ['learn_points', 'confusions']
+
+
+def test_unparsable_answer_does_not_trigger_second_call(monkeypatch):
+    client = FakeClient(['抱歉，我无法完成'])
+    _install(monkeypatch, client)
+    before = metrics.fallback_used.value(reason='openai_unparsable')
+    summarizer.summarize('导数与微分')
+    assert len(client.calls) == 1
+    assert metrics.fallback_used.value(reason='openai_unparsable') == before + 1
+
+
+def test_schema_rejection_falls_back_to_json_object(monkeypatch):
+    client = FakeClient([json.dumps(ANSWER)] * 2, reject_schema=True)
+    _install(monkeypatch, client, model='legacy-model')
+    monkeypatch.setattr(openai_client, '_schema_unsupported', set())
+    summarizer.summarize('导数')
+    summarizer.summarize('导数')
+    assert [c['response_format']['type'] for c in client.calls] == ['json_schema', 'json_object', 'json_object']
+
+
+def test_client_is_shared(monkeypatch):
+    monkeypatch.setattr(openai_client, '_client', None)
+    a = openai_client.get_client('sk-a')
+    assert openai_client.get_client('sk-a') is a
+    assert a.max_retries == 0
+    monkeypatch.setattr(openai_client, '_client', None)
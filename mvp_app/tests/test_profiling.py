@@ -0,0 +1,104 @@
+import sys
+import os
+import io
+import json
+import time
+import pstats
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import profiling
+from profiling import RequestProfile
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_sampler_collects_collapsed_stacks(tmp_path):
+    prof = RequestProfile(interval_s=0.002).start()
+    with prof.attach():
+        _busy(0.2)
+    prof.stop()
+    assert sum(prof.samples.values()) > 10
+    assert any('_busy (test_profiling.py:' in stack.split(';')[-1] for stack in prof.samples)
+
+    paths = prof.write(str(tmp_path), 'abc123', {'ocr': 150.04})
+    with open(paths['profile'], encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    stack, count = lines[0].rsplit(' ', 1)
+    assert ';' in stack and int(count) > 0
+    with open(paths['meta'], encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['trace_id'] == 'abc123' and meta['stage_ms'] == {'ocr': 150.0}
+    assert meta['profile'] == os.path.basename(paths['profile'])
+
+
+def test_cprofile_mode_writes_pstats(tmp_path):
+    prof = RequestProfile(mode=profiling.CPROFILE).start()
+    with prof.attach():
+        _busy(0.05)
+    prof.stop()
+    paths = prof.write(str(tmp_path), 'def456')
+    assert paths['profile'].endswith('.prof')
+    funcs = {fn for _, _, fn in pstats.Stats(paths['profile']).stats}
+    assert '_busy' in funcs
+
+
+def test_only_slow_sampled_uploads_are_kept(monkeypatch, tmp_path):
+    import app as app_module
+    from PIL import Image
+    out = tmp_path / 'profiles'
+    monkeypatch.setenv('PROFILE_ENABLED', '1')
+    monkeypatch.setenv('PROFILE_SAMPLE_RATE', '1')
+    monkeypatch.setenv('PROFILE_MIN_MS', '250')
+    monkeypatch.setenv('PROFILE_DIR', str(out))
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '0')
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(app_module, '_ocr', lambda path: 'OCR 文本')
+    delay = {'s': 0.0}
+    monkeypatch.setattr(app_module, 'summarize', lambda text: (_busy(delay['s']), {'learn_points': [], 'confusions': []})[1])
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), 'white').save(buf, 'PNG')
+
+    def post():
+        return app_module.app.test_client().post('/upload', data={'image': (io.BytesIO(buf.getvalue()), 'p.png')},
+                                                 content_type='multipart/form-data')
+
+    assert post().status_code == 200
+    assert not out.exists() or not os.listdir(out)
+
+    delay['s'] = 0.4
+    resp = post()
+    trace_id = resp.headers['X-Trace-Id']
+    metas = [n for n in os.listdir(out) if n.endswith('.json')]
+    assert len(metas) == 1 and trace_id in metas[0]
+    with open(out / metas[0], encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['duration_ms'] >= 400 and meta['stage_ms']['summarize'] >= 400
+    assert os.path.exists(out / meta['profile'])
+
+
+def test_profiler_that_cannot_start_is_skipped(monkeypatch):
+    class Busy:
+        def enable(self):
+            raise ValueError('Another profiling tool is already active')
+
+        def disable(self):
+            raise AssertionError('never enabled')
+
+    monkeypatch.setattr(profiling.cProfile, 'Profile', Busy)
+    prof = RequestProfile(mode=profiling.CPROFILE).start()
+    token = profiling._current.set(prof)
+    try:
+        with profiling.attach() as p:
+            assert _busy(0.01) > 0
+    finally:
+        profiling._current.reset(token)
+    prof.stop()
+    assert p is prof and prof.empty()
+
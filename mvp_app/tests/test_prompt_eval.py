@@ -0,0 +1,151 @@
+import sys
+import os
+import json
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import prompt_eval
+from prompt_eval import RateLimiter, estimate_tokens, schema_score, parse_output
+
+GOOD = {'learn_points': ['导数=瞬时变化率'], 'confusions': [{'left': '导数', 'right': '微分', 'explain': 'e', 'example': 'x'}]}
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('导数定义') == 4
+    assert estimate_tokens('abcdefgh') == 2
+    assert estimate_tokens('导数 derivative') == 2 + 3
+
+
+def test_rate_limiter_spaces_calls():
+    now = [0.0]
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        now[0] += s
+
+    lim = RateLimiter(rate=2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+    assert lim.acquire() == 0.0 and lim.acquire() == 0.0  # burst
+    assert abs(lim.acquire() - 0.5) < 1e-9
+    now[0] += 10  # idle refills only up to the burst
+    assert lim.acquire() == 0.0 and lim.acquire() == 0.0
+    assert lim.acquire() > 0
+    assert RateLimiter(0).acquire() == 0.0
+
+
+def test_schema_score_and_parsing():
+    assert schema_score(GOOD) == (1.0, [])
+    score, failed = schema_score({'learn_points': ['这是一条明显超过十五个字的学习点内容描述'] * 7, 'confusions': [{'left': 'a'}], 'x': 1})
+    assert set(failed) == {'top_level_keys', 'learn_points_count', 'learn_points_length', 'confusion_fields', 'confusion_strings'}
+    assert 0 < score < 1
+    assert schema_score(None) == (0.0, ['object'])
+
+    assert parse_output(json.dumps(GOOD)) == (GOOD, True)
+    assert parse_output('好的：```json\n' + json.dumps(GOOD) + '\n```') == (GOOD, False)
+    assert parse_output('无法回答') == (None, False)
+
+
+def test_matrix_runs_concurrently_and_aggregates(monkeypatch, tmp_path):
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def fake_call(variant, text):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        if variant['name'] == 'chatty':
+            return '结果如下 ' + json.dumps(GOOD, ensure_ascii=False)
+        if variant['name'] == 'broken':
+            raise RuntimeError('HTTP 500')
+        return json.dumps(GOOD, ensure_ascii=False)
+
+    monkeypatch.setattr(prompt_eval, 'call_variant', fake_call)
+    variants = [{'name': 'strict', 'backend': 'openai', 'model': 'm1'},
+                {'name': 'chatty', 'backend': 'openai', 'few_shot': False},
+                {'name': 'broken', 'backend': 'deepseek'}]
+    corpus = ['导数是瞬时变化率。', '矩阵与行列式不同。']
+    rows = prompt_eval.run_matrix(variants, corpus, concurrency=4, repeat=2)
+    assert len(rows) == 12 and peak[0] > 1
+    summary = {s['variant']: s for s in prompt_eval.aggregate(rows)}
+    assert list(summary) == ['strict', 'chatty', 'broken']
+    assert summary['strict']['strict_json_rate'] == 1.0 and summary['strict']['schema_pass_rate'] == 1.0
+    assert summary['chatty']['parse_rate'] == 1.0 and summary['chatty']['strict_json_rate'] == 0.0
+    # no few-shot block -> far fewer prompt tokens
+    assert summary['chatty']['prompt_tokens'] < summary['strict']['prompt_tokens']
+    assert summary['broken']['errors'] == 4 and summary['broken']['parse_rate'] == 0.0
+    assert summary['strict']['latency_ms']['p50'] >= 20
+
+    paths = prompt_eval.write_report(rows, list(summary.values()), str(tmp_path))
+    table = open(paths['table'], encoding='utf-8').read()
+    assert '| strict | 4 | 0 |' in table and '| broken | 4 | 4 |' in table
+    assert sum(1 for _ in open(paths['calls'], encoding='utf-8')) == 12
+
+
+def test_openai_variant_passes_model_and_prompt(monkeypatch):
+    import openai_client
+    seen = {}
+
+    def chat_json(key, system, user, max_tokens=800, timeout=60, model_name=None):
+        seen.update(system=system, user=user, model=model_name, timeout=timeout)
+        return json.dumps(GOOD)
+
+    monkeypatch.setenv('OPENAI_API_KEY', 'k')
+    monkeypatch.setattr(openai_client, 'chat_json', chat_json)
+    v = prompt_eval.normalize_variant({'backend': 'openai', 'model': 'gpt-x', 'system': '只返回 JSON', 'few_shot': False,
+                                       'timeout_s': 5})
+    assert v['name'].startswith('openai:gpt-x/prompt-') and v['name'].endswith('/no-few-shot')
+    row = prompt_eval.evaluate_call(v, '导数')
+    assert row['ok'] and row['schema_score'] == 1.0
+    assert seen == {'system': '只返回 JSON', 'user': prompt_eval.build_messages(v, '导数')[1], 'model': 'gpt-x', 'timeout': 5}
+    assert seen['user'].endswith('导数') and '示例' not in seen['user']
+
+
+def test_variant_names_are_distinct(monkeypatch):
+    import pytest
+    monkeypatch.setattr(prompt_eval, 'call_variant', lambda variant, text: json.dumps(GOOD))
+    specs = [{'backend': 'openai', 'model': 'm'}, {'backend': 'openai', 'model': 'm', 'system': '只返回 JSON'},
+             {'backend': 'openai', 'model': 'm', 'few_shot': False}, {'backend': 'openai', 'model': 'm', 'max_tokens': 400}]
+    names = [prompt_eval.normalize_variant(v)['name'] for v in specs]
+    assert names[0] == 'openai:m' and len(set(names)) == 4
+    rows = prompt_eval.run_matrix(specs, ['导数'])
+    assert [s['variant'] for s in prompt_eval.aggregate(rows)] == names
+    with pytest.raises(ValueError):
+        prompt_eval.run_matrix([{'backend': 'openai', 'model': 'm'}, {'name': 'openai:m', 'backend': 'openai'}], ['导数'])
+
+
+def test_deepseek_variant_sends_its_own_prompt(monkeypatch, tmp_path):
+    import requests
+    import deepseek_client
+    saved = tmp_path / 'success.json'
+    saved.write_text(json.dumps([{'format': 'text', 'body': {'text': '旧的提示词'}, 'score': 10}]), encoding='utf-8')
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(saved))
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'fake')
+    sent = []
+
+    class Resp:
+        status_code = 200
+        text = json.dumps(GOOD, ensure_ascii=False)
+
+        def json(self):
+            return {'text': self.text}
+
+    monkeypatch.setattr(requests, 'post', lambda url, headers=None, json=None, timeout=None: sent.append(json) or Resp())
+    v = prompt_eval.normalize_variant({'backend': 'deepseek', 'system': '只返回 JSON', 'few_shot': False})
+    assert prompt_eval.evaluate_call(v, '导数')['schema_score'] == 1.0
+    assert len(sent) == 1 and sent[0]['text'].startswith('只返回 JSON') and sent[0]['text'].endswith('导数')
+
+
+def test_cli_with_local_backends(tmp_path, capsys):
+    corpus = tmp_path / 'c.txt'
+    corpus.write_text('导数是函数在某点的瞬时变化率。\n\n行列式是一个数，矩阵是数表。', encoding='utf-8')
+    summary = prompt_eval.main(['--corpus', str(corpus), '-o', str(tmp_path / 'out')])
+    assert [s['variant'] for s in summary] == ['fallback', 'extractive']
+    assert all(s['calls'] == 2 and s['errors'] == 0 and s['prompt_tokens'] == 0 for s in summary)
+    assert '| fallback |' in capsys.readouterr().out
@@ -0,0 +1,130 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import metrics
+import router
+import summarizer
+
+REMOTE = {'learn_points': ['远端结果'], 'confusions': []}
+HEDGE = {'learn_points': ['对冲结果'], 'confusions': []}
+
+
+def _backend(result, delay=0.0, reason=None):
+    def call(text):
+        time.sleep(delay)
+        if reason:
+            raise summarizer.BackendError(reason)
+        return result
+    return call
+
+
+def _install(monkeypatch, primary, hedge=None):
+    monkeypatch.setitem(summarizer.BACKENDS, 'deepseek', primary)
+    if hedge:
+        monkeypatch.setitem(summarizer.BACKENDS, 'openai', hedge)
+    monkeypatch.setattr(router, 'latency', router.LatencyTracker())
+
+
+def test_primary_wins_when_fast(monkeypatch):
+    _install(monkeypatch, _backend(REMOTE))
+    before = router.router_wins.value(path='primary')
+    assert router.route('导数', primary='deepseek', hedge='', deadline_s=5) == REMOTE
+    assert router.router_wins.value(path='primary') == before + 1
+
+
+def test_hedge_after_slow_primary(monkeypatch):
+    _install(monkeypatch, _backend(REMOTE, delay=1.0), _backend(HEDGE))
+    before = router.router_hedges.value(backend='openai')
+    t0 = time.monotonic()
+    res = router.route('导数', primary='deepseek', hedge='openai', deadline_s=5, hedge_min_s=0.05)
+    assert res == HEDGE
+    assert time.monotonic() - t0 < 0.8
+    assert router.router_hedges.value(backend='openai') == before + 1
+
+
+def test_failed_primary_hedges_immediately(monkeypatch):
+    _install(monkeypatch, _backend(None, reason='deepseek_error'), _backend(HEDGE))
+    assert router.route('导数', primary='deepseek', hedge='openai', deadline_s=5, hedge_min_s=10) == HEDGE
+
+
+def test_deadline_returns_local_result(monkeypatch):
+    _install(monkeypatch, _backend(REMOTE, delay=1.0))
+    before = metrics.fallback_used.value(reason='router_deadline')
+    t0 = time.monotonic()
+    res = router.route('导数是瞬时变化率', primary='deepseek', hedge='', deadline_s=0.1)
+    assert time.monotonic() - t0 < 0.5
+    assert res['learn_points'] == ['导数是瞬时变化率']
+    assert metrics.fallback_used.value(reason='router_deadline') == before + 1
+
+
+def test_failure_reason_recorded(monkeypatch):
+    _install(monkeypatch, _backend(None, reason='deepseek_unparsable'))
+    before = metrics.fallback_used.value(reason='deepseek_unparsable')
+    router.route('导数', primary='deepseek', hedge='', deadline_s=5)
+    assert metrics.fallback_used.value(reason='deepseek_unparsable') == before + 1
+
+
+def test_summarize_uses_router_when_enabled(monkeypatch):
+    _install(monkeypatch, _backend(REMOTE))
+    monkeypatch.setenv('ROUTER_ENABLED', '1')
+    monkeypatch.setenv('LLM_BACKEND', 'deepseek')
+    monkeypatch.delenv('ROUTER_HEDGE', raising=False)
+    assert summarizer.summarize('导数') == REMOTE
+
+
+def test_hedge_delay_tracks_p95():
+    t = router.LatencyTracker()
+    assert t.hedge_delay('deepseek', 0.5) == 0.5
+    for i in range(100):
+        t.observe('deepseek', 1.0 if i < 95 else 9.0)
+    assert t.hedge_delay('deepseek', 0.5) == 1.0
+
+
+def test_local_result_does_not_wait_for_a_saturated_pool(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    _install(monkeypatch, _backend(REMOTE, delay=1.0))
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.submit(time.sleep, 1.0)  # a losing remote call still holding the only worker
+    monkeypatch.setattr(router, '_pool', pool)
+    try:
+        t0 = time.monotonic()
+        res = router.route('导数是瞬时变化率', primary='deepseek', hedge='', deadline_s=0.1)
+        assert time.monotonic() - t0 < 0.5
+        assert res['learn_points'] == ['导数是瞬时变化率']
+    finally:
+        # drop the queued primary before monkeypatch restores the real backend
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def test_losing_calls_give_their_worker_back(monkeypatch):
+    import circuit_breaker
+    import deadline as deadlines
+    from concurrent.futures import ThreadPoolExecutor
+
+    def probing(text):
+        # like call_deepseek: attempt after attempt until the deadline says stop
+        d = deadlines.current()
+        for _ in range(250):
+            if d.expired():
+                raise summarizer.BackendError('deadline_exceeded', sent=True)
+            time.sleep(0.02)
+        return REMOTE
+
+    _install(monkeypatch, probing, _backend(HEDGE))
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setattr(circuit_breaker, 'breakers', circuit_breaker.BreakerRegistry())
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(router, '_pool', pool)
+    try:
+        # the only worker is taken by a primary that loses to the deadline
+        assert router.route('导数是瞬时变化率', primary='deepseek', hedge='', deadline_s=0.1)['learn_points'] == ['导数是瞬时变化率']
+        # a new primary still gets the worker and answers
+        t0 = time.monotonic()
+        assert router.route('导数', primary='openai', hedge='', deadline_s=2) == HEDGE
+        assert time.monotonic() - t0 < 0.5
+        # being stopped is not a backend failure
+        assert circuit_breaker.breakers.get('deepseek', 'http://fake').stats()['failure_rate'] == 0.0
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
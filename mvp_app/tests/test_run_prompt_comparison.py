@@ -40,8 +40,15 @@ def test_generate_report_writes_files(monkeypatch, tmp_path):
     assert os.path.exists(html)
     # ensure HTML contains sample payload 'replay'
     with open(html, 'r', encoding='utf-8') as h:
-        content = h.read()
-    assert 'replay' in content
+        page = h.read()
+    assert 'replay' in page
+    # stylesheet and scripts are shared assets next to the pages, not inlined in each one
+    assert 'href="deepseek_examples_report.css"' in page and 'src="deepseek_examples_report.js"' in page
+    assert '<style>' not in page
+    content = page
+    for asset in ('deepseek_examples_report.css', 'deepseek_examples_report.js'):
+        with open(os.path.join(out_dir, asset), 'r', encoding='utf-8') as a:
+            content += a.read()
     # ensure copy button and clipboard JS exist
     assert 'class="copy-btn"' in content
     assert 'navigator.clipboard.writeText' in content
@@ -65,3 +72,60 @@ def test_generate_report_writes_files(monkeypatch, tmp_path):
         os.remove(saved_file)
     except Exception:
         pass
+
+
+def _examples(n):
+    return [{'format': ['text', 'prompt', 'openai_chat_simple'][i % 3], 'body': {'text': f'p{i}'}, 'status_code': 200 if i % 4 else 201,
+             'headers': {'Authorization': 'Bearer secret'}, 'response_snippet': 'ok',
+             'timestamp': f'2026-01-{1 + i % 28:02d}T00:00:00Z'} for i in range(n)]
+
+
+def test_iter_success_examples_streams_the_array(tmp_path):
+    from deepseek_client import iter_success_examples
+    data = _examples(40)
+    path = tmp_path / 'success.json'
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    for chunk in (5, 64, 1 << 16):
+        assert list(iter_success_examples(str(path), chunk_size=chunk)) == data
+    path.write_text(json.dumps(data)[:-30], encoding='utf-8')
+    try:
+        list(iter_success_examples(str(path), chunk_size=64))
+        assert False, 'truncated file must raise'
+    except ValueError:
+        pass
+
+
+def test_examples_report_is_paginated_with_one_pass_summary(tmp_path):
+    rows = rpc.example_rows(iter(_examples(25)))
+    rep = rpc.write_examples_report(rows, str(tmp_path), page_size=10)
+    assert rep['examples'] == 25
+    assert [os.path.basename(p) for p in rep['html_pages']] == [
+        'deepseek_examples_report.html', 'deepseek_examples_report_p2.html', 'deepseek_examples_report_p3.html']
+    first = Path(rep['html_pages'][0]).read_text(encoding='utf-8')
+    middle = Path(rep['html_pages'][1]).read_text(encoding='utf-8')
+    last = Path(rep['html_pages'][2]).read_text(encoding='utf-8')
+    assert first.count('<tr><td>') == 10 and last.count('<tr><td>') == 5
+    assert 'deepseek_examples_report_p2.html">Next' in first and 'Previous' not in first
+    assert 'deepseek_examples_report.html">&larr; Previous' in middle and 'p3.html">Next' in middle
+    assert 'Next' not in last
+    # the icon is defined once per page, rows only reference it
+    assert first.count('<symbol id="icon-copy"') == 1 and first.count('href="#icon-copy"') == 10
+    # credentials from the saved request headers never reach the report
+    assert 'secret' not in first + Path(rep['markdown']).read_text(encoding='utf-8') + Path(rep['csv']).read_text(encoding='utf-8')
+
+    assert rep['by_format'] == {'text': 9, 'prompt': 8, 'openai_chat_simple': 8}
+    text_201 = [g for g in rep['summary'] if g['format'] == 'text' and g['status'] == '201']
+    assert text_201 and text_201[0]['count'] == 3  # i = 0, 12, 24
+    assert sum(g['count'] for g in rep['summary']) == 25
+    summary_page = Path(rep['html_summary']).read_text(encoding='utf-8')
+    assert '25 examples in 3 page(s)' in summary_page
+    assert 'Summary by format and status' in Path(rep['markdown']).read_text(encoding='utf-8')
+    with open(rep['csv'], encoding='utf-8') as f:
+        assert sum(1 for _ in f) == 26
+
+
+def test_empty_history_still_writes_reports(tmp_path):
+    rep = rpc.write_examples_report(iter(()), str(tmp_path))
+    assert rep['examples'] == 0 and len(rep['html_pages']) == 1
+    assert 'No saved examples found.' in Path(rep['html_pages'][0]).read_text(encoding='utf-8')
+    assert 'No saved examples found.' in Path(rep['markdown']).read_text(encoding='utf-8')
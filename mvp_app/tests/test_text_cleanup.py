@@ -0,0 +1,97 @@
+import sys
+import os
+import io
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import text_cleanup
+from text_cleanup import clean_text, words_to_text, estimate_tokens
+
+RAW = """导数描述函数在某一点的
+瞬 时 变 化 率 ，  记作 f'(x)。
+||  ~~
+The derivative is the limit of the differ-
+ence quotient as h tends to zero.
+- 例：f(x)=x²
+- 则 f'(x)=2x！！！！
+导数描述函数在某一点的
+第 3 页
+12
+"""
+
+
+def _word(text, conf, line, block=1, par=1):
+    return {'text': text, 'conf': conf, 'block': block, 'par': par, 'line': line}
+
+
+def test_clean_text_rejoins_lines_and_drops_noise():
+    report = clean_text(RAW, max_tokens=0)
+    lines = report['text'].split('\n')
+    assert lines[0] == "导数描述函数在某一点的瞬时变化率，记作 f'(x)。"
+    assert lines[1] == 'The derivative is the limit of the difference quotient as h tends to zero.'
+    # list items stay on their own lines; punctuation runs collapse
+    assert lines[2:4] == ['- 例：f(x)=x²', "- 则 f'(x)=2x！"]
+    # a repeat further down the page is kept
+    assert lines[4:] == ['导数描述函数在某一点的']
+    assert '第 3 页' not in report['text'] and '12' not in lines
+    assert report['lines_removed'] == 3  # junk line, two page-number lines
+    assert report['tokens_after'] < report['tokens_before']
+    assert not report['truncated']
+
+
+def test_clean_text_is_stable_across_ocr_noise():
+    # the same page read twice with different spacing/furniture cleans to the same text
+    other = RAW.replace('瞬 时 变 化 率', '瞬时变化率').replace('第 3 页', 'Page 3 of 9') + '\n\n'
+    assert clean_text(other, max_tokens=0)['text'] == clean_text(RAW, max_tokens=0)['text']
+
+
+def test_numbers_options_and_short_lines_are_kept():
+    text = '计算下列各题：\n1/2\n3/4 + 1/4 = 1\n答案\n42\nA. 正确\nB. 错误\n第二题\nA. 正确\nB. 错误'
+    report = clean_text(text, max_tokens=0)
+    assert report['text'].split('\n') == text.split('\n')
+    assert report['lines_removed'] == 0
+    # a bare number is still a page number as the first or last line, and a double read is collapsed
+    assert clean_text('7\n导数\n导数\n8', max_tokens=0)['text'] == '导数'
+
+
+def test_low_confidence_words_are_dropped():
+    words = [_word('极限', 91, 1), _word('定义', 88, 1), _word('~#', 40, 1), _word('x7Q', 12, 1),
+             _word('Limit', 95, 1, par=2)]
+    text, dropped = words_to_text(words)
+    assert text == '极限 定义\n\nLimit'
+    assert dropped == 2
+    report = clean_text('极限 定义 ~# x7Q\nLimit', words=words, max_tokens=0)
+    assert report['text'] == '极限定义\n\nLimit'
+    assert report['low_conf_dropped'] == 2
+
+
+def test_cap_cuts_at_sentence_boundary():
+    text = '。'.join(['函数的导数等于切线斜率'] * 40) + '。'
+    report = clean_text(text, max_tokens=50)
+    assert report['truncated']
+    assert report['tokens_after'] <= 50
+    assert report['text'].endswith('。')
+    assert estimate_tokens(report['text']) == report['tokens_after']
+
+
+def test_upload_summarizes_cleaned_text(monkeypatch, tmp_path):
+    import app as app_module
+    import ocr_utils
+    from PIL import Image
+    monkeypatch.setenv('OCR_CLEANUP', '1')
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '0')
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    words = [_word('导数', 93, 1), _word('描述函数在某一点的', 90, 1), _word('@@', 20, 1), _word('变化率。', 89, 2),
+             _word('7', 85, 3, block=2)]
+    monkeypatch.setattr(ocr_utils, 'tesseract_words', lambda img: words)
+    seen = []
+    monkeypatch.setattr(app_module, 'summarize', lambda text: seen.append(text) or {'learn_points': [], 'confusions': []})
+    before = text_cleanup.ocr_tokens.value(stage='raw')
+
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), 'white').save(buf, 'PNG')
+    resp = app_module.app.test_client().post('/upload', data={'image': (io.BytesIO(buf.getvalue()), 'p.png')},
+                                             content_type='multipart/form-data')
+    assert resp.status_code == 200
+    assert seen == ['导数描述函数在某一点的变化率。']
+    assert text_cleanup.ocr_tokens.value(stage='raw') > before
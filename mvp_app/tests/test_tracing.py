@@ -0,0 +1,130 @@
+import sys
+import os
+import io
+import json
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tracing
+from tracing import SpanWriter, read_spans, span, start_trace, summarize_spans
+
+
+class DummyResp:
+    def __init__(self, status_code=200, text='', j=None):
+        self.status_code = status_code
+        self.text = text
+        self._json = j
+
+    def json(self):
+        if self._json is None:
+            raise ValueError('No JSON')
+        return self._json
+
+
+def _writer(monkeypatch, tmp_path):
+    w = SpanWriter(str(tmp_path / 'spans.jsonl'), flush_every=1000, flush_interval_s=3600)
+    monkeypatch.setattr(tracing, '_writer', w)
+    return w
+
+
+def test_spans_nest_and_buffer(monkeypatch, tmp_path):
+    w = _writer(monkeypatch, tmp_path)
+    with span('orphan'):
+        pass  # no active trace: nothing recorded
+    with start_trace('upload') as trace:
+        with span('ocr', engine='tesseract') as sp:
+            sp.set(chars=12)
+            with span('inner'):
+                pass
+    assert not os.path.exists(w.path)  # still buffered
+    w.flush()
+    spans = list(read_spans(w.path))
+    assert [s['name'] for s in spans] == ['inner', 'ocr', 'upload']
+    by_name = {s['name']: s for s in spans}
+    assert all(s['trace_id'] == trace.trace_id for s in spans)
+    assert by_name['upload']['parent_id'] is None
+    assert by_name['ocr']['parent_id'] == by_name['upload']['span_id']
+    assert by_name['inner']['parent_id'] == by_name['ocr']['span_id']
+    assert by_name['ocr']['attrs'] == {'engine': 'tesseract', 'chars': 12}
+    assert set(trace.stage_ms) == {'upload', 'ocr', 'inner'}
+
+
+def test_stage_totals_add_up_across_threads(monkeypatch, tmp_path):
+    import threading
+    import contextvars
+    w = _writer(monkeypatch, tmp_path)
+
+    def work():
+        for _ in range(300):
+            with span('page'):
+                pass
+
+    with start_trace('upload_multi') as trace:
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(work,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    w.flush()
+    pages = [s['duration_ms'] for s in read_spans(w.path) if s['name'] == 'page']
+    assert len(pages) == 2400
+    assert abs(trace.stage_totals()['page'] - sum(pages)) < 1.0
+
+
+def test_http_attempts_and_backoff_are_spans(monkeypatch, tmp_path):
+    w = _writer(monkeypatch, tmp_path)
+    monkeypatch.setenv('DEEPSEEK_URL', 'http://fake')
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'fake')
+    monkeypatch.delenv('DEEPSEEK_MODEL', raising=False)
+    import deepseek_client
+    monkeypatch.setattr(deepseek_client, 'SUCCESS_FILE', str(tmp_path / 'success.json'))
+    responses = [DummyResp(403, 'RPM limit'), DummyResp(403, 'RPM limit'), DummyResp(200, j={'text': 'ok'})]
+    monkeypatch.setattr(requests, 'post', lambda url, headers=None, json=None, timeout=None: responses.pop(0))
+    monkeypatch.setattr('time.sleep', lambda s: None)
+
+    with start_trace('upload'):
+        assert deepseek_client.call_deepseek('p') == 'ok'
+    w.flush()
+    spans = list(read_spans(w.path))
+    http = [s for s in spans if s['name'] == 'deepseek.http']
+    assert [s['attrs']['status'] for s in http] == [403, 403, 200]
+    assert all(s['attrs']['format'] == 'text' for s in http)
+    assert http[-1]['attrs']['bytes'] == len('')
+    assert len([s for s in spans if s['name'] == 'deepseek.backoff']) == 2
+
+
+def test_summarize_and_cli(tmp_path, capsys):
+    path = tmp_path / 'spans.jsonl'
+    recs = []
+    for i in range(1, 101):
+        tid = f't{i}'
+        recs.append({'trace_id': tid, 'span_id': f'r{i}', 'parent_id': None, 'name': 'upload', 'start': i, 'duration_ms': float(i)})
+        recs.append({'trace_id': tid, 'span_id': f'c{i}', 'parent_id': f'r{i}', 'name': 'ocr', 'start': i, 'duration_ms': i / 2})
+    path.write_text('\n'.join(json.dumps(r) for r in recs) + '\nnot json\n', encoding='utf-8')
+
+    summary = summarize_spans(read_spans(str(path)), top=3)
+    assert summary['spans']['upload']['p50'] == 50.0
+    assert summary['spans']['upload']['p99'] == 99.0
+    assert [t['trace_id'] for t in summary['slowest']] == ['t100', 't99', 't98']
+    assert summary['slowest'][0]['spans'][0]['name'] == 'ocr'
+
+    tracing.main([str(path), '--top', '2'])
+    out = capsys.readouterr().out
+    assert 'upload' in out and 't100' in out
+
+
+def test_upload_returns_trace_id(monkeypatch, tmp_path):
+    w = _writer(monkeypatch, tmp_path)
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(app_module, 'summarize', lambda text: {'learn_points': ['点'], 'confusions': []})
+    buf = io.BytesIO()
+    Image.new('RGB', (32, 32), 'white').save(buf, 'PNG')
+    buf.seek(0)
+    resp = app_module.app.test_client().post('/upload', data={'image': (buf, 'a.png')}, content_type='multipart/form-data')
+    tid = resp.headers['X-Trace-Id']
+    w.flush()
+    names = {s['name'] for s in read_spans(w.path) if s['trace_id'] == tid}
+    assert {'upload', 'save', 'preprocess_image', 'ocr', 'summarize', 'generate_pdf'} <= names
@@ -0,0 +1,105 @@
+import sys
+import os
+import io
+import re
+import time
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import admission
+
+RESULT = {'learn_points': ['导数=瞬时变化率'], 'confusions': []}
+
+
+def _png(color):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def _setup(monkeypatch, tmp_path, delay=0.0):
+    import app as app_module
+    monkeypatch.setenv('IMAGE_HASH_ENABLED', '0')
+    monkeypatch.setenv('ADMISSION_OCR_LIMIT', '4')
+    monkeypatch.setenv('ADMISSION_LLM_LIMIT', '4')
+    admission.controller.reset()
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', str(tmp_path))
+    calls = {'ocr': [], 'summarize': []}
+    lock = threading.Lock()
+
+    def fake_ocr(path):
+        time.sleep(delay)
+        with lock:
+            calls['ocr'].append(path)
+        return 'OCR 第' + re.search(r'_(\d)_', os.path.basename(path)).group(1) + '页'
+
+    def fake_summarize(text):
+        time.sleep(delay)
+        with lock:
+            calls['summarize'].append(text)
+        return dict(RESULT)
+
+    monkeypatch.setattr(app_module, '_ocr', fake_ocr)
+    monkeypatch.setattr(app_module, 'summarize', fake_summarize)
+    return app_module, calls
+
+
+def _post(app_module, n, **form):
+    data = {'images': [(io.BytesIO(_png(c)), f'p{i}.png') for i, c in enumerate(['white', 'gray', 'black', 'red'][:n])]}
+    data.update(form)
+    return app_module.app.test_client().post('/upload_multi', data=data, content_type='multipart/form-data')
+
+
+def _pdf(app_module, resp):
+    url = re.search(r'href="(/outputs/[^"]+\.pdf)"', resp.get_data(as_text=True)).group(1)
+    return app_module.app.test_client().get(url).get_data()
+
+
+def _pdf_pages(app_module, resp):
+    return len(re.findall(rb'/Type /Page\b(?!s)', _pdf(app_module, resp)))
+
+
+def test_pages_are_processed_concurrently(monkeypatch, tmp_path):
+    app_module, calls = _setup(monkeypatch, tmp_path, delay=0.3)
+    t0 = time.monotonic()
+    resp = _post(app_module, 3)
+    wall = time.monotonic() - t0
+    admission.controller.reset()
+    assert resp.status_code == 200
+    assert len(calls['ocr']) == 3 and len(calls['summarize']) == 3
+    # sequential would be 3 x (OCR + LLM) = 1.8 s
+    assert wall < 1.2
+    body = resp.get_data(as_text=True)
+    assert body.index('OCR 第0页') < body.index('OCR 第1页') < body.index('OCR 第2页')
+    assert _pdf_pages(app_module, resp) == 3
+
+
+def test_merge_summarizes_once_in_upload_order(monkeypatch, tmp_path):
+    app_module, calls = _setup(monkeypatch, tmp_path)
+    resp = _post(app_module, 3, merge='1')
+    admission.controller.reset()
+    assert resp.status_code == 200
+    assert calls['summarize'] == ['OCR 第0页\n\nOCR 第1页\n\nOCR 第2页']
+    assert '合并后的精炼学习点' in resp.get_data(as_text=True)
+    # the merged card, then every photo on its own page
+    assert _pdf_pages(app_module, resp) == 4
+    # the card thumbnail plus three full-page photos
+    assert len(re.findall(rb'/Subtype /Image', _pdf(app_module, resp))) == 4
+
+
+def test_rejects_empty_and_oversized_sets(monkeypatch, tmp_path):
+    app_module, _ = _setup(monkeypatch, tmp_path)
+    monkeypatch.setenv('MULTI_UPLOAD_MAX_FILES', '2')
+    assert app_module.app.test_client().post('/upload_multi', data={}, content_type='multipart/form-data').status_code == 400
+    assert _post(app_module, 3).status_code == 400
+    admission.controller.reset()
+
+
+def test_invalid_max_files_uses_default(monkeypatch, tmp_path):
+    app_module, calls = _setup(monkeypatch, tmp_path)
+    monkeypatch.setenv('MULTI_UPLOAD_MAX_FILES', 'ten')
+    assert _post(app_module, 2).status_code == 200
+    assert len(calls['summarize']) == 2
+    admission.controller.reset()
@@ -0,0 +1,213 @@
+import os
+import re
+
+import metrics
+import deadline as deadlines
+
+ocr_tokens = metrics.REGISTRY.counter('learncard_ocr_tokens_total',
+                                      'Estimated OCR text tokens before (raw) and after (clean) cleanup.', ('stage',))
+token_reduction = metrics.REGISTRY.histogram('learncard_ocr_token_reduction_ratio',
+                                             'Share of estimated tokens removed by OCR cleanup, per document.',
+                                             buckets=(0.0, 0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9))
+
+# Words below this Tesseract confidence (0-100) are dropped; junk-shaped words (no letter,
+# digit or CJK character) are dropped below JUNK_CONF as well.
+MIN_WORD_CONF = 30
+JUNK_CONF = 60
+# cap on the estimated tokens handed to summarize
+DEFAULT_MAX_TOKENS = 1500
+
+_CJK = r'　-〿㐀-䶿一-鿿＀-￯'
+_CJK_RE = re.compile(f'[{_CJK}]')
+_WORDISH_RE = re.compile(r'[0-9A-Za-z㐀-䶿一-鿿]')
+_INVISIBLE_RE = re.compile(r'[​-‏⁠﻿­]')
+_SPACES_RE = re.compile(r'[ \t 　]+')
+# spaces Tesseract puts between CJK characters (and between CJK and CJK punctuation)
+_CJK_GAP_RE = re.compile(f'(?<=[{_CJK}]) +(?=[{_CJK}])')
+# standalone tokens made only of scanner/OCR junk glyphs
+_JUNK_TOKEN_RE = re.compile(r'(?<!\S)[|¦~^_\\`<>«»§¤•●■□▪◆◇※©®™°]+(?!\S)')
+_PUNCT_RUN_RE = re.compile(r'([。，、；：！？!?,;:])\1+')
+_DOTS_RE = re.compile(r'(?:\.{4,}|…{2,}|·{3,})')
+# page furniture wherever it appears: "第 3 页", "Page 3 of 10", separator lines
+_FURNITURE_RE = re.compile(r'^(?:第\s*\d+\s*页(?:\s*[/／共]\s*\d+\s*页?)?|page\s*\d+(?:\s*(?:of|/)\s*\d+)?'
+                           r'|[-–—=_*~·.]{3,})$', re.IGNORECASE)
+# a bare (optionally decorated) number or "3/10": a page number only as the first or last line,
+# elsewhere it is as likely an answer or a fraction
+_PAGE_NUMBER_RE = re.compile(r'^(?:[-–—=_*~·.\s]*\d{1,4}[-–—=_*~·.\s]*|\d+\s*/\s*\d+)$')
+_SENTENCE_END = tuple('。！？；：.!?;:）)」』"”')
+# lines narrower than this (display columns, CJK counted as 2) are headings, answers or
+# options rather than a sentence wrapped at the page edge, and are not glued to the next line
+GLUE_MIN_WIDTH = 16
+# a line starting a new item is never glued to the previous one
+_ITEM_START_RE = re.compile(r'^(?:[-*•·]\s|\d{1,2}[.、)）]|[（(]\d{1,2}[)）]|[一二三四五六七八九十]+[、.]|[A-Za-z][.)]\s|#)')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: one per CJK character/punctuation, one per ~4 other characters."""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def words_to_text(words, min_conf: float = MIN_WORD_CONF, junk_conf: float = JUNK_CONF):
+    """Rebuild text from Tesseract word boxes, dropping low-confidence words.
+
+    `words` are dicts with text, conf, block, par, line (see ocr_utils.tesseract_words);
+    words of one (block, par, line) form a line and blocks/paragraphs are separated by
+    an empty line. Returns (text, dropped_word_count).
+    """
+    lines = []
+    current = None
+    dropped = 0
+    for w in words:
+        text = (w.get('text') or '').strip()
+        if not text:
+            continue
+        conf = float(w.get('conf', -1))
+        if 0 <= conf < min_conf or (conf < junk_conf and not _WORDISH_RE.search(text)):
+            dropped += 1
+            continue
+        key = (w.get('block'), w.get('par'), w.get('line'))
+        if current is None or key != current[0]:
+            if current is not None and key[:2] != current[0][:2]:
+                lines.append('')
+            current = (key, [])
+            lines.append(current[1])
+        current[1].append(text)
+    return '\n'.join(' '.join(ws) if isinstance(ws, list) else ws for ws in lines), dropped
+
+
+def _normalize_line(line: str) -> str:
+    line = _INVISIBLE_RE.sub('', line)
+    line = _SPACES_RE.sub(' ', line).strip()
+    line = _JUNK_TOKEN_RE.sub('', line)
+    line = _CJK_GAP_RE.sub('', line)
+    line = _DOTS_RE.sub('…', line)
+    line = _PUNCT_RUN_RE.sub(r'\1', line)
+    return _SPACES_RE.sub(' ', line).strip()
+
+
+def _is_noise(line: str) -> bool:
+    # page furniture, or nothing readable
+    return bool(_FURNITURE_RE.match(line)) or not _WORDISH_RE.search(line)
+
+
+def _width(line: str) -> int:
+    return len(line) + len(_CJK_RE.findall(line))
+
+
+def _join(a: str, b: str) -> str:
+    if a.endswith('-') and len(a) > 1 and a[-2].isalpha() and b[:1].islower():
+        return a[:-1] + b  # exam- / ple
+    if _CJK_RE.match(a[-1]) or _CJK_RE.match(b[0]):
+        return a + b
+    return a + ' ' + b
+
+
+def _glues(prev: str, line: str) -> bool:
+    # only a wide line that stops mid-sentence continues on the next one; a trailing digit
+    # is more often an answer or a formula result than a broken sentence
+    return (bool(line) and bool(prev) and not prev.endswith(_SENTENCE_END) and not prev[-1].isdigit()
+            and _width(prev) >= GLUE_MIN_WIDTH and not _ITEM_START_RE.match(line))
+
+
+def _rejoin(lines):
+    """Glue lines broken mid-sentence; an empty line keeps separating paragraphs."""
+    out = []
+    for line in lines:
+        if out and _glues(out[-1], line):
+            out[-1] = _join(out[-1], line)
+        else:
+            out.append(line)
+    return out
+
+
+def _dedupe_key(line: str) -> str:
+    return re.sub(r'[\W_]+', '', line.lower())
+
+
+def _cap(text: str, max_tokens: int):
+    """Cut text to at most max_tokens (estimated), at a sentence or line end where possible."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text, False
+    lo, hi = 0, len(text)
+    while lo < hi:  # longest prefix within budget
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text[:lo]
+    end = max(cut.rfind(c) for c in '\n' + ''.join(_SENTENCE_END))
+    if end >= len(cut) // 2:
+        cut = cut[:end + 1]
+    return cut.rstrip(), True
+
+
+def clean_text(text: str, words=None, max_tokens: int = None, min_conf: float = MIN_WORD_CONF) -> dict:
+    """Normalize OCR output before it is sent to summarize.
+
+    With Tesseract `words`, low-confidence words are dropped first and the text is rebuilt
+    from the rest. Then: invisible characters and repeated whitespace go, junk glyphs,
+    page markers, separator lines and a bare page number on the first or last line are
+    removed, wide lines broken mid-sentence are rejoined (no space between CJK, hyphenated
+    Latin words merged), a line repeated right after itself and punctuation runs are
+    collapsed, and the result is capped at max_tokens (estimated).
+
+    Returns {'text', 'tokens_before', 'tokens_after', 'low_conf_dropped', 'lines_removed', 'truncated'}.
+    """
+    raw = text or ''
+    before = estimate_tokens(raw)
+    dropped = 0
+    if words:
+        raw, dropped = words_to_text(words, min_conf)
+    max_tokens = _max_tokens() if max_tokens is None else max_tokens
+
+    lines = []
+    last_key = None
+    removed = 0
+    for line in raw.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if not line.strip():
+            if lines and lines[-1]:
+                lines.append('')
+            continue
+        line = _normalize_line(line)
+        if not line or _is_noise(line):
+            removed += 1
+            continue
+        # only a repeat of the line just before (a double read); repeats further apart
+        # are usually real content, e.g. the same options under two questions
+        key = _dedupe_key(line)
+        if key == last_key:
+            removed += 1
+            continue
+        last_key = key
+        lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    for i in (0, -1):
+        if lines and _PAGE_NUMBER_RE.match(lines[i]):
+            lines.pop(i)
+            removed += 1
+    cleaned = '\n'.join(_rejoin(lines)).strip()
+    cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+    cleaned, truncated = _cap(cleaned, max_tokens)
+    return {'text': cleaned, 'tokens_before': before, 'tokens_after': estimate_tokens(cleaned),
+            'low_conf_dropped': dropped, 'lines_removed': removed, 'truncated': truncated}
+
+
+def record(report: dict):
+    """Count a document's before/after tokens in the metrics registry."""
+    ocr_tokens.inc(report['tokens_before'], stage='raw')
+    ocr_tokens.inc(report['tokens_after'], stage='clean')
+    if report['tokens_before']:
+        token_reduction.observe(1 - report['tokens_after'] / report['tokens_before'])
+
+
+def enabled() -> bool:
+    return os.getenv('OCR_CLEANUP', '0') == '1'
+
+
+def _max_tokens() -> int:
+    return deadlines.env('OCR_MAX_TOKENS', DEFAULT_MAX_TOKENS, int)
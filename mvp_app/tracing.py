@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import metrics
+
+TRACE_LOG = os.path.join(os.path.dirname(__file__), 'outputs', 'traces.jsonl')
+
+_current_trace = contextvars.ContextVar('learncard_trace', default=None)
+_current_span = contextvars.ContextVar('learncard_span', default=None)
+
+
+class SpanWriter:
+    """Buffered JSONL span sink.
+
+    Spans are appended to an in-memory buffer and written in batches, either when
+    the buffer reaches flush_every records or from a background flusher every
+    flush_interval_s seconds, so recording a span never touches the disk.
+    The file is rotated to `<path>.1` once it exceeds max_bytes.
+    """
+
+    def __init__(self, path: str, flush_every: int = 256, flush_interval_s: float = 2.0, max_bytes: int = 50 * 1024 ** 2):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self._buf = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def write(self, record: dict):
+        with self._lock:
+            self._buf.append(record)
+            full = len(self._buf) >= self.flush_every
+        if full:
+            self.flush()
+        elif self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='span-writer', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval_s):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            buf, self._buf = self._buf, []
+        if not buf:
+            return
+        data = ''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in buf)
+        with self._io_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+            except OSError as e:
+                print('写入 trace 日志失败：', e, file=sys.stderr)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+
+class Trace:
+    def __init__(self, name: str, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        # name -> summed duration in ms of completed spans, for tagging (e.g. profiles);
+        # spans of one trace can end on several threads (/upload_multi workers)
+        self.stage_ms = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, ms: float):
+        with self._lock:
+            self.stage_ms[name] = self.stage_ms.get(name, 0.0) + ms
+
+    def stage_totals(self) -> dict:
+        """A consistent copy of stage_ms."""
+        with self._lock:
+            return dict(self.stage_ms)
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attrs', 'start', 't0', 'duration_ms', 'error')
+
+    def __init__(self, trace, name, parent_id, attrs):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record(self) -> dict:
+        rec = {'trace_id': self.trace.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+               'name': self.name, 'start': round(self.start, 6), 'duration_ms': round(self.duration_ms, 3)}
+        if self.attrs:
+            rec['attrs'] = self.attrs
+        if self.error:
+            rec['error'] = self.error
+        return rec
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv('TRACING_ENABLED', '1') == '1'
+
+
+def get_writer() -> SpanWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SpanWriter(os.getenv('TRACE_LOG', TRACE_LOG))
+                atexit.register(_writer.close)
+    return _writer
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_trace_id():
+    t = _current_trace.get()
+    return t.trace_id if t else None
+
+
+@contextmanager
+def start_trace(name: str, trace_id=None, **attrs):
+    """Open a new trace whose root span is the stage `name`; yields the Trace."""
+    trace = Trace(name, trace_id)
+    token = _current_trace.set(trace)
+    try:
+        with stage(name, **attrs):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a span under the current trace. Without an active trace this is a no-op.
+
+    Yields the Span (or None) so callers can attach attributes discovered while it runs.
+    """
+    trace = _current_trace.get()
+    if trace is None or not enabled():
+        yield None
+        return
+    sp = Span(trace, name, _current_span.get(), attrs)
+    token = _current_span.set(sp.span_id)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = repr(e)[:200]
+        raise
+    finally:
+        _current_span.reset(token)
+        sp.duration_ms = (time.perf_counter() - sp.t0) * 1000.0
+        trace.add_stage(name, sp.duration_ms)
+        get_writer().write(sp.record())
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """A pipeline stage: observed in the metrics histogram and recorded as a span."""
+    with metrics.timed(name), span(name, **attrs) as sp:
+        yield sp
+
+
+# -- analysis CLI ---------------------------------------------------------------
+
+def read_spans(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def summarize_spans(spans, top: int = 10) -> dict:
+    """Return per-span-name percentiles and the slowest root spans (traces) with their children."""
+    by_name = {}
+    roots = []
+    children = {}
+    for s in spans:
+        by_name.setdefault(s['name'], []).append(s['duration_ms'])
+        if s.get('parent_id') is None:
+            roots.append(s)
+        else:
+            children.setdefault(s['trace_id'], []).append(s)
+    names = {}
+    for name, durs in sorted(by_name.items()):
+        names[name] = {'count': len(durs), 'p50': metrics.percentile(durs, 50), 'p95': metrics.percentile(durs, 95),
+                       'p99': metrics.percentile(durs, 99), 'max': max(durs)}
+    slowest = []
+    for r in sorted(roots, key=lambda s: s['duration_ms'], reverse=True)[:top]:
+        kids = sorted(children.get(r['trace_id'], []), key=lambda s: s['start'])
+        slowest.append({'trace_id': r['trace_id'], 'name': r['name'], 'duration_ms': r['duration_ms'],
+                        'spans': [{'name': k['name'], 'duration_ms': k['duration_ms'], 'attrs': k.get('attrs', {})} for k in kids]})
+    return {'spans': names, 'slowest': slowest}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Span latency percentiles and slowest traces from a JSONL span log.')
+    parser.add_argument('path', nargs='?', default=os.getenv('TRACE_LOG', TRACE_LOG))
+    parser.add_argument('--top', type=int, default=10, help='number of slowest traces to list')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    summary = summarize_spans(read_spans(args.path), top=args.top)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return summary
+
+    print(f"{'span':<32} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, st in summary['spans'].items():
+        print(f"{name:<32} {st['count']:>7} {st['p50']:>10.1f} {st['p95']:>10.1f} {st['p99']:>10.1f} {st['max']:>10.1f}")
+    print(f'\nSlowest {len(summary["slowest"])} traces:')
+    for t in summary['slowest']:
+        print(f"  {t['trace_id']} {t['name']} {t['duration_ms']:.1f} ms")
+        for k in t['spans']:
+            attrs = ' '.join(f'{a}={v}' for a, v in k['attrs'].items())
+            print(f"      {k['name']:<28} {k['duration_ms']:>10.1f} ms  {attrs}")
+    return summary
+
+
+if __name__ == '__main__':
+    main()
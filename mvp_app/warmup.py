@@ -0,0 +1,129 @@
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+
+# Modules the web process must not load at import time; they are loaded by warmup()
+# (or on first use) instead.
+DEFERRED_MODULES = ('reportlab', 'pytesseract', 'openai', 'numpy')
+
+
+def _step(timings: dict, name: str, fn):
+    t0 = time.perf_counter()
+    try:
+        fn()
+        timings[name] = round((time.perf_counter() - t0) * 1000.0, 1)
+    except Exception as e:
+        timings[name] = None
+        print(f'预热 {name} 失败：', e, file=sys.stderr)
+
+
+def _reportlab():
+    import io
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader  # noqa: F401
+    c = canvas.Canvas(io.BytesIO(), pagesize=A4)
+    c.drawString(10, 10, 'warmup')
+    c.save()
+
+
+def _tesseract():
+    from PIL import Image
+    from ocr_utils import tesseract_ocr
+    # 识别一张小图，让 tesseract 把 chi_sim/eng 语言数据读进页缓存
+    tesseract_ocr(Image.new('L', (64, 32), 255))
+
+
+def _http():
+    import ssl
+    import requests  # noqa: F401
+    import requests.adapters  # noqa: F401
+    ssl.create_default_context()
+
+
+def _openai():
+    key = os.getenv('OPENAI_API_KEY')
+    if key:
+        # builds the shared client (and its connection pool) instead of doing it on the first request
+        import openai_client
+        openai_client.get_client(key)
+
+
+def _prompts():
+    from summarizer import _prompt_prefix
+    _prompt_prefix()
+
+
+def warmup(start_background: bool = True) -> dict:
+    """Preload everything the first request would otherwise pay for; returns ms per step.
+
+    Call it once per worker after fork (e.g. gunicorn `post_fork`) so the first
+    request sees steady-state latency. Failures are reported and skipped.
+    """
+    timings = {}
+    _step(timings, 'reportlab', _reportlab)
+    _step(timings, 'tesseract', _tesseract)
+    _step(timings, 'http', _http)
+    _step(timings, 'openai', _openai)
+    _step(timings, 'prompts', _prompts)
+    if start_background:
+        import app as app_module
+        _step(timings, 'background', app_module.start_background)
+        app_module.app.config['BACKGROUND_STARTED'] = True
+    return timings
+
+
+# -- import-time audit ------------------------------------------------------------
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def import_audit(module: str = 'app', cwd=None) -> dict:
+    """Import `module` in a fresh interpreter under `-X importtime`.
+
+    Returns {'total_us', 'modules': {name: cumulative_us}} for top-level imports
+    of the audited module's dependency tree.
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'import failed')
+    modules = {}
+    total = 0
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        modules[name] = cumulative
+        if indent == 1:
+            total += cumulative
+    return {'total_us': total, 'modules': modules}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import-time audit and warm-up timings.')
+    parser.add_argument('--module', default='app', help='module to audit (default: app)')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    parser.add_argument('--warmup', action='store_true', help='also run warmup() and print its timings')
+    args = parser.parse_args(argv)
+
+    audit = import_audit(args.module)
+    print(f"import {args.module}: {audit['total_us'] / 1000.0:.1f} ms")
+    for name, us in sorted(audit['modules'].items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f'  {name:<48} {us / 1000.0:>8.1f} ms')
+    loaded = [m for m in DEFERRED_MODULES if m in audit['modules']]
+    if loaded:
+        print('deferred modules loaded at import:', ', '.join(loaded))
+    if args.warmup:
+        for name, ms in warmup(start_background=False).items():
+            print(f'  warmup {name:<12} {"failed" if ms is None else f"{ms:.1f} ms"}')
+    return audit
+
+
+if __name__ == '__main__':
+    main()